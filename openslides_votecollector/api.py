@@ -1,10 +1,18 @@
-from xmlrpc.client import ServerProxy
+import http.client
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import zip_longest
+from xmlrpc.client import Error, Fault, SafeTransport, ServerProxy, Transport
 
+from django.core.cache import cache
 from django.utils.translation import ugettext as _
 from django.utils.translation import ugettext_noop
 
 from openslides.core.config import config
 
+from .metrics import metrics
 from .models import Keypad
 
 
@@ -39,79 +47,455 @@ class VoteCollectorError(Exception):
         return repr("VoteCollector Exception: %s" % self.value)
 
 
-def get_server():
+class TimeoutTransport(Transport):
     """
-    Gets a server proxy object and tests the connection.
+    Transport with a socket timeout. The connection is kept alive between
+    requests.
     """
-    try:
-        server = ServerProxy(config['votecollector_uri'])
-        # TODO: reduce timeout
-    except TypeError:
-        raise VoteCollectorError(_('Server not found.'))
+    def __init__(self, timeout, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        connection.timeout = self.timeout
+        return connection
+
+
+class TimeoutSafeTransport(SafeTransport):
+    """
+    HTTPS transport with a socket timeout. The connection is kept alive
+    between requests.
+    """
+    def __init__(self, timeout, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        connection.timeout = self.timeout
+        return connection
+
+
+class ServerPool:
+    """
+    Small pool of persistent connections to a VoteCollector.
+
+    The health of the connection is tracked passively from the real calls.
+    """
+    size = 4
+
+    def __init__(self, uri, timeout):
+        self.uri = uri
+        self.timeout = timeout
+        self.proxies = queue.LifoQueue()
+        self.healthy = None
+        self.last_error = ''
+        self.multicall_supported = True
+
+    def get_proxy(self):
+        """
+        Returns an idle server proxy or a new one.
+        """
+        try:
+            return self.proxies.get_nowait()
+        except queue.Empty:
+            pass
+        transport_class = TimeoutSafeTransport if self.uri.startswith('https') else TimeoutTransport
+        try:
+            return ServerProxy(self.uri, transport=transport_class(self.timeout))
+        except (TypeError, OSError):
+            raise VoteCollectorError(_('Server not found.'))
+
+    def put_proxy(self, proxy):
+        """
+        Returns a proxy to the pool. Closes it if the pool is full.
+        """
+        if self.proxies.qsize() < self.size:
+            self.proxies.put(proxy)
+        else:
+            proxy('close')()
+
+    def call(self, method, *params):
+        """
+        Calls the given method (e. g. 'voteCollector.getDeviceStatus') and
+        returns the result.
+        """
+        return self.request(lambda proxy: getattr(proxy, method)(*params))
+
+    def multicall(self, calls):
+        """
+        Calls several methods in one request. The argument calls is a list of
+        (method, params) tuples. Returns a list with the result or the Fault
+        of each call.
+
+        Uses system.multicall. If the device does not support it, the calls
+        are sent one after another on the same connection.
+        """
+        def send(proxy):
+            if self.multicall_supported:
+                try:
+                    results = proxy.system.multicall(
+                        [{'methodName': method, 'params': list(params)} for method, params in calls])
+                except Fault:
+                    self.multicall_supported = False
+                else:
+                    return [
+                        Fault(result['faultCode'], result['faultString']) if isinstance(result, dict) else result[0]
+                        for result in results]
+            results = []
+            for method, params in calls:
+                try:
+                    results.append(getattr(proxy, method)(*params))
+                except Fault as e:
+                    results.append(e)
+            return results
+        return self.request(send)
+
+    def request(self, function):
+        """
+        Calls the function with a server proxy from the pool and returns its
+        result.
+        """
+        proxy = self.get_proxy()
+        try:
+            result = function(proxy)
+        except Fault as e:
+            # The connection is fine but the device reports an error.
+            self.healthy = True
+            self.put_proxy(proxy)
+            raise VoteCollectorError(e.faultString)
+        except (OSError, Error, http.client.HTTPException) as e:
+            self.healthy = False
+            self.last_error = str(e)
+            proxy('close')()
+            raise VoteCollectorError(_('No connection to VoteCollector.'))
+        self.healthy = True
+        self.put_proxy(proxy)
+        return result
+
+
+server_pools = {}
+server_pool_lock = threading.Lock()
+
 
-    # Test the connection
+def get_server(uri=None):
+    """
+    Returns the connection pool to the VoteCollector with the given URI
+    (Default: votecollector_uri). The pool is recreated if the timeout
+    changes.
+    """
+    if uri is None:
+        uri = config['votecollector_uri']
+    timeout = config['votecollector_timeout']
+    with server_pool_lock:
+        server_pool = server_pools.get(uri)
+        if server_pool is None or server_pool.timeout != timeout:
+            server_pool = server_pools[uri] = ServerPool(uri, timeout)
+        return server_pool
+
+
+@lru_cache(maxsize=8)
+def parse_devices(value):
+    """
+    Parses the list of devices (see votecollector_devices). Every line has
+    the URL of a VoteCollector and its keypad ranges, e. g.
+    'http://10.0.0.2:8030 1-400,501'. Returns a tuple of (uri, ranges)
+    tuples. Raises ValueError if a line is invalid.
+    """
+    devices = []
+    for line in value.splitlines():
+        if not line.strip():
+            continue
+        try:
+            uri, ranges_value = line.split(None, 1)
+        except ValueError:
+            raise ValueError('Missing keypad ranges of %s.' % line.strip())
+        ranges = []
+        for item in ranges_value.replace(' ', '').split(','):
+            first, dash, last = item.partition('-')
+            try:
+                first = int(first)
+                last = int(last) if dash else first
+            except ValueError:
+                raise ValueError('Invalid keypad range %s.' % item)
+            if first < 1 or last < first:
+                raise ValueError('Invalid keypad range %s.' % item)
+            ranges.append((first, last))
+        devices.append((uri, tuple(ranges)))
+    return tuple(devices)
+
+
+def get_devices():
+    """
+    Returns a list of (server pool, ranges) tuples of all VoteCollector
+    devices. If no devices are configured, the VoteCollector of
+    votecollector_uri handles all keypads and its ranges are None.
+    """
+    value = config['votecollector_devices']
+    if not value.strip():
+        return [(get_server(), None)]
     try:
-        server.voteCollector.getDeviceStatus()
-    except:
-        raise VoteCollectorError(_('No connection to VoteCollector.'))
-    else:
-        return server
+        devices = parse_devices(value)
+    except ValueError as e:
+        raise VoteCollectorError(_('Invalid list of VoteCollector devices: %s') % e)
+    return [(get_server(uri), ranges) for uri, ranges in devices]
+
+
+def get_device_index(keypad_id):
+    """
+    Returns the index of the device which handles the given keypad. Returns
+    0 if there is only one device or the keypad is in no range.
+    """
+    value = config['votecollector_devices']
+    if value.strip():
+        try:
+            devices = parse_devices(value)
+        except ValueError:
+            return 0
+        for index, (uri, ranges) in enumerate(devices):
+            if in_ranges(keypad_id, ranges):
+                return index
+    return 0
+
+
+def in_ranges(keypad_id, ranges):
+    """
+    Returns True if the keypad is in one of the (first, last) ranges.
+    """
+    return any(first <= keypad_id <= last for first, last in ranges)
+
+
+def call_devices(function, devices):
+    """
+    Calls function(server, ranges) for all devices in parallel. Returns a
+    list with the result or the VoteCollectorError of each device.
+    """
+    def call(device):
+        try:
+            return function(*device)
+        except VoteCollectorError as e:
+            return e
+
+    if len(devices) == 1:
+        return [call(devices[0])]
+    with ThreadPoolExecutor(max_workers=len(devices)) as executor:
+        return list(executor.map(call, devices))
+
+
+def check_results(devices, results):
+    """
+    Raises a VoteCollectorError if the call of a device failed. The message
+    names the failed devices if there are several devices.
+    """
+    errors = [
+        (server, result) for (server, ranges), result in zip(devices, results)
+        if isinstance(result, VoteCollectorError)]
+    if not errors:
+        return
+    if len(devices) == 1:
+        raise errors[0][1]
+    raise VoteCollectorError('; '.join('%s: %s' % (server.uri, error.value) for server, error in errors))
+
+
+class CommandBatch:
+    """
+    Collects VoteCollector commands and sends them in one request.
+
+    The result of each command is checked separately. Negative counts and
+    faults raise a VoteCollectorError unless the command was added with
+    check=False. Note that the device executes all commands of a batch even
+    if one of them fails.
+    """
+    def __init__(self, server=None):
+        self.server = server
+        self.commands = []
+
+    def add(self, method, *params, check=True):
+        """
+        Adds a command to the batch.
+        """
+        self.commands.append((method, params, check))
+
+    def send(self):
+        """
+        Sends all commands and returns the list of their results.
+        """
+        server = self.server or get_server()
+        results = server.multicall([(method, params) for method, params, check in self.commands])
+        for (method, params, check), result in zip(self.commands, results):
+            if not check:
+                continue
+            if isinstance(result, Fault):
+                raise VoteCollectorError(result.faultString)
+            if isinstance(result, int) and result < 0:
+                raise VoteCollectorError(nr=result)
+        return results
+
+
+# Key of the version of the cached lists of eligible keypads.
+KEYPAD_CACHE_VERSION_KEY = 'votecollector_keypads_version'
 
 
 def get_keypads():
-    keypads = Keypad.objects.exclude(user__is_active=False).values_list(
-        'keypad_id', flat=True).order_by('keypad_id')
+    """
+    Returns the sorted list of the ids of all keypads eligible for voting.
+
+    The list is cached per votecollector_method in Django's cache, so all
+    processes share it. The cache key contains a version, which is
+    incremented if a keypad or a user changes (see signals.py).
+    """
+    method = config['votecollector_method']
+    key = 'votecollector_keypads_%s_%d' % (method, cache.get(KEYPAD_CACHE_VERSION_KEY, 0))
+    keypads = cache.get(key)
+    if keypads is None:
+        keypads = Keypad.objects.exclude(user__is_active=False).values_list(
+            'keypad_id', flat=True).order_by('keypad_id')
+
+        if method == 'anonym':
+            keypads = keypads.filter(user=None)
+        elif method == 'person':
+            keypads = keypads.exclude(user=None)
 
-    if config['votecollector_method'] == 'anonym':
-        keypads = keypads.filter(user=None)
-    elif config['votecollector_method'] == 'person':
-        keypads = keypads.exclude(user=None)
+        keypads = list(keypads)
+        cache.set(key, keypads, None)
 
-    if not keypads.exists():
+    if not keypads:
         raise VoteCollectorError(_('No keypads selected.'))
 
     return keypads
 
 
+def clear_keypad_cache():
+    """
+    Clears the cache of eligible keypads in all processes.
+    """
+    try:
+        cache.incr(KEYPAD_CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(KEYPAD_CACHE_VERSION_KEY, 1, None)
+
+
+def get_keypad_ranges(keypads):
+    """
+    Compresses a sorted list of keypad ids into a list of (first, last)
+    tuples of contiguous ranges.
+    """
+    ranges = []
+    for keypad_id in keypads:
+        if ranges and ranges[-1][1] == keypad_id - 1:
+            ranges[-1][1] = keypad_id
+        else:
+            ranges.append([keypad_id, keypad_id])
+    return [tuple(keypad_range) for keypad_range in ranges]
+
+
+@metrics.observe_xmlrpc
 def get_device_status():
-    server = get_server()
-    return server.voteCollector.getDeviceStatus()
+    """
+    Returns the device status. The status of several devices is joined.
+    """
+    devices = get_devices()
+    results = call_devices(lambda server, ranges: server.call('voteCollector.getDeviceStatus'), devices)
+    check_results(devices, results)
+    if len(devices) == 1:
+        return results[0]
+    return ', '.join('%s: %s' % (server.uri, result) for (server, ranges), result in zip(devices, results))
 
 
-def start_voting(mode, options, callback_url):
-    server = get_server()
-    keypads = get_keypads()
+@metrics.observe_xmlrpc
+def start_voting(mode, options, callback_url, stop=False):
+    """
+    Prepares and starts a voting on all devices in parallel, with one
+    request per device. If stop is True, an active voting is stopped first.
+    Errors while stopping are ignored. If a device fails or no keypad is
+    authorized, the voting is stopped on all devices.
 
+    Returns the number of keypads authorized for voting.
+    """
+    keypads = get_keypads()
+    devices = get_devices()
     ext_mode = options + ';' + callback_url if options else callback_url
-    count = server.voteCollector.prepareVoting(mode + '-' + ext_mode, 0, 0, list(keypads))
-    if count < 0:
-        raise VoteCollectorError(nr=count)
 
-    count = server.voteCollector.startVoting()
-    if count < 0:
-        raise VoteCollectorError(nr=count)
+    def start(server, device_ranges):
+        batch = CommandBatch(server)
+        if stop:
+            batch.add('voteCollector.stopVoting', check=False)
+        device_keypads = keypads if device_ranges is None else [
+            keypad_id for keypad_id in keypads if in_ranges(keypad_id, device_ranges)]
+        if not device_keypads:
+            # The device has no keypads in this voting.
+            if stop:
+                batch.send()
+            return 0
 
-    return count
+        # Use the range arguments if all keypads form one contiguous range.
+        # Otherwise the device needs the full list of keypad ids.
+        ranges = get_keypad_ranges(device_keypads)
+        if len(ranges) == 1:
+            first, last = ranges[0]
+            keypad_list = []
+        else:
+            first = last = 0
+            keypad_list = device_keypads
+
+        batch.add('voteCollector.prepareVoting', mode + '-' + ext_mode, first, last, keypad_list)
+        batch.add('voteCollector.startVoting')
+        return batch.send()[-1]
+
+    results = call_devices(start, devices)
+    if any(isinstance(result, VoteCollectorError) for result in results) or not any(results):
+        # A device executes all commands of a batch even if one fails, so
+        # every device may be voting now.
+        stop_devices(devices)
+        check_results(devices, results)
+        raise VoteCollectorError(nr=-4)
+    return sum(results)
 
 
+def stop_devices(devices):
+    """
+    Stops the voting on the devices in parallel and ignores errors.
+    """
+    call_devices(lambda server, ranges: server.call('voteCollector.stopVoting'), devices)
+
+
+@metrics.observe_xmlrpc
 def stop_voting():
-    server = get_server()
-    server.voteCollector.stopVoting()
+    """
+    Stops the voting on all devices in parallel.
+    """
+    devices = get_devices()
+    results = call_devices(lambda server, ranges: server.call('voteCollector.stopVoting'), devices)
+    check_results(devices, results)
     return True
 
 
+@metrics.observe_xmlrpc
 def get_voting_status():
     """
     Returns voting status as a list: [elapsed_seconds, votes_received]
+
+    The votes of all devices are added up.
     """
-    server = get_server()
-    status = server.voteCollector.getVotingStatus()
-    return status
+    devices = get_devices()
+    results = call_devices(lambda server, ranges: server.call('voteCollector.getVotingStatus'), devices)
+    check_results(devices, results)
+    if len(devices) == 1:
+        return results[0]
+    return [max(result[0] for result in results), sum(result[1] for result in results)]
 
 
+@metrics.observe_xmlrpc
 def get_voting_result():
     """
     Returns the voting result as a list.
+
+    The results of all devices are added up.
     """
-    server = get_server()
-    return server.voteCollector.getVotingResult()
+    devices = get_devices()
+    results = call_devices(lambda server, ranges: server.call('voteCollector.getVotingResult'), devices)
+    check_results(devices, results)
+    if len(devices) == 1:
+        return results[0]
+    return [sum(counts) for counts in zip_longest(*results, fillvalue=0)]
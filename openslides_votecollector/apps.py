@@ -23,12 +23,19 @@ class VoteCollectorAppConfig(AppConfig):
 
         # Import all required stuff.
         from openslides.core.config import config
+        from django.db.models.signals import post_delete, post_save
         from openslides.core.signals import post_permission_creation
+        from openslides.users.models import User
         from openslides.utils.rest_api import router
         from .config_variables import get_config_variables
         from .signals import (
             add_default_seating_plan,
-            add_permissions_to_builtin_groups
+            add_permissions_to_builtin_groups,
+            clear_keypad_cache_on_change,
+            clear_seat_grids_on_change,
+            update_keypad_registry_on_keypad_delete,
+            update_keypad_registry_on_keypad_save,
+            update_keypad_registry_on_user_save
         )
         from .urls import urlpatterns
         from .views import (
@@ -51,6 +58,44 @@ class VoteCollectorAppConfig(AppConfig):
             add_default_seating_plan,
             dispatch_uid='votecollector_add_default_seating_plan'
         )
+        post_save.connect(
+            update_keypad_registry_on_keypad_save,
+            sender=self.get_model('Keypad'),
+            dispatch_uid='votecollector_update_keypad_registry_on_keypad_save'
+        )
+        post_delete.connect(
+            update_keypad_registry_on_keypad_delete,
+            sender=self.get_model('Keypad'),
+            dispatch_uid='votecollector_update_keypad_registry_on_keypad_delete'
+        )
+        post_save.connect(
+            update_keypad_registry_on_user_save,
+            sender=User,
+            dispatch_uid='votecollector_update_keypad_registry_on_user_save'
+        )
+        for sender in (self.get_model('Keypad'), User):
+            post_save.connect(
+                clear_keypad_cache_on_change,
+                sender=sender,
+                dispatch_uid='votecollector_clear_keypad_cache_on_%s_save' % sender._meta.model_name
+            )
+            post_delete.connect(
+                clear_keypad_cache_on_change,
+                sender=sender,
+                dispatch_uid='votecollector_clear_keypad_cache_on_%s_delete' % sender._meta.model_name
+            )
+
+        for sender in (self.get_model('Keypad'), self.get_model('Seat')):
+            post_save.connect(
+                clear_seat_grids_on_change,
+                sender=sender,
+                dispatch_uid='votecollector_clear_seat_grids_on_%s_save' % sender._meta.model_name
+            )
+            post_delete.connect(
+                clear_seat_grids_on_change,
+                sender=sender,
+                dispatch_uid='votecollector_clear_seat_grids_on_%s_delete' % sender._meta.model_name
+            )
 
         # Register viewsets.
         router.register(self.get_model('VoteCollector').get_collection_string(), VotecollectorViewSet)
@@ -0,0 +1,105 @@
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.db import close_old_connections
+
+from openslides.core.config import config
+
+from .voting_session import voting_session
+
+
+class CallbackExecutor:
+    """
+    Processes keypad callbacks in the background.
+
+    If votecollector_async_callbacks is enabled, the callback views answer
+    VoteCollector right after an in-memory validation and hand the callback
+    over to this executor. So a burst of votes does not tie up the worker
+    threads of the server while they wait for the database.
+
+    Django's ORM has no asynchronous API, so the callbacks are processed by a
+    small set of worker threads. All callbacks of one keypad are processed
+    by the same worker, so their order is kept.
+
+    The active voting is read from the shared voting session, so every
+    process validates callbacks against the same voting. Submitted
+    callbacks are counted as pending votes of the session until they are
+    processed.
+    """
+    workers = 4
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executors = None
+        self.pending = set()
+
+    def is_enabled(self):
+        """
+        Returns True if callbacks should be processed asynchronously.
+        """
+        return config['votecollector_async_callbacks'] and voting_session.get().is_active()
+
+    def start_session(self, voting_mode, voting_target):
+        """
+        Starts the shared session of a voting. Callbacks are only validated
+        against this data, so the views need no database query.
+        """
+        voting_session.start(voting_mode, voting_target)
+
+    def stop_session(self):
+        """
+        Stops the shared session and processes all pending callbacks of this
+        process. Use VotingSession.wait_pending() to wait for the other
+        processes.
+        """
+        voting_session.stop()
+        self.wait()
+
+    def is_target(self, target_id):
+        """
+        Returns True if the given id is the target of the active voting.
+        """
+        session = voting_session.get()
+        return session.is_active() and session.voting_target == int(target_id)
+
+    def submit(self, keypad_id, function, args=(), kwargs={}):
+        """
+        Schedules the function with the given arguments for the given keypad.
+        """
+        # Count the vote before it is submitted, so it is not written before.
+        voting_session.add_pending()
+        with self.lock:
+            if self.executors is None:
+                self.executors = [ThreadPoolExecutor(1) for i in range(self.workers)]
+            executor = self.executors[int(keypad_id) % self.workers]
+            future = executor.submit(self.run, function, args, kwargs)
+            self.pending.add(future)
+        future.add_done_callback(self.done)
+
+    def run(self, function, args, kwargs):
+        """
+        Runs the function in a worker thread.
+        """
+        try:
+            function(*args, **kwargs)
+        except Exception as e:
+            warnings.warn('Processing a keypad callback failed: %s' % e, RuntimeWarning)
+        finally:
+            close_old_connections()
+
+    def done(self, future):
+        with self.lock:
+            self.pending.discard(future)
+        voting_session.add_pending(-1)
+
+    def wait(self, timeout=None):
+        """
+        Waits until all submitted callbacks are processed.
+        """
+        with self.lock:
+            pending = list(self.pending)
+        wait(pending, timeout)
+
+
+callback_executor = CallbackExecutor()
@@ -0,0 +1,463 @@
+import platform
+import statistics
+import threading
+import time
+
+from channels.asgi import get_channel_layer
+from django.apps.registry import Apps
+from django.db import connection, models, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from openslides.assignments.models import Assignment
+from openslides.core.config import config
+from openslides.motions.models import Motion
+from openslides.users.models import User
+
+from . import __version__
+from .api import clear_keypad_cache
+from .async_callbacks import callback_executor
+from .keypad_registry import keypad_registry
+from .models import (
+    VOTE_VALUES,
+    AssignmentPollKeypadConnection,
+    Keypad,
+    MotionPollKeypadConnection,
+    Seat,
+    VoteCollector,
+    VoteValueField,
+)
+from .seat_grid import seat_grids
+from .seating_plan import setup_plan
+from .simulator import LoadGenerator, SimulatorServer, VoteCollectorSimulator, get_percentile
+from .tally import get_election_result, poll_tallies
+
+
+def create_fixtures(keypads, seats=None):
+    """
+    Creates the given number of users with keypads and a motion poll. The
+    keypads get the seats of the given list of seat ids. Returns the poll.
+    """
+    User.objects.bulk_create(
+        User(username='benchmark%d' % i, first_name='Benchmark', last_name=str(i), default_password='benchmark')
+        for i in range(keypads))
+    users = User.objects.filter(username__startswith='benchmark').order_by('pk')
+    Keypad.objects.bulk_create(
+        Keypad(keypad_id=index + 1, user=user, seat_id=seats[index] if seats else None)
+        for index, user in enumerate(users))
+    clear_keypad_cache()
+
+    motion = Motion(title='Benchmark', text='Benchmark')
+    motion.save()
+    return motion.create_poll()
+
+
+def start_session(poll):
+    """
+    Sets up a motion voting for the given poll without a device.
+    """
+    VoteCollector.objects.filter(id=1).update(
+        voting_mode='MotionPoll', voting_target=poll.id, votes_received=0, is_voting=True)
+    keypad_registry.build()
+    callback_executor.start_session('MotionPoll', poll.id)
+
+
+class AutoupdateDrain:
+    """
+    Discards all autoupdate messages while no server consumes them, so the
+    channel layer does not fill up during a benchmark.
+    """
+    def __enter__(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.running = False
+        self.thread.join()
+
+    def run(self):
+        channel_layer = get_channel_layer()
+        while self.running:
+            channel, message = channel_layer.receive(['autoupdate.send_data'])
+            if channel is None:
+                time.sleep(0.001)
+
+
+def run_requests(requests, concurrency):
+    """
+    Posts the given (path, data) tuples with the given number of concurrent
+    clients. Returns the elapsed time in seconds.
+    """
+    requests = iter(requests)
+    lock = threading.Lock()
+
+    def run():
+        client = Client()
+        while True:
+            with lock:
+                request = next(requests, None)
+            if request is None:
+                break
+            client.post(*request)
+
+    threads = [threading.Thread(target=run) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def benchmark_callbacks(keypads=500, concurrency=8):
+    """
+    Compares requests/sec of the synchronous and the asynchronous vote
+    callbacks. Every keypad votes once in each run.
+
+    For the asynchronous callbacks 'processed' includes the time until all
+    votes are written.
+    """
+    poll = create_fixtures(keypads)
+    start_session(poll)
+    requests = [
+        ('/votecollector/vote/%d/%d/' % (poll.id, keypad_id), {'value': 'YNA'[keypad_id % 3], 'votes': keypad_id})
+        for keypad_id in range(1, keypads + 1)]
+
+    results = {}
+    with AutoupdateDrain():
+        for name, async_callbacks in (('sync', False), ('async', True)):
+            MotionPollKeypadConnection.objects.all().delete()
+            config['votecollector_async_callbacks'] = async_callbacks
+            start = time.perf_counter()
+            results[name] = keypads / run_requests(requests, concurrency)
+            if async_callbacks:
+                callback_executor.wait()
+                results['async (processed)'] = keypads / (time.perf_counter() - start)
+            if MotionPollKeypadConnection.objects.count() != keypads:
+                raise RuntimeError('Not all votes were written.')
+    config['votecollector_async_callbacks'] = False
+    return results
+
+
+def create_election(candidates, connections):
+    """
+    Creates an election poll with the given number of candidates and keypad
+    connections. The votes are spread over all candidates and invalid votes.
+    Returns the poll.
+    """
+    assignment = Assignment.objects.create(title='Benchmark', open_posts=1)
+    for index in range(candidates):
+        user, created = User.objects.get_or_create(
+            username='candidate%d' % index, defaults={'last_name': str(index), 'default_password': 'benchmark'})
+        assignment.set_candidate(user)
+    poll = assignment.create_poll()
+    candidate_ids = list(poll.get_options().values_list('candidate_id', flat=True)) + [None]
+    AssignmentPollKeypadConnection.objects.bulk_create(
+        AssignmentPollKeypadConnection(
+            poll=poll, value=str(index % len(candidate_ids)), candidate_id=candidate_ids[index % len(candidate_ids)])
+        for index in range(connections))
+    return poll
+
+
+def count_election_in_python(poll):
+    """
+    Computes the result of an election by iterating all keypad connections.
+    This was done before the database computed the result.
+    """
+    result = {
+        'invalid': 0,
+        'valid': 0
+    }
+    for option in poll.get_options().all():
+        result['vote_' + str(option.candidate_id)] = 0
+    for conn in AssignmentPollKeypadConnection.objects.filter(poll_id=poll.id):
+        key = 'vote_' + str(conn.candidate_id)
+        if conn.candidate and key in result:
+            result[key] += 1
+            result['valid'] += 1
+        else:
+            result['invalid'] += 1
+    return result
+
+
+def count_election_in_database(poll):
+    """
+    Computes the result of an election with one grouped query.
+    """
+    counts = poll_tallies.count('AssignmentPoll', poll.id)
+    return get_election_result(counts, poll.get_options().values_list('candidate_id', flat=True))
+
+
+def benchmark_election_result(sizes=(100, 1000, 10000), candidates=5, repeat=5):
+    """
+    Compares the computation of an election result in Python and in the
+    database. Returns a dictionary which maps the number of connections to
+    the best time of both in milliseconds.
+    """
+    results = {}
+    for size in sizes:
+        poll = create_election(candidates, size)
+        times = {}
+        for name, function in (('python', count_election_in_python), ('database', count_election_in_database)):
+            best = None
+            for i in range(repeat):
+                start = time.perf_counter()
+                result = function(poll)
+                elapsed = (time.perf_counter() - start) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            times[name] = (best, result)
+        if times['python'][1] != times['database'][1]:
+            raise RuntimeError('Election results differ.')
+        results[size] = {name: value[0] for name, value in times.items()}
+    return results
+
+
+class Measurement:
+    """
+    Latencies and SQL query counts of one operation.
+    """
+    def __init__(self, operation, keypads):
+        self.operation = operation
+        self.keypads = keypads
+        self.latencies = []
+        self.queries = []
+
+    def measure(self, function, *args, **kwargs):
+        """
+        Calls the function and records its latency and the number of its
+        queries. Returns the result of the function.
+        """
+        # The query log is limited, so it is cleared before each call.
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            self.latencies.append(time.perf_counter() - start)
+        self.queries.append(len(queries))
+        return result
+
+    def get_result(self):
+        """
+        Returns a dictionary with the throughput (operations/sec), the
+        latency (in milliseconds) and the query counts.
+        """
+        latencies = sorted(self.latencies)
+        return {
+            'operation': self.operation,
+            'keypads': self.keypads,
+            'samples': len(latencies),
+            'throughput': round(len(latencies) / sum(latencies), 1),
+            'latency': {
+                'mean': round(statistics.mean(latencies) * 1000, 3),
+                'p50': round(get_percentile(latencies, 50) * 1000, 3),
+                'p90': round(get_percentile(latencies, 90) * 1000, 3),
+                'p99': round(get_percentile(latencies, 99) * 1000, 3),
+                'max': round(latencies[-1] * 1000, 3),
+            },
+            'queries': {
+                'mean': round(statistics.mean(self.queries), 2),
+                'max': max(self.queries),
+            },
+        }
+
+
+def create_suite_fixtures(keypads, candidates=5):
+    """
+    Replaces the seats, the keypads and their users with the given number
+    of each and creates a motion poll and an election poll. Returns a tuple
+    with both polls and the agenda item of the motion.
+    """
+    Keypad.objects.all().delete()
+    User.objects.filter(username__startswith='benchmark').delete()
+    columns = 50
+    setup_plan({'blocks': (columns // 2, columns // 2), 'rows': -(-keypads // columns)}, replace=True)
+    seats = list(Seat.objects.values_list('pk', flat=True)[:keypads])
+    seat_grids.clear()
+    motion_poll = create_fixtures(keypads, seats)
+    election_poll = create_election(candidates, 0)
+    return motion_poll, election_poll, motion_poll.motion.agenda_item
+
+
+def run_suite(keypads, client, repeat):
+    """
+    Measures the callbacks, the start views, the result view and the
+    anonymization for the given number of keypads. Returns a list of
+    results, see Measurement.get_result().
+    """
+    motion_poll, election_poll, item = create_suite_fixtures(keypads)
+    meta = {'SERVER_NAME': 'localhost', 'SERVER_PORT': 8000}
+    measurements = []
+
+    def measure(operation, requests, prepare=None):
+        measurement = Measurement(operation, keypads)
+        for method, path, data in requests:
+            if prepare is not None:
+                prepare()
+            response = measurement.measure(getattr(client, method), path, data, **meta)
+            if response.status_code != 200 or b'"error"' in response.content:
+                raise RuntimeError('%s failed: %s' % (path, response.content.decode()))
+        measurements.append(measurement)
+
+    def restore_keypads():
+        MotionPollKeypadConnection.objects.all().delete()
+        MotionPollKeypadConnection.objects.bulk_create(
+            MotionPollKeypadConnection(poll=motion_poll, keypad=keypad, value='Y') for keypad in Keypad.objects.all())
+
+    # Motion poll.
+    measure('StartYNA', [('get', '/votecollector/start_yna/%d/' % motion_poll.id, {})] * repeat)
+    measure('VoteCallback', [
+        ('post', '/votecollector/vote/%d/%d/' % (motion_poll.id, keypad_id),
+         {'value': 'YNA'[keypad_id % 3], 'votes': keypad_id, 'elapsed': 1, 'battery': 80})
+        for keypad_id in range(1, keypads + 1)])
+    measure('VotingResult', [('get', '/votecollector/result_yna/%d/' % motion_poll.id, {})] * repeat)
+    measure('anonymize_votes', [(
+        'post', '/rest/%s/anonymize_votes/' % MotionPollKeypadConnection.get_collection_string(),
+        {'poll_id': motion_poll.id})] * repeat, prepare=restore_keypads)
+
+    # Election.
+    measure('StartElection', [('get', '/votecollector/start_election/%d/10/' % election_poll.id, {})] * repeat)
+    measure('CandidateCallback', [
+        ('post', '/votecollector/candidate/%d/%d/' % (election_poll.id, keypad_id),
+         {'value': keypad_id % 6, 'votes': keypad_id, 'elapsed': 1, 'battery': 80})
+        for keypad_id in range(1, keypads + 1)])
+
+    # List of speakers.
+    client.get('/votecollector/start_speaker_list/%d/' % item.id, **meta)
+    measure('SpeakerCallback', [
+        ('post', '/votecollector/speaker/%d/%d/' % (item.id, keypad_id), {'value': 'YN'[keypad_id % 2]})
+        for keypad_id in range(1, keypads + 1)])
+
+    # Every ping resets all keypads which answered the previous one.
+    measure('StartPing', [('get', '/votecollector/start_ping/', {})] * repeat,
+            prepare=lambda: Keypad.objects.update(in_range=True, battery_level=80))
+
+    client.get('/votecollector/stop/', **meta)
+    return [measurement.get_result() for measurement in measurements]
+
+
+def benchmark_suite(sizes=(100, 1000, 5000), repeat=5):
+    """
+    Runs the benchmark suite for all sizes against a local VoteCollector
+    simulator whose keypads do not vote. Returns a dictionary which can be
+    written as JSON.
+    """
+    simulator = VoteCollectorSimulator(keypads=max(sizes), generator=LoadGenerator(participation=0))
+    server = SimulatorServer(('127.0.0.1', 0), simulator)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    uri = config['votecollector_uri']
+    config['votecollector_uri'] = 'http://127.0.0.1:%d' % server.server_address[1]
+
+    client = Client()
+    client.force_login(User.objects.get(username='admin'))
+    results = []
+    try:
+        with AutoupdateDrain():
+            for size in sizes:
+                results.extend(run_suite(size, client, repeat))
+    finally:
+        config['votecollector_uri'] = uri
+        server.shutdown()
+        server.server_close()
+    return {
+        'version': __version__,
+        'python': platform.python_version(),
+        'database': connection.vendor,
+        'results': results,
+    }
+
+
+# Registry of the models of the storage benchmark. They are not part of the
+# plugin.
+storage_apps = Apps()
+
+
+class LegacyConnection(models.Model):
+    """
+    Keypad connection with the layout before migration 0003: the vote value
+    as string, an index on poll and no unique constraint.
+    """
+    poll_id = models.IntegerField(db_index=True)
+    keypad_id = models.IntegerField(null=True, db_index=True)
+    value = models.CharField(max_length=255)
+    serial_number = models.CharField(null=True, max_length=255)
+
+    class Meta:
+        apps = storage_apps
+        app_label = 'openslides_votecollector'
+        db_table = 'openslides_votecollector_benchmark_legacy'
+
+
+class CompactConnection(models.Model):
+    """
+    Keypad connection with the current layout: the vote value as code and
+    a unique index on (poll, keypad).
+    """
+    poll_id = models.IntegerField()
+    keypad_id = models.IntegerField(null=True, db_index=True)
+    value = VoteValueField()
+    serial_number = models.CharField(null=True, max_length=255)
+
+    class Meta:
+        apps = storage_apps
+        app_label = 'openslides_votecollector'
+        db_table = 'openslides_votecollector_benchmark_compact'
+        unique_together = (('poll_id', 'keypad_id'),)
+
+
+def get_storage_size(model):
+    """
+    Returns a tuple with the size of the table of the model and the size of
+    its indexes in bytes. Raises ValueError if the database is not
+    supported.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_relation_size(%s), pg_indexes_size(%s)', [table, table])
+            return cursor.fetchone()
+        if connection.vendor == 'mysql':
+            cursor.execute('ANALYZE TABLE %s' % connection.ops.quote_name(table))
+            cursor.fetchall()
+            cursor.execute(
+                'SELECT data_length, index_length FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s', [table])
+            return cursor.fetchone()
+        if connection.vendor == 'sqlite':
+            # Needs SQLite with the dbstat virtual table.
+            cursor.execute('SELECT SUM(pgsize) FROM dbstat WHERE name = %s', [table])
+            table_size = cursor.fetchone()[0]
+            cursor.execute(
+                'SELECT SUM(pgsize) FROM dbstat WHERE name IN '
+                '(SELECT name FROM sqlite_master WHERE type = %s AND tbl_name = %s)', ['index', table])
+            return table_size, cursor.fetchone()[0] or 0
+    raise ValueError('Table sizes are not supported for %s.' % connection.vendor)
+
+
+def benchmark_storage(votes=10000, keypads=1000):
+    """
+    Compares the size of the keypad connections in the legacy and in the
+    current layout. The votes are spread over polls with the given number of
+    keypads. Returns a dictionary which maps the layout to the size of the
+    table and the size of its indexes in bytes.
+    """
+    results = {}
+    for name, model in (('legacy', LegacyConnection), ('compact', CompactConnection)):
+        with connection.schema_editor() as editor:
+            editor.create_model(model)
+        try:
+            model.objects.bulk_create(
+                model(
+                    poll_id=index // keypads + 1,
+                    keypad_id=index % keypads + 1,
+                    value=VOTE_VALUES[10 + index % 3],
+                    serial_number='%08d' % ((index % keypads + 1) * 7919 % 100000000))
+                for index in range(votes))
+            table, indexes = get_storage_size(model)
+        finally:
+            with connection.schema_editor() as editor:
+                editor.delete_model(model)
+        results[name] = {'table': table, 'indexes': indexes}
+    return results
@@ -0,0 +1,110 @@
+import threading
+
+from .voting_session import voting_session
+
+
+class Vote:
+    """
+    Vote of a keypad which is in flight or accepted. The response is None
+    until the vote is accepted.
+    """
+    def __init__(self, key, sn, value):
+        self.key = key
+        self.sn = sn
+        self.value = value
+        self.response = None
+        self.done = threading.Event()
+
+
+class CallbackDedup:
+    """
+    Process-wide memory of the votes of the active voting.
+
+    VoteCollector retries a callback if it does not get an answer in time.
+    A retry repeats the poll, the keypad, the serial number (sn) of the
+    keypad and the value. Such a callback is answered from this memory
+    without touching the database or sending an autoupdate. The serial
+    number identifies the keypad, not the message, so a changed value is
+    always processed. Callbacks without serial number are never
+    deduplicated.
+
+    A vote is recorded as in flight before it is processed, so a retry
+    which arrives in the meantime waits for the response of the first
+    callback instead of processing the vote again. Votes which are not
+    accepted are forgotten.
+
+    The memory holds one entry per keypad and is cleared when a voting
+    starts or stops. Every entry belongs to a generation of the voting
+    session, so a process drops its memory if another process started a
+    new voting.
+    """
+    # Seconds a repeated vote waits for a vote in flight.
+    timeout = 5
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.votes = {}
+        self.generation = None
+
+    @staticmethod
+    def get_key(generation, poll_id, keypad_id):
+        return generation, int(poll_id), int(keypad_id)
+
+    def begin(self, poll_id, keypad_id, sn, value):
+        """
+        Records a vote as in flight. Returns a tuple (vote, repeated). If
+        repeated is False, the caller has to process the vote and to call
+        finish() afterwards. Else the vote was recorded by an earlier
+        callback, see wait(). The vote is None if the callback can not be
+        deduplicated.
+        """
+        if sn is None:
+            return None, False
+        generation = voting_session.get().generation
+        try:
+            key = self.get_key(generation, poll_id, keypad_id)
+        except (TypeError, ValueError):
+            return None, False
+        sn, value = str(sn), str(value)
+        with self.lock:
+            if generation != self.generation:
+                # A new voting was started, maybe by another process.
+                self.votes = {}
+                self.generation = generation
+            vote = self.votes.get(key)
+            if vote is not None and (vote.sn, vote.value) == (sn, value):
+                return vote, True
+            vote = self.votes[key] = Vote(key, sn, value)
+        return vote, False
+
+    def wait(self, vote):
+        """
+        Returns the response to a repeated vote. Waits up to timeout seconds
+        if the vote is in flight. Returns None if the vote was not accepted
+        in time. Then it has to be processed again.
+        """
+        vote.done.wait(self.timeout)
+        return vote.response
+
+    def finish(self, vote, response=None):
+        """
+        Marks a vote as processed. Pass the response if the vote was
+        accepted, else the vote is forgotten.
+        """
+        if vote is None:
+            return
+        with self.lock:
+            vote.response = response
+            if response is None and self.votes.get(vote.key) is vote:
+                del self.votes[vote.key]
+        vote.done.set()
+
+    def clear(self):
+        """
+        Forgets all votes.
+        """
+        with self.lock:
+            self.votes = {}
+
+
+callback_dedup = CallbackDedup()
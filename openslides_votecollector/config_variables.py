@@ -1,7 +1,21 @@
+from django.core.exceptions import ValidationError
 from django.utils.translation import ugettext_lazy
 
 from openslides.core.config import ConfigVariable
 
+from .api import parse_devices
+
+
+def validate_devices(value):
+    """
+    Validates the list of VoteCollector devices.
+    """
+    try:
+        parse_devices(value)
+    except ValueError as e:
+        raise ValidationError(str(e))
+
+
 def get_config_variables():
     """
     Generator which yields all config variables of this app.
@@ -29,6 +43,25 @@ def get_config_variables():
         weight=620,
         group='VoteCollector'
     )
+    yield ConfigVariable(
+        name='votecollector_devices',
+        default_value='',
+        input_type='text',
+        label='Several VoteCollector devices',
+        help_text='One device per line with its URL and keypad ranges, e. g. http://10.0.0.2:8030 1-400,801-900. '
+                  'Keypads in no range can not vote. Leave empty to use the URL of VoteCollector for all keypads.',
+        weight=622,
+        group='VoteCollector',
+        validators=(validate_devices,)
+    )
+    yield ConfigVariable(
+        name='votecollector_timeout',
+        default_value=5,
+        input_type='integer',
+        label='Timeout for requests to VoteCollector (in seconds)',
+        weight=625,
+        group='VoteCollector'
+    )
     yield ConfigVariable(
         name='votecollector_vote_started_msg',
         default_value=ugettext_lazy('Please vote now!'),
@@ -63,3 +96,56 @@ def get_config_variables():
         weight=660,
         group='VoteCollector'
     )
+    yield ConfigVariable(
+        name='votecollector_buffer',
+        default_value=False,
+        input_type='boolean',
+        label='Buffer incoming votes',
+        help_text='Incoming votes are collected in memory and written to the database in batches. '
+                  'Recommended for large assemblies.',
+        weight=670,
+        group='VoteCollector'
+    )
+    yield ConfigVariable(
+        name='votecollector_buffer_interval',
+        default_value=500,
+        input_type='integer',
+        label='Flush interval of vote buffer (in milliseconds)',
+        weight=680,
+        group='VoteCollector'
+    )
+    yield ConfigVariable(
+        name='votecollector_buffer_size',
+        default_value=200,
+        input_type='integer',
+        label='Maximum number of buffered votes before flushing',
+        weight=690,
+        group='VoteCollector'
+    )
+    yield ConfigVariable(
+        name='votecollector_async_callbacks',
+        default_value=False,
+        input_type='boolean',
+        label='Process incoming votes asynchronously',
+        help_text='VoteCollector gets an answer immediately and the votes are processed in the background.',
+        weight=700,
+        group='VoteCollector'
+    )
+    yield ConfigVariable(
+        name='votecollector_metrics_token',
+        default_value='',
+        label='Token for the metrics endpoint',
+        help_text='Scrapers can read /votecollector/metrics/?token=<token>. '
+                  'Without a token only managers can read the metrics.',
+        weight=710,
+        group='VoteCollector'
+    )
+    yield ConfigVariable(
+        name='votecollector_trace_threshold',
+        default_value=200,
+        input_type='integer',
+        label='Threshold for slow request traces (in milliseconds)',
+        help_text='Requests which take longer are kept in the trace buffer.',
+        weight=720,
+        group='VoteCollector'
+    )
@@ -0,0 +1,126 @@
+import csv
+
+from django.db import transaction
+from django.utils.translation import ugettext as _
+
+from openslides.users.models import User
+
+from .api import clear_keypad_cache
+from .keypad_registry import keypad_registry
+from .models import Keypad, Seat
+from .seat_grid import seat_grids
+from .utils import inform_changed_data
+
+# Number of keypads which are loaded with one query after the import.
+CHUNK_SIZE = 500
+
+
+def get_full_name(title, first_name, last_name, structure_level):
+    """
+    Returns the name which identifies a user in the import file. The
+    client uses the same format.
+    """
+    return ' '.join(value or '' for value in (title, first_name, last_name, structure_level))
+
+
+class KeypadImport:
+    """
+    Imports keypads from a CSV file with the columns title, first_name,
+    last_name, structure_level, keypad_id and seat_label.
+
+    The file is read line by line. Users, seats and existing keypads are
+    loaded with one query each before the first line is read. All valid
+    lines are inserted with bulk_create in one transaction. Lines with
+    errors are skipped and reported.
+    """
+    def __init__(self):
+        self.users = {}
+        for user_id, title, first_name, last_name, structure_level in User.objects.values_list(
+                'pk', 'title', 'first_name', 'last_name', 'structure_level'):
+            self.users[get_full_name(title, first_name, last_name, structure_level)] = user_id
+        self.seats = dict(Seat.objects.exclude(number='').values_list('number', 'pk'))
+        self.keypad_ids = set()
+        self.user_ids = set()
+        self.seat_ids = set()
+        for keypad_id, user_id, seat_id in Keypad.objects.values_list('keypad_id', 'user_id', 'seat_id'):
+            self.keypad_ids.add(keypad_id)
+            self.user_ids.add(user_id)
+            self.seat_ids.add(seat_id)
+        self.keypads = []
+        self.errors = []
+
+    def read(self, lines, separator=','):
+        """
+        Validates all lines of the file. lines is an iterable of strings, the
+        first line contains the column names.
+        """
+        reader = csv.DictReader(lines, delimiter=separator)
+        for row in reader:
+            errors = []
+            keypad = self.get_keypad(row, errors)
+            if errors:
+                self.errors.append({'line': reader.line_num, 'errors': errors})
+            else:
+                self.keypads.append(keypad)
+
+    def get_keypad(self, row, errors):
+        """
+        Returns an unsaved keypad for a row. Appends all errors to the given
+        list.
+        """
+        keypad = Keypad()
+        try:
+            keypad.keypad_id = int(row.get('keypad_id') or '')
+        except ValueError:
+            errors.append(_('Error: Keypad ID must be a number.'))
+        else:
+            if keypad.keypad_id in self.keypad_ids:
+                errors.append(_('Error: Keypad ID already exists.'))
+
+        if not row.get('first_name') and not row.get('last_name'):
+            errors.append(_('Error: First and last name is required.'))
+        else:
+            keypad.user_id = self.users.get(get_full_name(
+                row.get('title'), row.get('first_name'), row.get('last_name'), row.get('structure_level')))
+            if keypad.user_id is None:
+                errors.append(_('Error: Participant not found.'))
+            elif keypad.user_id in self.user_ids:
+                errors.append(_('Error: Participant already has a keypad.'))
+
+        keypad.seat_id = self.seats.get(row.get('seat_label'))
+        if keypad.seat_id is None:
+            errors.append(_('Error: Seat label does not exists.'))
+        elif keypad.seat_id in self.seat_ids:
+            errors.append(_('Error: Seat ID already assigned to a keypad.'))
+
+        if not errors:
+            # Later lines must not use the same keypad_id, user or seat.
+            self.keypad_ids.add(keypad.keypad_id)
+            self.user_ids.add(keypad.user_id)
+            self.seat_ids.add(keypad.seat_id)
+        return keypad
+
+    def save(self):
+        """
+        Inserts all valid keypads in one transaction and informs the
+        autoupdate system once. Returns the number of imported keypads.
+        """
+        if not self.keypads:
+            return 0
+        keypad_ids = [keypad.keypad_id for keypad in self.keypads]
+        keypads = []
+        with transaction.atomic():
+            Keypad.objects.bulk_create(self.keypads, batch_size=CHUNK_SIZE)
+            # bulk_create does not set the primary keys on all databases.
+            for index in range(0, len(keypad_ids), CHUNK_SIZE):
+                keypads.extend(Keypad.objects.filter(
+                    keypad_id__in=keypad_ids[index:index + CHUNK_SIZE]).select_related('user'))
+            inform_changed_data(keypads)
+
+        # bulk_create does not send post_save signals.
+        clear_keypad_cache()
+        for keypad in keypads:
+            keypad_registry.update_keypad(keypad)
+        keypad_registry.invalidate()
+        seat_grids.invalidate()
+        return len(keypads)
@@ -0,0 +1,174 @@
+import threading
+from collections import namedtuple
+
+from django.core.cache import cache
+
+from .models import Keypad
+
+
+class KeypadRecord(namedtuple('KeypadRecord', 'pk keypad_id user_id seat_id is_active')):
+    """
+    Immutable snapshot of a keypad. Anonymous keypads are always active.
+    """
+    __slots__ = ()
+
+    def get_keypad(self):
+        """
+        Returns an unsaved keypad instance with the values of this record.
+        """
+        return Keypad(id=self.pk, keypad_id=self.keypad_id, user_id=self.user_id, seat_id=self.seat_id)
+
+
+class KeypadRegistry:
+    """
+    Process-wide registry which maps keypad_id to a KeypadRecord.
+
+    The registry is built when a voting starts or on the first lookup and
+    kept in sync through the post_save and post_delete signals of Keypad and
+    User (see signals.py).
+
+    The signals only reach the process which changed the keypad or the user.
+    So every change increments a version in Django's cache, which has to be
+    shared by all processes. A registry built with an older version is
+    rebuilt on its next lookup.
+    """
+    version_key = 'votecollector_keypad_registry_version'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = None
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    def build(self):
+        """
+        Loads all keypads from the database.
+        """
+        version = self.get_version()
+        records = {}
+        queryset = Keypad.objects.values_list('pk', 'keypad_id', 'user_id', 'seat_id', 'user__is_active')
+        for pk, keypad_id, user_id, seat_id, is_active in queryset:
+            records[keypad_id] = KeypadRecord(pk, keypad_id, user_id, seat_id, is_active is not False)
+        with self.lock:
+            self.records = records
+            self.version = version
+
+    def clear(self):
+        """
+        Drops all records. The next lookup builds the registry again.
+        """
+        with self.lock:
+            self.records = None
+
+    def get(self, keypad_id):
+        """
+        Returns the record for the given keypad_id or None if there is no
+        such keypad.
+        """
+        keypad_id = int(keypad_id)
+        records = self.records
+        if records is None or self.version != self.get_version():
+            # The registry is not built yet or another process changed a
+            # keypad or a user.
+            self.build()
+            records = self.records
+        record = records.get(keypad_id)
+        with self.lock:
+            if record is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return record
+
+    def get_version(self):
+        """
+        Returns the current version of the keypads.
+        """
+        return cache.get(self.version_key, 0)
+
+    def invalidate(self):
+        """
+        Increments the version of the keypads after a change, so the
+        registries of all other processes are rebuilt. The records of this
+        process have to be updated before.
+        """
+        try:
+            version = cache.incr(self.version_key)
+        except ValueError:
+            version = 1
+            cache.set(self.version_key, version, None)
+        with self.lock:
+            if self.version == version - 1:
+                # No other process changed the keypads in the meantime.
+                self.version = version
+
+    def get_stats(self):
+        """
+        Returns a dictionary with the hit and miss counts and the number of
+        records.
+        """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self.records) if self.records is not None else 0,
+            }
+
+    def get_record(self, keypad, is_active=None):
+        """
+        Returns a record for the given keypad instance.
+        """
+        if is_active is None:
+            is_active = keypad.user_id is None or keypad.user.is_active
+        return KeypadRecord(keypad.pk, keypad.keypad_id, keypad.user_id, keypad.seat_id, is_active)
+
+    def update_keypad(self, keypad):
+        """
+        Updates the record of a saved keypad.
+        """
+        with self.lock:
+            if self.records is None:
+                return
+            record = self.records.get(keypad.keypad_id)
+            if record is None or record.pk != keypad.pk:
+                # New keypad or changed keypad_id.
+                self.remove(keypad.pk)
+                record = None
+            if record is not None and record.user_id == keypad.user_id:
+                # Do not query the user if it has not changed.
+                self.records[keypad.keypad_id] = self.get_record(keypad, record.is_active)
+            else:
+                self.records[keypad.keypad_id] = self.get_record(keypad)
+
+    def delete_keypad(self, keypad):
+        """
+        Removes the record of a deleted keypad.
+        """
+        with self.lock:
+            if self.records is not None:
+                self.remove(keypad.pk)
+
+    def update_user(self, user):
+        """
+        Updates the active state of the keypad of a saved user.
+        """
+        with self.lock:
+            if self.records is None:
+                return
+            for keypad_id, record in self.records.items():
+                if record.user_id == user.pk:
+                    self.records[keypad_id] = record._replace(is_active=user.is_active)
+                    break
+
+    def remove(self, pk):
+        """
+        Removes the record with the given keypad pk. The lock has to be held.
+        """
+        for keypad_id, record in self.records.items():
+            if record.pk == pk:
+                del self.records[keypad_id]
+                break
+
+
+keypad_registry = KeypadRegistry()
@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from ...benchmark import benchmark_callbacks, benchmark_election_result, benchmark_storage, benchmark_suite
+
+
+class Command(BaseCommand):
+    """
+    Command to run the benchmarks of the VoteCollector plugin.
+    """
+    help = 'Runs the benchmarks of the VoteCollector plugin in a temporary test database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'benchmarks',
+            nargs='*',
+            choices=('callbacks', 'election', 'suite', 'storage'),
+            help='Benchmarks to run (Default: all).'
+        )
+        parser.add_argument(
+            '--keypads',
+            type=int,
+            default=500,
+            help='Number of keypads (Default: 500).'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Number of concurrent requests (Default: 8).'
+        )
+        parser.add_argument(
+            '--sizes',
+            default='100,1000,5000',
+            help='Comma separated numbers of keypads of the suite (Default: 100,1000,5000).'
+        )
+        parser.add_argument(
+            '--votes',
+            type=int,
+            default=10000,
+            help='Number of votes of the storage benchmark (Default: 10000).'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results of the suite as JSON to this file.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('Invalid sizes %s.' % options['sizes'])
+        if connection.vendor == 'sqlite' and not connection.settings_dict['TEST']['NAME']:
+            # Concurrent requests need a file database. In-memory databases
+            # of SQLite lock whole tables.
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.gettempdir(), 'votecollector_benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        benchmarks = options['benchmarks'] or ('callbacks', 'election', 'suite', 'storage')
+        try:
+            if 'callbacks' in benchmarks:
+                results = benchmark_callbacks(keypads=options['keypads'], concurrency=options['concurrency'])
+                for name, value in results.items():
+                    self.stdout.write('%-20s %10.1f requests/sec' % (name, value))
+            if 'election' in benchmarks:
+                results = benchmark_election_result()
+                for size, times in sorted(results.items()):
+                    for name, value in sorted(times.items()):
+                        self.stdout.write('%-20s %10.1f ms' % ('election %s %d' % (name, size), value))
+            if 'suite' in benchmarks:
+                results = benchmark_suite(sizes=sizes)
+                for result in results['results']:
+                    self.stdout.write('%-20s %5d keypads %10.1f ops/sec  p50 %8.2f ms  p99 %8.2f ms  %6.1f queries' % (
+                        result['operation'], result['keypads'], result['throughput'],
+                        result['latency']['p50'], result['latency']['p99'], result['queries']['mean']))
+                if options['output']:
+                    with open(options['output'], 'w') as output:
+                        json.dump(results, output, indent=2, sort_keys=True)
+            if 'storage' in benchmarks:
+                try:
+                    results = benchmark_storage(votes=options['votes'])
+                except (ValueError, DatabaseError) as e:
+                    raise CommandError('Cannot measure the table sizes: %s' % e)
+                for name in ('legacy', 'compact'):
+                    self.stdout.write('%-20s %10.1f KiB table %10.1f KiB indexes' % (
+                        'storage %s %d' % (name, options['votes']),
+                        results[name]['table'] / 1024, results[name]['indexes'] / 1024))
+                legacy = results['legacy']['table'] + results['legacy']['indexes']
+                compact = results['compact']['table'] + results['compact']['indexes']
+                self.stdout.write('%-20s %10.1f %%' % ('storage reduction', (1 - compact / legacy) * 100))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import Seat
+from ...seating_plan import LAYOUTS, setup_plan
+
+
+class Command(BaseCommand):
+    """
+    Command to create the seating plan from a layout.
+    """
+    help = 'Creates the seating plan from a named layout or a JSON file with a layout.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'layout',
+            help='Name of the layout (%s) or path to a JSON file.' % ', '.join(sorted(LAYOUTS))
+        )
+        parser.add_argument(
+            '--replace',
+            action='store_true',
+            help='Delete all existing seats. Keypads lose their seats.'
+        )
+
+    def handle(self, *args, **options):
+        name = options['layout']
+        if name in LAYOUTS:
+            layout = LAYOUTS[name]
+        else:
+            try:
+                with open(name) as layout_file:
+                    layout = json.load(layout_file)
+            except (OSError, ValueError) as e:
+                raise CommandError('Unknown layout %s: %s' % (name, e))
+
+        if not options['replace'] and Seat.objects.exists():
+            raise CommandError('There are already seats. Use --replace to delete them.')
+        try:
+            count = setup_plan(layout, replace=options['replace'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise CommandError('Invalid layout: %s' % e)
+        self.stdout.write('%d seats created.' % count)
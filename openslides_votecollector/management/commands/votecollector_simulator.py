@@ -0,0 +1,170 @@
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...simulator import DISTRIBUTIONS, LoadGenerator, SimulatorServer, VoteCollectorSimulator
+
+
+def parse_mix(value):
+    """
+    Parses a vote mix like 'Y=60,N=30,A=10'.
+    """
+    mix = {}
+    for item in value.split(','):
+        key, equals, weight = item.partition('=')
+        try:
+            mix[key.strip()] = float(weight)
+        except ValueError:
+            raise CommandError('Invalid vote mix %s.' % value)
+    return mix
+
+
+def parse_battery(value):
+    """
+    Parses a range of battery levels like '20-100' or 'none'.
+    """
+    if value == 'none':
+        return None
+    try:
+        low, high = (int(level) for level in value.split('-'))
+    except ValueError:
+        raise CommandError('Invalid battery levels %s.' % value)
+    return low, high
+
+
+class Command(BaseCommand):
+    """
+    Command to run a local VoteCollector simulator.
+    """
+    help = ('Runs a VoteCollector simulator. The simulated keypads send their votes to OpenSlides '
+            'when a voting starts. Set the URL of VoteCollector to the address of the simulator.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--host',
+            default='127.0.0.1',
+            help='Host of the simulator (Default: 127.0.0.1).'
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8030,
+            help='Port of the simulator (Default: 8030).'
+        )
+        parser.add_argument(
+            '--keypads',
+            type=int,
+            default=100,
+            help='Number of keypads in range of each device (Default: 100).'
+        )
+        parser.add_argument(
+            '--first-keypad',
+            type=int,
+            default=1,
+            help='Id of the first keypad in range (Default: 1).'
+        )
+        parser.add_argument(
+            '--devices',
+            type=int,
+            default=1,
+            help='Number of simulated devices on consecutive ports. Each device gets the next '
+                 'keypads in range (Default: 1).'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Seconds over which the votes arrive (Default: 10).'
+        )
+        parser.add_argument(
+            '--distribution',
+            choices=DISTRIBUTIONS,
+            default='uniform',
+            help='Arrival distribution of the votes (Default: uniform).'
+        )
+        parser.add_argument(
+            '--mix',
+            default='',
+            help="Weights of the keys, e. g. 'Y=60,N=30,A=10'. The key ? sends invalid entries "
+                 "(Default: all keys of the voting mode equally)."
+        )
+        parser.add_argument(
+            '--participation',
+            type=float,
+            default=1.0,
+            help='Probability that a keypad votes (Default: 1.0).'
+        )
+        parser.add_argument(
+            '--retries',
+            type=int,
+            default=2,
+            help='Retries of failed callbacks (Default: 2).'
+        )
+        parser.add_argument(
+            '--battery',
+            default='20-100',
+            help="Range of battery levels sent by the keypads or 'none' (Default: 20-100)."
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='Number of concurrent callbacks (Default: 16).'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Seed of the random generator for reproducible runs.'
+        )
+
+    def handle(self, *args, **options):
+        if options['devices'] < 1:
+            raise CommandError('At least one device is required.')
+        mix = parse_mix(options['mix']) if options['mix'] else None
+        battery = parse_battery(options['battery'])
+        servers = []
+        try:
+            for index in range(options['devices']):
+                generator = LoadGenerator(
+                    duration=options['duration'],
+                    distribution=options['distribution'],
+                    mix=mix,
+                    participation=options['participation'],
+                    retries=options['retries'],
+                    battery=battery,
+                    concurrency=options['concurrency'],
+                    seed=options['seed'] + index if options['seed'] is not None else None,
+                    on_finish=self.report)
+                first = options['first_keypad'] + index * options['keypads']
+                simulator = VoteCollectorSimulator(keypads=options['keypads'], generator=generator, first_keypad=first)
+                try:
+                    server = SimulatorServer((options['host'], options['port'] + index), simulator)
+                except OSError as e:
+                    raise CommandError('Cannot start the simulator: %s' % e)
+                servers.append((server, generator))
+                self.stdout.write('VoteCollector simulator with keypads %d-%d at http://%s:%d/' % (
+                    first, first + options['keypads'] - 1, options['host'], options['port'] + index))
+            if len(servers) > 1:
+                self.stdout.write('Set the list of VoteCollector devices to:')
+                for server, generator in servers:
+                    simulator = server.instance
+                    self.stdout.write('http://%s:%d %d-%d' % (
+                        options['host'], server.server_address[1],
+                        simulator.first_keypad, simulator.first_keypad + simulator.keypads - 1))
+            for server, generator in servers[1:]:
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+            servers[0][0].serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for server, generator in servers:
+                generator.stop()
+                server.server_close()
+
+    def report(self, voting, stats):
+        """
+        Writes the statistics of a voting.
+        """
+        self.stdout.write('%s voting to %s with %d keypads:' % (voting.mode, voting.url, len(voting.keypads)))
+        for key, value in sorted(stats.items()):
+            self.stdout.write('  %-40s %s' % (key, value))
@@ -0,0 +1,218 @@
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.db import connection
+
+from .tracing import tracer
+
+# Upper bounds of the latency buckets in seconds.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Upper bounds of the buckets of database queries per callback.
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def format_labels(names, values):
+    """
+    Returns the labels of a sample, e. g. {view="VoteCallback"}.
+    """
+    if not names:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(names, values))
+
+
+class Counter:
+    """
+    Counter with labels.
+    """
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def collect(self, process):
+        """
+        Yields the lines of all samples with the given process label.
+        """
+        with self.lock:
+            values = sorted(self.values.items())
+        names = ('process',) + self.labelnames
+        for labels, value in values:
+            yield '%s%s %s' % (self.name, format_labels(names, (process,) + labels), value)
+
+
+class Histogram(Counter):
+    """
+    Histogram with labels and fixed buckets.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value, *labels):
+        with self.lock:
+            counts = self.values.get(labels)
+            if counts is None:
+                # One count per bucket, the count of all values and their sum.
+                counts = self.values[labels] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            counts[-2] += 1
+            counts[-1] += value
+
+    def collect(self, process):
+        with self.lock:
+            values = sorted((labels, list(counts)) for labels, counts in self.values.items())
+        names = ('process',) + self.labelnames
+        for labels, counts in values:
+            labels = (process,) + labels
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield '%s_bucket%s %d' % (self.name, format_labels(names + ('le',), labels + (bound,)), cumulative)
+            yield '%s_bucket%s %d' % (self.name, format_labels(names + ('le',), labels + ('+Inf',)), counts[-2])
+            yield '%s_count%s %d' % (self.name, format_labels(names, labels), counts[-2])
+            yield '%s_sum%s %s' % (self.name, format_labels(names, labels), counts[-1])
+
+
+class Metrics:
+    """
+    Process-wide metrics of the plugin in the text format of Prometheus.
+
+    Every worker process keeps its own metrics. All samples have the label
+    process with the process id, so the series of the workers do not mix
+    and can be summed up by the monitoring system.
+
+    Updating a metric costs a lock and a dictionary lookup, so the metrics
+    are always collected. The database queries are only counted for every
+    query_sample_rate-th callback because counting needs Django's debug
+    cursor.
+    """
+    query_sample_rate = 10
+
+    def __init__(self):
+        self.samples = itertools.count()
+        self.callback_seconds = Histogram(
+            'votecollector_callback_seconds',
+            'Latency of the keypad callbacks until VoteCollector gets the answer.',
+            ('view',))
+        self.callback_queries = Histogram(
+            'votecollector_callback_queries',
+            'Database queries per processed keypad callback (sampled).',
+            ('view',), QUERY_BUCKETS)
+        self.votes = Counter(
+            'votecollector_votes_total',
+            'Keypad callbacks by result (accepted, invalid or rejected) and reason.',
+            ('view', 'result', 'reason'))
+        self.dedup_hits = Counter(
+            'votecollector_callback_dedup_hits_total',
+            'Repeated keypad votes answered without processing them again.',
+            ('view',))
+        self.xmlrpc_seconds = Histogram(
+            'votecollector_xmlrpc_seconds',
+            'Latency of the calls to VoteCollector.',
+            ('function',))
+        self.xmlrpc_errors = Counter(
+            'votecollector_xmlrpc_errors_total',
+            'Failed calls to VoteCollector.',
+            ('function',))
+        self.autoupdates = Counter(
+            'votecollector_autoupdates_total',
+            'Autoupdate messages sent by the callbacks and the background writers. '
+            'Use rate() for messages per second.')
+        self.metrics = (
+            self.callback_seconds, self.callback_queries, self.votes, self.dedup_hits,
+            self.xmlrpc_seconds, self.xmlrpc_errors, self.autoupdates)
+
+    def count_vote(self, view, result, reason=''):
+        """
+        Counts a processed keypad callback.
+        """
+        self.votes.inc(view, result, reason)
+
+    @contextmanager
+    def time_callback(self, view):
+        """
+        Measures the latency of a callback view.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.callback_seconds.observe(time.perf_counter() - start, view)
+
+    @contextmanager
+    def count_queries(self, view):
+        """
+        Counts the database queries of a sample of the processed callbacks.
+        """
+        if next(self.samples) % self.query_sample_rate:
+            yield
+            return
+        force_debug_cursor = connection.force_debug_cursor
+        connection.force_debug_cursor = True
+        connection.queries_log.clear()
+        try:
+            yield
+        finally:
+            connection.force_debug_cursor = force_debug_cursor
+            self.callback_queries.observe(len(connection.queries_log), view)
+            connection.queries_log.clear()
+
+    def observe_xmlrpc(self, function):
+        """
+        Decorator for the functions of api.py which call VoteCollector. The
+        calls are traced, too.
+        """
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with tracer.span(function.__name__):
+                    return function(*args, **kwargs)
+            except Exception:
+                self.xmlrpc_errors.inc(function.__name__)
+                raise
+            finally:
+                self.xmlrpc_seconds.observe(time.perf_counter() - start, function.__name__)
+        return wrapper
+
+    def render(self, values=()):
+        """
+        Returns all metrics as text. The argument values is a list of
+        (name, type, documentation, value) tuples of metrics which are read
+        by the caller, e. g. the size of the keypad registry.
+        """
+        # Read the process id here, the process may be forked after import.
+        process = os.getpid()
+        lines = []
+        for metric in self.metrics:
+            lines.append('# HELP %s %s' % (metric.name, metric.documentation))
+            lines.append('# TYPE %s %s' % (metric.name, metric.type))
+            lines.extend(metric.collect(process))
+        for name, metric_type, documentation, value in values:
+            lines.append('# HELP %s %s' % (name, documentation))
+            lines.append('# TYPE %s %s' % (name, metric_type))
+            lines.append('%s%s %s' % (name, format_labels(('process',), (process,)), value))
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openslides_votecollector', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollTally',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('voting_mode', models.CharField(max_length=50)),
+                ('poll_id', models.IntegerField()),
+                ('counts', jsonfield.fields.JSONField(default=dict)),
+            ],
+            options={
+                'default_permissions': (),
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='polltally',
+            unique_together=set([('voting_mode', 'poll_id')]),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+VOTE_VALUES = ('0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'Y', 'N', 'A')
+
+CONNECTION_MODELS = ('MotionPollKeypadConnection', 'AssignmentPollKeypadConnection')
+
+
+def encode_values(apps, schema_editor):
+    """
+    Writes the code of every vote value. Connections with an unknown value
+    can not be shown or counted and are deleted.
+    """
+    for model_name in CONNECTION_MODELS:
+        model = apps.get_model('openslides_votecollector', model_name)
+        for code, value in enumerate(VOTE_VALUES):
+            model.objects.filter(value=value).update(value_code=code)
+        model.objects.filter(value_code=None).delete()
+
+
+def decode_values(apps, schema_editor):
+    for model_name in CONNECTION_MODELS:
+        model = apps.get_model('openslides_votecollector', model_name)
+        for code, value in enumerate(VOTE_VALUES):
+            model.objects.filter(value_code=code).update(value=value)
+
+
+def remove_duplicates(apps, schema_editor):
+    """
+    Keeps only the latest connection of a keypad per poll. Anonymized
+    connections (without keypad) are kept.
+    """
+    for model_name in CONNECTION_MODELS:
+        model = apps.get_model('openslides_votecollector', model_name)
+        latest = set()
+        duplicates = []
+        for pk, poll_id, keypad_id in model.objects.exclude(keypad=None).order_by('-pk').values_list(
+                'pk', 'poll_id', 'keypad_id'):
+            if (poll_id, keypad_id) in latest:
+                duplicates.append(pk)
+            else:
+                latest.add((poll_id, keypad_id))
+        for index in range(0, len(duplicates), 500):
+            model.objects.filter(pk__in=duplicates[index:index + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openslides_votecollector', '0002_polltally'),
+    ]
+
+    operations = [
+        # The old values are removed in the next migration. Nullable values
+        # can be restored when it is reversed.
+        migrations.AlterField(
+            model_name='motionpollkeypadconnection',
+            name='value',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='assignmentpollkeypadconnection',
+            name='value',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='motionpollkeypadconnection',
+            name='value_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='assignmentpollkeypadconnection',
+            name='value_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.RunPython(encode_values, decode_values),
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+    ]
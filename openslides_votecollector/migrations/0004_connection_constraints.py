@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import openslides_votecollector.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openslides_votecollector', '0003_vote_value_codes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='motionpollkeypadconnection',
+            name='value',
+        ),
+        migrations.RemoveField(
+            model_name='assignmentpollkeypadconnection',
+            name='value',
+        ),
+        migrations.RenameField(
+            model_name='motionpollkeypadconnection',
+            old_name='value_code',
+            new_name='value',
+        ),
+        migrations.RenameField(
+            model_name='assignmentpollkeypadconnection',
+            old_name='value_code',
+            new_name='value',
+        ),
+        migrations.AlterField(
+            model_name='motionpollkeypadconnection',
+            name='value',
+            field=openslides_votecollector.models.VoteValueField(),
+        ),
+        migrations.AlterField(
+            model_name='assignmentpollkeypadconnection',
+            name='value',
+            field=openslides_votecollector.models.VoteValueField(),
+        ),
+        migrations.AlterField(
+            model_name='motionpollkeypadconnection',
+            name='poll',
+            field=models.ForeignKey(
+                db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='keypad_data_list',
+                to='motions.MotionPoll'),
+        ),
+        migrations.AlterField(
+            model_name='assignmentpollkeypadconnection',
+            name='poll',
+            field=models.ForeignKey(
+                db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='keypad_data_list',
+                to='assignments.AssignmentPoll'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='motionpollkeypadconnection',
+            unique_together=set([('poll', 'keypad')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='assignmentpollkeypadconnection',
+            unique_together=set([('poll', 'keypad')]),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.translation import ugettext as _
+from jsonfield import JSONField
 
 from openslides.core.config import config
 from openslides.assignments.models import AssignmentPoll
@@ -23,12 +24,42 @@ KEYPAD_MAP = ({
     'N': ('No', 'red'),
     'A': ('Abstention', 'yellow')})
 
+# Vote values of the keypad connections: the keys 0 to 9 of an election and
+# the keys of KEYPAD_MAP. The index of a value is its code in the database.
+VOTE_VALUES = ('0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'Y', 'N', 'A')
+
+
+class VoteValueField(models.PositiveSmallIntegerField):
+    """
+    Field for a vote value (see VOTE_VALUES). The value is a string in Python
+    and a small integer in the database.
+    """
+    def from_db_value(self, value, expression, connection, context):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return VOTE_VALUES[value]
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        try:
+            return VOTE_VALUES.index(str(value))
+        except ValueError:
+            raise ValueError('Invalid vote value %r.' % value)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
 
 class VoteCollector(RESTModelMixin, models.Model):
     """
     VoteCollector model. Provides device and voting status information.
 
-    Currently only one votecollector is supported (pk=1).
+    There is only one instance (pk=1). It holds the voting of all devices
+    (see votecollector_devices) with their counters added up.
     """
     access_permissions = VoteCollectorAccessPermissions()
 
@@ -116,13 +147,15 @@ class MotionPollKeypadConnection(RESTModelMixin, models.Model):
     """
     access_permissions = MotionPollKeypadConnectionAccessPermissions()
 
-    poll = models.ForeignKey(MotionPoll, on_delete=models.CASCADE, related_name='keypad_data_list')
+    poll = models.ForeignKey(MotionPoll, on_delete=models.CASCADE, related_name='keypad_data_list', db_index=False)
     keypad = models.ForeignKey(Keypad, on_delete=models.CASCADE, null=True)
-    value = models.CharField(max_length=255)
+    value = VoteValueField()
     serial_number = models.CharField(null=True, max_length=255)
 
     class Meta:
         default_permissions = ()
+        # Anonymized votes have no keypad, so they are not unique.
+        unique_together = (('poll', 'keypad'),)
 
     def get_value(self):
         """
@@ -146,11 +179,26 @@ class AssignmentPollKeypadConnection(RESTModelMixin, models.Model):
     """
     access_permissions = AssignmentPollKeypadConnectionAccessPermissions()
 
-    poll = models.ForeignKey(AssignmentPoll, on_delete=models.CASCADE, related_name='keypad_data_list')
+    poll = models.ForeignKey(AssignmentPoll, on_delete=models.CASCADE, related_name='keypad_data_list', db_index=False)
     keypad = models.ForeignKey(Keypad, on_delete=models.CASCADE, null=True)
     candidate = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True)
-    value = models.CharField(max_length=255)
+    value = VoteValueField()
     serial_number = models.CharField(null=True, max_length=255)
 
     class Meta:
         default_permissions = ()
+        # Anonymized votes have no keypad, so they are not unique.
+        unique_together = (('poll', 'keypad'),)
+
+
+class PollTally(models.Model):
+    """
+    Result of a keypad voting, saved when the voting stops. See tally.py.
+    """
+    voting_mode = models.CharField(max_length=50)
+    poll_id = models.IntegerField()
+    counts = JSONField(default=dict)
+
+    class Meta:
+        default_permissions = ()
+        unique_together = (('voting_mode', 'poll_id'),)
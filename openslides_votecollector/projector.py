@@ -5,7 +5,8 @@ from openslides.motions.models import MotionPoll
 from openslides.motions.views import MotionViewSet
 from openslides.utils.projector import ProjectorElement, ProjectorRequirement
 
-from .views import KeypadViewSet, SeatViewSet, MotionPollKeypadConnectionViewSet, AssignmentPollKeypadConnectionViewSet
+from .seat_grid import seat_grids
+from .views import SeatViewSet
 
 
 class MotionPollSlide(ProjectorElement):
@@ -21,6 +22,9 @@ class MotionPollSlide(ProjectorElement):
             if not MotionPoll.objects.filter(pk=pk).exists():
                 raise ProjectorException('MotionPoll does not exist.')
 
+    def update_data(self):
+        return {'grid': seat_grids.get_data('MotionPoll', self.config_entry.get('id'))}
+
     def get_requirements(self, config_entry):
         pk = config_entry.get('id')
         # Detail slide.
@@ -34,15 +38,9 @@ class MotionPollSlide(ProjectorElement):
                 view_class=MotionViewSet,
                 view_action='retrieve',
                 pk=str(motionpoll.motion.pk))
-            yield ProjectorRequirement(
-                view_class=KeypadViewSet,
-                view_action='retrieve')
             yield ProjectorRequirement(
                 view_class=SeatViewSet,
                 view_action='retrieve')
-            yield ProjectorRequirement(
-                view_class=MotionPollKeypadConnectionViewSet,
-                view_action='retrieve')
 
 
 class AssignmentPollSlide(ProjectorElement):
@@ -58,6 +56,9 @@ class AssignmentPollSlide(ProjectorElement):
             if not AssignmentPoll.objects.filter(pk=pk).exists():
                 raise ProjectorException('AssignmentPoll does not exist.')
 
+    def update_data(self):
+        return {'grid': seat_grids.get_data('AssignmentPoll', self.config_entry.get('id'))}
+
     def get_requirements(self, config_entry):
         pk = config_entry.get('id')
         # Detail slide.
@@ -71,15 +72,9 @@ class AssignmentPollSlide(ProjectorElement):
                 view_class=AssignmentViewSet,
                 view_action='retrieve',
                 pk=str(assignmentpoll.assignment.pk))
-            yield ProjectorRequirement(
-                view_class=KeypadViewSet,
-                view_action='retrieve')
             yield ProjectorRequirement(
                 view_class=SeatViewSet,
                 view_action='retrieve')
-            yield ProjectorRequirement(
-                view_class=AssignmentPollKeypadConnectionViewSet,
-                view_action='retrieve')
 
 
 class VotingPrompt(ProjectorElement):
@@ -0,0 +1,291 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import connection
+
+from openslides.core.config import config
+from openslides.core.models import Projector
+
+from .models import Seat
+from .tally import CONNECTION_MODELS
+from .utils import inform_changed_data
+
+# Code of a seat without a vote.
+NO_VOTE = '.'
+
+# Code of a seat with a vote if votecollector_seats_grey is enabled.
+GREY = 'G'
+
+# Codes of votes. Every other value is shown as NO_VOTE.
+VOTE_CODES = ('Y', 'N', 'A', '0', '1', '2', '3', '4', '5', '6', '7', '8', '9')
+
+# Names of the projector elements which show a seat grid.
+SLIDES = ('votecollector/motionpoll', 'votecollector/assignmentpoll')
+
+
+class SeatGrid:
+    """
+    Seat grid of one poll.
+
+    A grid is a string with one code per cell of the seating plan, row by
+    row. The code of a seat is the value of its vote ('Y', 'N', 'A' or the
+    key of an election vote) or NO_VOTE. Cells without seats are NO_VOTE,
+    too.
+
+    Every update of the projectors starts a new version of the grid. The
+    projectors get either the whole grid or only the changes (cell, code)
+    from the previous version. loaded is the time when the grid was built
+    from the database.
+    """
+    def __init__(self, columns, size, version=0):
+        self.columns = columns
+        self.votes = bytearray(NO_VOTE * size, 'ascii')
+        self.version = version
+        self.changes = {}
+        self.delta = None
+        self.loaded = time.monotonic()
+
+    def set(self, cell, code):
+        """
+        Sets the code of a cell.
+        """
+        self.votes[cell] = ord(code)
+        self.changes[cell] = code
+
+    def publish(self, snapshot):
+        """
+        Starts a new version with the pending changes. If snapshot is True,
+        the projectors get the whole grid, else only the changes.
+        """
+        self.delta = None if snapshot else sorted(self.changes.items())
+        self.changes = {}
+        self.version += 1
+
+    def get_data(self, grey):
+        """
+        Returns the data of the projector element.
+        """
+        data = {'columns': self.columns, 'version': self.version}
+        if self.delta is None:
+            votes = self.votes.decode('ascii')
+            if grey:
+                votes = ''.join(NO_VOTE if code == NO_VOTE else GREY for code in votes)
+            data['votes'] = votes
+        else:
+            data['base'] = self.version - 1
+            data['changes'] = [[cell, GREY if grey and code != NO_VOTE else code] for cell, code in self.delta]
+        return data
+
+
+class SeatGrids:
+    """
+    Process-wide seat grids of the polls for the projector. The projector
+    joins a grid with the seats by their coordinates, so it needs neither
+    keypads nor keypad connections.
+
+    The callback views add every accepted vote. If votecollector_live_voting
+    is enabled, the projectors which show a grid are informed at most every
+    interval seconds and get only the changes. A whole grid is sent at the
+    latest snapshot_interval seconds after a change, e. g. for projectors
+    which missed a version.
+
+    Votes received by other processes reach a grid only through the
+    database. So a grid is rebuilt from the database if it is missing or
+    older than snapshot_interval seconds when the projectors get it.
+
+    Changes of seats or keypads increment a version in Django's cache (see
+    invalidate()). The seating plan and all grids of a process with an older
+    version are dropped on the next access.
+    """
+    version_key = 'votecollector_seat_layout_version'
+    interval = 0.25
+    snapshot_interval = 5
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.layout = None
+        self.layout_version = None
+        self.grids = {}
+        self.dirty = False
+        self.timer = None
+        self.snapshot_timer = None
+        self.last_publish = 0
+
+    def get_layout(self):
+        """
+        Returns a tuple with the number of columns, the number of cells and a
+        dictionary which maps the seat pk to its cell.
+        """
+        layout = self.layout
+        version = self.get_version()
+        if layout is None or self.layout_version != version:
+            # The layout is not loaded yet or another process changed seats
+            # or keypads.
+            seats = list(Seat.objects.values_list('pk', 'seating_plan_x_axis', 'seating_plan_y_axis'))
+            columns = max((x for pk, x, y in seats), default=0)
+            rows = max((y for pk, x, y in seats), default=0)
+            cells = {pk: (y - 1) * columns + x - 1 for pk, x, y in seats}
+            layout = (columns, columns * rows, cells)
+            with self.lock:
+                if self.layout_version is not None and self.layout_version != version:
+                    self.grids.clear()
+                self.layout = layout
+                self.layout_version = version
+        return layout
+
+    def get_version(self):
+        """
+        Returns the current version of the seats and keypads.
+        """
+        return cache.get(self.version_key, 0)
+
+    def invalidate(self):
+        """
+        Drops the seating plan and all grids of all processes after seats or
+        keypads changed.
+        """
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, 1, None)
+        self.clear()
+
+    def clear(self, voting_mode=None, poll_id=None):
+        """
+        Drops the grid of a poll. Without arguments all grids and the seating
+        plan of this process are dropped. Dropped grids are built from the
+        database when they are needed again.
+        """
+        with self.lock:
+            if voting_mode is None:
+                self.layout = None
+                self.grids.clear()
+            else:
+                self.grids.pop((voting_mode, int(poll_id)), None)
+
+    def start(self, voting_mode, poll_id):
+        """
+        Starts an empty grid for a poll whose votes were just cleared.
+        """
+        columns, size, cells = self.get_layout()
+        with self.lock:
+            old_grid = self.grids.get((voting_mode, poll_id))
+            version = old_grid.version + 1 if old_grid is not None else 0
+            self.grids[(voting_mode, poll_id)] = SeatGrid(columns, size, version)
+            self.dirty = True
+        self.changed()
+
+    def add(self, voting_mode, poll_id, seat_id, value):
+        """
+        Sets the code of the seat of an accepted vote.
+        """
+        columns, size, cells = self.get_layout()
+        cell = cells.get(seat_id)
+        if cell is None:
+            return
+        with self.lock:
+            grid = self.grids.get((voting_mode, int(poll_id)))
+            if grid is None:
+                return
+            grid.set(cell, get_code(value))
+        self.changed()
+
+    def get_data(self, voting_mode, poll_id):
+        """
+        Returns the data of the projector element of a poll.
+        """
+        key = (voting_mode, poll_id)
+        with self.lock:
+            grid = self.grids.get(key)
+        if grid is None or grid.loaded + self.snapshot_interval < time.monotonic():
+            new_grid = self.load(voting_mode, poll_id, 0 if grid is None else grid.version + 1)
+            with self.lock:
+                old_grid = self.grids.get(key)
+                if old_grid is None or old_grid is grid:
+                    if old_grid is not None:
+                        # Keep votes which are not written yet, e. g. by the
+                        # vote buffer.
+                        for cell, code in old_grid.changes.items():
+                            new_grid.set(cell, code)
+                    self.grids[key] = grid = new_grid
+                else:
+                    # Another thread replaced the grid in the meantime.
+                    grid = old_grid
+        with self.lock:
+            return grid.get_data(config['votecollector_seats_grey'])
+
+    def load(self, voting_mode, poll_id, version=0):
+        """
+        Returns a new grid of a poll with the votes from the database. The
+        projectors get the whole grid.
+        """
+        columns, size, cells = self.get_layout()
+        grid = SeatGrid(columns, size, version)
+        queryset = CONNECTION_MODELS[voting_mode].objects.filter(poll_id=poll_id).exclude(keypad__seat=None)
+        for seat_id, value in queryset.values_list('keypad__seat_id', 'value'):
+            cell = cells.get(seat_id)
+            if cell is not None:
+                grid.set(cell, get_code(value))
+        grid.changes = {}
+        return grid
+
+    def changed(self):
+        """
+        Schedules an update of the projectors.
+        """
+        with self.lock:
+            if self.timer is None and config['votecollector_live_voting']:
+                delay = max(0, self.last_publish + self.interval - time.monotonic())
+                self.timer = threading.Timer(delay, self.publish_in_background, (False,))
+                self.timer.daemon = True
+                self.timer.start()
+            if self.snapshot_timer is None:
+                self.snapshot_timer = threading.Timer(self.snapshot_interval, self.publish_in_background, (True,))
+                self.snapshot_timer.daemon = True
+                self.snapshot_timer.start()
+
+    def publish(self, snapshot=False):
+        """
+        Starts new versions of all changed grids and informs the autoupdate
+        system about all projectors which show a seat grid.
+        """
+        with self.lock:
+            if snapshot:
+                timer, self.snapshot_timer = self.snapshot_timer, None
+            else:
+                timer, self.timer = self.timer, None
+            if timer is not None:
+                timer.cancel()
+            self.last_publish = time.monotonic()
+            changed = self.dirty
+            self.dirty = False
+            for grid in self.grids.values():
+                if grid.changes or (snapshot and grid.delta is not None):
+                    grid.publish(snapshot)
+                    changed = True
+        if changed:
+            projectors = [
+                projector for projector in Projector.objects.all()
+                if any(element.get('name') in SLIDES for element in projector.config.values())]
+            if projectors:
+                inform_changed_data(projectors)
+
+    def publish_in_background(self, snapshot):
+        """
+        Publishes the grids from a timer thread.
+        """
+        try:
+            self.publish(snapshot)
+        finally:
+            connection.close()
+
+
+def get_code(value):
+    """
+    Returns the code of a vote value.
+    """
+    return value if value in VOTE_CODES else NO_VOTE
+
+
+seat_grids = SeatGrids()
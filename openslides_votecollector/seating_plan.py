@@ -1,139 +1,115 @@
-from .models import Seat
+from django.db import transaction
 
+from .keypad_registry import keypad_registry
+from .models import Keypad, Seat
+from .seat_grid import seat_grids
 
-def setup_default_plan():
+# Number of seats which are inserted with one query.
+CHUNK_SIZE = 500
+
+# Named layouts. A layout describes a hall by:
+#   blocks:     Number of seats per row of each block, from left to right.
+#   rows:       Number of rows.
+#   aisle:      Number of empty columns between two blocks (Default: 1).
+#   podium:     Number of seats of the podium, centered above the rows
+#               (Default: 0).
+#   podium_gap: Number of empty rows between podium and rows (Default: 1).
+#   order:      Numbering order: 'rows' numbers every row from left to right
+#               across all blocks, 'blocks' numbers block by block and
+#               'snake' alternates the direction of the rows
+#               (Default: 'rows'). The podium is numbered first.
+#   start:      Number of the first seat (Default: 1).
+LAYOUTS = {
+    'default': {
+        'podium': 6,
+        'blocks': (6, 6, 6),
+        'rows': 6,
+    },
+    'small': {
+        'podium': 3,
+        'blocks': (5, 5),
+        'rows': 4,
+    },
+    'large': {
+        'podium': 12,
+        'blocks': (12, 24, 12),
+        'rows': 20,
+    },
+}
+
+
+def generate_seats(layout):
     """
-    Adds a default seating plan.
+    Yields tuples (number, x, y) for all seats of the given layout. The axes
+    start at 1.
     """
-    seats = []
+    blocks = layout['blocks']
+    rows = layout['rows']
+    aisle = layout.get('aisle', 1)
+    podium = layout.get('podium', 0)
+    order = layout.get('order', 'rows')
+    number = layout.get('start', 1)
+    if order not in ('rows', 'blocks', 'snake'):
+        raise ValueError('Unknown numbering order: %s' % order)
+
+    # First column of every block.
+    columns = []
+    x = 1
+    for width in blocks:
+        columns.append(x)
+        x += width + aisle
+    width = x - aisle - 1
 
-    # Podium
-    seats.append(Seat(number=1, seating_plan_x_axis=8, seating_plan_y_axis=1))
-    seats.append(Seat(number=2, seating_plan_x_axis=9, seating_plan_y_axis=1))
-    seats.append(Seat(number=3, seating_plan_x_axis=10, seating_plan_y_axis=1))
-    seats.append(Seat(number=4, seating_plan_x_axis=11, seating_plan_y_axis=1))
-    seats.append(Seat(number=5, seating_plan_x_axis=12, seating_plan_y_axis=1))
-    seats.append(Seat(number=6, seating_plan_x_axis=13, seating_plan_y_axis=1))
+    y = 1
+    if podium:
+        for x in range(1 + (width - podium) // 2, 1 + (width - podium) // 2 + podium):
+            yield number, x, y
+            number += 1
+        y += 1 + layout.get('podium_gap', 1)
 
-    # 1st row
-    seats.append(Seat(number=7, seating_plan_x_axis=1, seating_plan_y_axis=3))
-    seats.append(Seat(number=8, seating_plan_x_axis=2, seating_plan_y_axis=3))
-    seats.append(Seat(number=9, seating_plan_x_axis=3, seating_plan_y_axis=3))
-    seats.append(Seat(number=10, seating_plan_x_axis=4, seating_plan_y_axis=3))
-    seats.append(Seat(number=11, seating_plan_x_axis=5, seating_plan_y_axis=3))
-    seats.append(Seat(number=12, seating_plan_x_axis=6, seating_plan_y_axis=3))
-    seats.append(Seat(number=13, seating_plan_x_axis=8, seating_plan_y_axis=3))
-    seats.append(Seat(number=14, seating_plan_x_axis=9, seating_plan_y_axis=3))
-    seats.append(Seat(number=15, seating_plan_x_axis=10, seating_plan_y_axis=3))
-    seats.append(Seat(number=16, seating_plan_x_axis=11, seating_plan_y_axis=3))
-    seats.append(Seat(number=17, seating_plan_x_axis=12, seating_plan_y_axis=3))
-    seats.append(Seat(number=18, seating_plan_x_axis=13, seating_plan_y_axis=3))
-    seats.append(Seat(number=19, seating_plan_x_axis=15, seating_plan_y_axis=3))
-    seats.append(Seat(number=20, seating_plan_x_axis=16, seating_plan_y_axis=3))
-    seats.append(Seat(number=21, seating_plan_x_axis=17, seating_plan_y_axis=3))
-    seats.append(Seat(number=22, seating_plan_x_axis=18, seating_plan_y_axis=3))
-    seats.append(Seat(number=23, seating_plan_x_axis=19, seating_plan_y_axis=3))
-    seats.append(Seat(number=24, seating_plan_x_axis=20, seating_plan_y_axis=3))
+    if order == 'blocks':
+        for first, block_width in zip(columns, blocks):
+            for row in range(rows):
+                for x in range(first, first + block_width):
+                    yield number, x, y + row
+                    number += 1
+    else:
+        for row in range(rows):
+            xs = [x for first, block_width in zip(columns, blocks) for x in range(first, first + block_width)]
+            if order == 'snake' and row % 2:
+                xs.reverse()
+            for x in xs:
+                yield number, x, y + row
+                number += 1
 
-    # 2nd row
-    seats.append(Seat(number=25, seating_plan_x_axis=1, seating_plan_y_axis=4))
-    seats.append(Seat(number=26, seating_plan_x_axis=2, seating_plan_y_axis=4))
-    seats.append(Seat(number=27, seating_plan_x_axis=3, seating_plan_y_axis=4))
-    seats.append(Seat(number=28, seating_plan_x_axis=4, seating_plan_y_axis=4))
-    seats.append(Seat(number=29, seating_plan_x_axis=5, seating_plan_y_axis=4))
-    seats.append(Seat(number=30, seating_plan_x_axis=6, seating_plan_y_axis=4))
-    seats.append(Seat(number=31, seating_plan_x_axis=8, seating_plan_y_axis=4))
-    seats.append(Seat(number=32, seating_plan_x_axis=9, seating_plan_y_axis=4))
-    seats.append(Seat(number=33, seating_plan_x_axis=10, seating_plan_y_axis=4))
-    seats.append(Seat(number=34, seating_plan_x_axis=11, seating_plan_y_axis=4))
-    seats.append(Seat(number=35, seating_plan_x_axis=12, seating_plan_y_axis=4))
-    seats.append(Seat(number=36, seating_plan_x_axis=13, seating_plan_y_axis=4))
-    seats.append(Seat(number=37, seating_plan_x_axis=15, seating_plan_y_axis=4))
-    seats.append(Seat(number=38, seating_plan_x_axis=16, seating_plan_y_axis=4))
-    seats.append(Seat(number=39, seating_plan_x_axis=17, seating_plan_y_axis=4))
-    seats.append(Seat(number=40, seating_plan_x_axis=18, seating_plan_y_axis=4))
-    seats.append(Seat(number=41, seating_plan_x_axis=19, seating_plan_y_axis=4))
-    seats.append(Seat(number=42, seating_plan_x_axis=20, seating_plan_y_axis=4))
 
-    # 3rd row
-    seats.append(Seat(number=43, seating_plan_x_axis=1, seating_plan_y_axis=5))
-    seats.append(Seat(number=44, seating_plan_x_axis=2, seating_plan_y_axis=5))
-    seats.append(Seat(number=45, seating_plan_x_axis=3, seating_plan_y_axis=5))
-    seats.append(Seat(number=46, seating_plan_x_axis=4, seating_plan_y_axis=5))
-    seats.append(Seat(number=47, seating_plan_x_axis=5, seating_plan_y_axis=5))
-    seats.append(Seat(number=48, seating_plan_x_axis=6, seating_plan_y_axis=5))
-    seats.append(Seat(number=49, seating_plan_x_axis=8, seating_plan_y_axis=5))
-    seats.append(Seat(number=50, seating_plan_x_axis=9, seating_plan_y_axis=5))
-    seats.append(Seat(number=51, seating_plan_x_axis=10, seating_plan_y_axis=5))
-    seats.append(Seat(number=52, seating_plan_x_axis=11, seating_plan_y_axis=5))
-    seats.append(Seat(number=53, seating_plan_x_axis=12, seating_plan_y_axis=5))
-    seats.append(Seat(number=54, seating_plan_x_axis=13, seating_plan_y_axis=5))
-    seats.append(Seat(number=55, seating_plan_x_axis=15, seating_plan_y_axis=5))
-    seats.append(Seat(number=56, seating_plan_x_axis=16, seating_plan_y_axis=5))
-    seats.append(Seat(number=57, seating_plan_x_axis=17, seating_plan_y_axis=5))
-    seats.append(Seat(number=58, seating_plan_x_axis=18, seating_plan_y_axis=5))
-    seats.append(Seat(number=59, seating_plan_x_axis=19, seating_plan_y_axis=5))
-    seats.append(Seat(number=60, seating_plan_x_axis=20, seating_plan_y_axis=5))
+def setup_plan(layout, replace=False):
+    """
+    Creates the seats of the given layout. Returns the number of seats.
 
-    # 4th row
-    seats.append(Seat(number=61, seating_plan_x_axis=1, seating_plan_y_axis=6))
-    seats.append(Seat(number=62, seating_plan_x_axis=2, seating_plan_y_axis=6))
-    seats.append(Seat(number=63, seating_plan_x_axis=3, seating_plan_y_axis=6))
-    seats.append(Seat(number=64, seating_plan_x_axis=4, seating_plan_y_axis=6))
-    seats.append(Seat(number=65, seating_plan_x_axis=5, seating_plan_y_axis=6))
-    seats.append(Seat(number=66, seating_plan_x_axis=6, seating_plan_y_axis=6))
-    seats.append(Seat(number=67, seating_plan_x_axis=8, seating_plan_y_axis=6))
-    seats.append(Seat(number=68, seating_plan_x_axis=9, seating_plan_y_axis=6))
-    seats.append(Seat(number=69, seating_plan_x_axis=10, seating_plan_y_axis=6))
-    seats.append(Seat(number=70, seating_plan_x_axis=11, seating_plan_y_axis=6))
-    seats.append(Seat(number=71, seating_plan_x_axis=12, seating_plan_y_axis=6))
-    seats.append(Seat(number=72, seating_plan_x_axis=13, seating_plan_y_axis=6))
-    seats.append(Seat(number=73, seating_plan_x_axis=15, seating_plan_y_axis=6))
-    seats.append(Seat(number=74, seating_plan_x_axis=16, seating_plan_y_axis=6))
-    seats.append(Seat(number=75, seating_plan_x_axis=17, seating_plan_y_axis=6))
-    seats.append(Seat(number=76, seating_plan_x_axis=18, seating_plan_y_axis=6))
-    seats.append(Seat(number=77, seating_plan_x_axis=19, seating_plan_y_axis=6))
-    seats.append(Seat(number=78, seating_plan_x_axis=20, seating_plan_y_axis=6))
+    If replace is True, all existing seats are deleted before. Keypads lose
+    their seats but are kept.
 
-    # 5th row
-    seats.append(Seat(number=79, seating_plan_x_axis=1, seating_plan_y_axis=7))
-    seats.append(Seat(number=80, seating_plan_x_axis=2, seating_plan_y_axis=7))
-    seats.append(Seat(number=81, seating_plan_x_axis=3, seating_plan_y_axis=7))
-    seats.append(Seat(number=82, seating_plan_x_axis=4, seating_plan_y_axis=7))
-    seats.append(Seat(number=83, seating_plan_x_axis=5, seating_plan_y_axis=7))
-    seats.append(Seat(number=84, seating_plan_x_axis=6, seating_plan_y_axis=7))
-    seats.append(Seat(number=85, seating_plan_x_axis=8, seating_plan_y_axis=7))
-    seats.append(Seat(number=86, seating_plan_x_axis=9, seating_plan_y_axis=7))
-    seats.append(Seat(number=87, seating_plan_x_axis=10, seating_plan_y_axis=7))
-    seats.append(Seat(number=88, seating_plan_x_axis=11, seating_plan_y_axis=7))
-    seats.append(Seat(number=89, seating_plan_x_axis=12, seating_plan_y_axis=7))
-    seats.append(Seat(number=90, seating_plan_x_axis=13, seating_plan_y_axis=7))
-    seats.append(Seat(number=91, seating_plan_x_axis=15, seating_plan_y_axis=7))
-    seats.append(Seat(number=92, seating_plan_x_axis=16, seating_plan_y_axis=7))
-    seats.append(Seat(number=93, seating_plan_x_axis=17, seating_plan_y_axis=7))
-    seats.append(Seat(number=94, seating_plan_x_axis=18, seating_plan_y_axis=7))
-    seats.append(Seat(number=95, seating_plan_x_axis=19, seating_plan_y_axis=7))
-    seats.append(Seat(number=96, seating_plan_x_axis=20, seating_plan_y_axis=7))
+    bulk_create and update send no signals, so the seat grids and the keypad
+    registries of all processes are invalidated here.
+    """
+    with transaction.atomic():
+        if replace:
+            Keypad.objects.exclude(seat=None).update(seat=None)
+            Seat.objects.all().delete()
+        seats = [
+            Seat(number=str(number), seating_plan_x_axis=x, seating_plan_y_axis=y)
+            for number, x, y in generate_seats(layout)]
+        Seat.objects.bulk_create(seats, batch_size=CHUNK_SIZE)
+    seat_grids.invalidate()
+    if replace:
+        keypad_registry.clear()
+        keypad_registry.invalidate()
+    return len(seats)
 
-    # 6th row
-    seats.append(Seat(number=97, seating_plan_x_axis=1, seating_plan_y_axis=8))
-    seats.append(Seat(number=98, seating_plan_x_axis=2, seating_plan_y_axis=8))
-    seats.append(Seat(number=99, seating_plan_x_axis=3, seating_plan_y_axis=8))
-    seats.append(Seat(number=100, seating_plan_x_axis=4, seating_plan_y_axis=8))
-    seats.append(Seat(number=101, seating_plan_x_axis=5, seating_plan_y_axis=8))
-    seats.append(Seat(number=102, seating_plan_x_axis=6, seating_plan_y_axis=8))
-    seats.append(Seat(number=103, seating_plan_x_axis=8, seating_plan_y_axis=8))
-    seats.append(Seat(number=104, seating_plan_x_axis=9, seating_plan_y_axis=8))
-    seats.append(Seat(number=105, seating_plan_x_axis=10, seating_plan_y_axis=8))
-    seats.append(Seat(number=106, seating_plan_x_axis=11, seating_plan_y_axis=8))
-    seats.append(Seat(number=107, seating_plan_x_axis=12, seating_plan_y_axis=8))
-    seats.append(Seat(number=108, seating_plan_x_axis=13, seating_plan_y_axis=8))
-    seats.append(Seat(number=109, seating_plan_x_axis=15, seating_plan_y_axis=8))
-    seats.append(Seat(number=110, seating_plan_x_axis=16, seating_plan_y_axis=8))
-    seats.append(Seat(number=111, seating_plan_x_axis=17, seating_plan_y_axis=8))
-    seats.append(Seat(number=112, seating_plan_x_axis=18, seating_plan_y_axis=8))
-    seats.append(Seat(number=113, seating_plan_x_axis=19, seating_plan_y_axis=8))
-    seats.append(Seat(number=114, seating_plan_x_axis=20, seating_plan_y_axis=8))
 
-    # Create seats
-    Seat.objects.bulk_create(seats)
+def setup_default_plan():
+    """
+    Adds a default seating plan.
+    """
+    setup_plan(LAYOUTS['default'])
@@ -1,4 +1,4 @@
-from openslides.utils.rest_api import ModelSerializer, RelatedField
+from openslides.utils.rest_api import CharField, ModelSerializer, RelatedField
 
 from .models import AssignmentPollKeypadConnection, Keypad, MotionPollKeypadConnection, Seat, VoteCollector
 
@@ -55,6 +55,9 @@ class MotionPollKeypadConnectionSerializer(ModelSerializer):
     """
     Serializer for openslides_votecollector.model.MotionPollKeypadConnection object.
     """
+    # The value is stored as code, see VoteValueField.
+    value = CharField(read_only=True)
+
     class Meta:
         model = MotionPollKeypadConnection
         fields = (
@@ -70,6 +73,9 @@ class AssignmentPollKeypadConnectionSerializer(ModelSerializer):
     """
     Serializer for openslides_votecollector.model.AssignmentPollKeypadConnection object.
     """
+    # The value is stored as code, see VoteValueField.
+    value = CharField(read_only=True)
+
     class Meta:
         model = AssignmentPollKeypadConnection
         fields = (
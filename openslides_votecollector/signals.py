@@ -3,7 +3,10 @@ from django.contrib.contenttypes.models import ContentType
 
 from openslides.users.models import Group
 
+from .api import clear_keypad_cache
+from .keypad_registry import keypad_registry
 from .models import Seat
+from .seat_grid import seat_grids
 from .seating_plan import setup_default_plan
 
 
@@ -31,3 +34,50 @@ def add_default_seating_plan(**kwargs):
         # Do nothing if there are seats in the database
         return
     setup_default_plan()
+
+
+def update_keypad_registry_on_keypad_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Updates the keypad registry if a keypad is created or changed. Saves which
+    only update e. g. the battery_level are ignored.
+    """
+    if update_fields is None or not set(update_fields).isdisjoint(('keypad_id', 'user', 'seat')):
+        keypad_registry.update_keypad(instance)
+        keypad_registry.invalidate()
+
+
+def update_keypad_registry_on_keypad_delete(sender, instance, **kwargs):
+    """
+    Updates the keypad registry if a keypad is deleted.
+    """
+    keypad_registry.delete_keypad(instance)
+    keypad_registry.invalidate()
+
+
+def update_keypad_registry_on_user_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Updates the keypad registry if a user is changed. Saves which do not
+    update is_active (e. g. of last_login) are ignored.
+    """
+    if update_fields is None or 'is_active' in update_fields:
+        keypad_registry.update_user(instance)
+        keypad_registry.invalidate()
+
+
+def clear_keypad_cache_on_change(sender, instance, update_fields=None, **kwargs):
+    """
+    Clears the cache of eligible keypads if a keypad or a user is saved or
+    deleted. Saves which only update fields not relevant for the
+    eligibility (e. g. battery_level or last_login) are ignored.
+    """
+    if update_fields is None or not set(update_fields).isdisjoint(('keypad_id', 'user', 'is_active')):
+        clear_keypad_cache()
+
+
+def clear_seat_grids_on_change(sender, instance, update_fields=None, **kwargs):
+    """
+    Clears the seat grids of all processes if a seat or a keypad is saved or
+    deleted. Saves of keypads which do not update the seat are ignored.
+    """
+    if sender is Seat or update_fields is None or 'seat' in update_fields:
+        seat_grids.invalidate()
@@ -0,0 +1,401 @@
+"""
+Local stand-in for VoteCollector.
+
+The simulator is an XML-RPC server with the voteCollector methods used in
+api.py. When a voting starts, a load generator sends the callbacks of the
+simulated keypads to the callback URL given by OpenSlides. So the plugin
+can be load tested without the VoteCollector device and its keypads.
+
+This module does not depend on Django. See the management command
+votecollector_simulator.
+"""
+import bisect
+import http.client
+import random
+import socketserver
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from xmlrpc.server import SimpleXMLRPCServer
+
+# Error codes of VoteCollector, see VOTECOLLECTOR_ERROR_MESSAGES in api.py.
+UNKNOWN_MODE = -1
+INVALID_RANGE = -2
+INVALID_LIST = -3
+NO_KEYPADS = -4
+NOT_READY = -8
+
+# Arrival distributions of the votes.
+DISTRIBUTIONS = ('uniform', 'burst', 'exponential')
+
+# Key of the vote mix for invalid entries.
+INVALID = '?'
+
+
+def get_keys(mode, options):
+    """
+    Returns the keys a keypad can send in the given mode.
+    """
+    if mode == 'YesNoAbstain':
+        return ['Y', 'N', 'A']
+    if mode == 'SingleDigit':
+        try:
+            count = min(max(int(options), 1), 10)
+        except (TypeError, ValueError):
+            count = 10
+        return [str(key) for key in range(count)]
+    if mode == 'SpeakerList':
+        return ['Y', 'N']
+    if mode == 'Ping':
+        return []
+    return None
+
+
+def get_percentile(values, percentile):
+    """
+    Returns the given percentile (0 to 100) of a sorted non-empty list.
+    """
+    return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+
+class Voting:
+    """
+    State of one voting of the simulator.
+    """
+    def __init__(self, mode, options, url, keypads):
+        self.mode = mode
+        self.options = options
+        self.url = url
+        self.keypads = keypads
+        self.lock = threading.Lock()
+        self.votes = {}
+        self.start_time = None
+        self.stop_time = None
+
+    def is_active(self):
+        return self.start_time is not None and self.stop_time is None
+
+    def get_elapsed(self):
+        """
+        Returns the elapsed seconds since the start of the voting.
+        """
+        if self.start_time is None:
+            return 0
+        return int((self.stop_time or time.monotonic()) - self.start_time)
+
+    def add_vote(self, keypad_id, value):
+        """
+        Registers the vote of a keypad. Returns the number of votes received
+        or None if the voting is not active.
+        """
+        with self.lock:
+            if not self.is_active():
+                return None
+            self.votes[keypad_id] = value
+            return len(self.votes)
+
+    def get_result(self):
+        """
+        Returns the counts of all keys, e. g. [yes, no, abstain].
+        """
+        with self.lock:
+            counts = Counter(self.votes.values())
+        return [counts[key] for key in get_keys(self.mode, self.options)]
+
+
+class LoadGenerator:
+    """
+    Simulated keypads which send the callbacks of a voting.
+
+    Each authorized keypad votes once with the probability participation.
+    The arrival times are spread over duration seconds:
+
+    * uniform: evenly at random
+    * burst: all at the start
+    * exponential: most votes early, like delegates who know their vote
+
+    The values are chosen by the weights of mix, a dictionary which maps
+    keys (e. g. 'Y') to weights. The key INVALID sends an invalid entry.
+    Keys the mode does not know are ignored. Failed callbacks (connection
+    errors and server errors) are retried up to retries times. If battery is
+    a tuple (low, high), every keypad sends a battery level in this range.
+
+    on_finish is called with the voting and the statistics when all
+    callbacks of a voting are sent or the voting was stopped.
+    """
+    def __init__(self, duration=10.0, distribution='uniform', mix=None, participation=1.0, retries=2,
+                 retry_delay=0.5, battery=(20, 100), concurrency=16, timeout=5.0, seed=None, on_finish=None):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError('Unknown distribution %s.' % distribution)
+        self.duration = duration
+        self.distribution = distribution
+        self.mix = mix or {}
+        self.participation = participation
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.battery = battery
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self.on_finish = on_finish
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopped = threading.Event()
+        self.stats = Counter()
+        self.latencies = []
+
+    def get_values(self, mode, options):
+        """
+        Returns a tuple with the values and their cumulative weights.
+        """
+        keys = get_keys(mode, options)
+        weights = [(key, weight) for key, weight in self.mix.items()
+                   if (key in keys or key == INVALID) and weight > 0]
+        if not weights:
+            weights = [(key, 1) for key in keys]
+        values = [INVALID if key == INVALID else key for key, weight in weights]
+        cumulative = []
+        total = 0
+        for key, weight in weights:
+            total += weight
+            cumulative.append(total)
+        return values, cumulative
+
+    def get_arrivals(self, keypads):
+        """
+        Returns a sorted list of (delay, keypad_id) tuples.
+        """
+        arrivals = []
+        for keypad_id in keypads:
+            if self.random.random() >= self.participation:
+                continue
+            if self.distribution == 'burst':
+                delay = 0
+            elif self.distribution == 'exponential':
+                delay = min(self.random.expovariate(3 / self.duration), self.duration) if self.duration else 0
+            else:
+                delay = self.random.uniform(0, self.duration)
+            arrivals.append((delay, keypad_id))
+        arrivals.sort()
+        return arrivals
+
+    def start(self, voting):
+        """
+        Starts sending the callbacks of a voting in the background.
+        """
+        self.stop()
+        with self.lock:
+            self.stopped = threading.Event()
+            self.stats = Counter()
+            self.latencies = []
+            self.thread = threading.Thread(
+                target=self.run, args=(voting, self.stopped, self.stats, self.latencies), daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """
+        Stops sending callbacks. Pending callbacks are dropped.
+
+        This does not wait for callbacks which are being sent, because
+        OpenSlides may stop a voting while it handles them.
+        """
+        self.stopped.set()
+
+    def wait(self, timeout=None):
+        """
+        Waits until all callbacks of the voting are sent.
+        """
+        thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def run(self, voting, stopped, stats, latencies):
+        values, cumulative = self.get_values(voting.mode, voting.options)
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            for delay, keypad_id in self.get_arrivals(voting.keypads):
+                if stopped.wait(max(0, voting.start_time + delay - time.monotonic())):
+                    break
+                value = None
+                if values:
+                    value = values[bisect.bisect(cumulative, self.random.random() * cumulative[-1])]
+                executor.submit(self.press, voting, keypad_id, value, stopped, stats, latencies)
+        if self.on_finish is not None:
+            self.on_finish(voting, self.get_stats(stats, latencies))
+
+    def get_battery(self, keypad_id):
+        """
+        Returns the battery level of a keypad. The level is stable during a
+        run of the simulator.
+        """
+        low, high = self.battery
+        return random.Random(keypad_id).randint(low, high)
+
+    def press(self, voting, keypad_id, value, stopped, stats, latencies):
+        """
+        Sends the callback of one keypad.
+        """
+        votes = voting.add_vote(keypad_id, value)
+        if votes is None:
+            return
+        data = {
+            'votes': votes,
+            'elapsed': voting.get_elapsed(),
+            'sn': '%08d' % (keypad_id * 7919 % 100000000),
+        }
+        if value is not None:
+            data['value'] = 'X' if value == INVALID else value
+        if self.battery:
+            data['battery'] = self.get_battery(keypad_id)
+        url = urllib.parse.urlsplit(voting.url.rstrip('/') + '/%d/' % keypad_id)
+        body = urllib.parse.urlencode(data)
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.count(stats, 'retries')
+                if stopped.wait(self.retry_delay * 2 ** (attempt - 1)):
+                    break
+            start = time.perf_counter()
+            try:
+                status, text = self.post(url, body)
+            except (OSError, http.client.HTTPException) as e:
+                self.count(stats, 'error: %s' % type(e).__name__)
+                continue
+            latency = time.perf_counter() - start
+            if status >= 500:
+                self.count(stats, 'status %d' % status)
+                continue
+            with self.lock:
+                latencies.append(latency)
+                stats['sent'] += 1
+                stats['response: %s' % (text or status)] += 1
+            return
+        self.count(stats, 'failed')
+
+    def post(self, url, body):
+        """
+        Posts the form data and returns a tuple with the status and the
+        response text.
+        """
+        connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        connection = connection_class(url.netloc, timeout=self.timeout)
+        try:
+            connection.request('POST', url.path, body, {'Content-Type': 'application/x-www-form-urlencoded'})
+            response = connection.getresponse()
+            return response.status, response.read().decode('utf-8', 'replace').strip()
+        finally:
+            connection.close()
+
+    def count(self, stats, key):
+        with self.lock:
+            stats[key] += 1
+
+    def get_stats(self, stats=None, latencies=None):
+        """
+        Returns a dictionary with the counters and the latency percentiles
+        (in milliseconds) of a voting. Default is the last voting.
+        """
+        with self.lock:
+            stats = dict(self.stats if stats is None else stats)
+            latencies = sorted(self.latencies if latencies is None else latencies)
+        if latencies:
+            for percentile in (50, 95, 99):
+                stats['latency p%d' % percentile] = round(get_percentile(latencies, percentile) * 1000, 1)
+            stats['latency max'] = round(latencies[-1] * 1000, 1)
+        return stats
+
+
+class VoteCollectorSimulator:
+    """
+    XML-RPC instance with the voteCollector methods.
+
+    The keypads first_keypad to first_keypad + keypads - 1 are in range. A
+    voting is prepared for the authorized keypads in range and its callbacks
+    are sent by the load generator when it starts.
+    """
+    def __init__(self, keypads=100, generator=None, first_keypad=1):
+        self.keypads = keypads
+        self.first_keypad = first_keypad
+        self.generator = generator or LoadGenerator()
+        self.lock = threading.Lock()
+        self.voting = None
+
+    def _dispatch(self, method, params):
+        prefix, dot, name = method.partition('.')
+        function = getattr(self, name, None) if prefix == 'voteCollector' and not name.startswith('_') else None
+        if function is None:
+            raise Exception('method "%s" is not supported' % method)
+        return function(*params)
+
+    def in_range(self, keypad_id):
+        return self.first_keypad <= keypad_id < self.first_keypad + self.keypads
+
+    def getDeviceStatus(self):
+        return 'Device: Simulator, Keypads: %d' % self.keypads
+
+    def prepareVoting(self, mode, first, last, keypad_list):
+        mode, dash, ext_mode = mode.partition('-')
+        options, semicolon, url = ext_mode.rpartition(';')
+        if get_keys(mode, options) is None or not url:
+            return UNKNOWN_MODE
+        if keypad_list:
+            if not all(isinstance(keypad_id, int) for keypad_id in keypad_list):
+                return INVALID_LIST
+            keypads = sorted(set(keypad_id for keypad_id in keypad_list if self.in_range(keypad_id)))
+        else:
+            if first < 1 or last < first:
+                return INVALID_RANGE
+            keypads = list(range(max(first, self.first_keypad), min(last, self.first_keypad + self.keypads - 1) + 1))
+        if not keypads:
+            return NO_KEYPADS
+        with self.lock:
+            if self.voting is not None and self.voting.is_active():
+                return NOT_READY
+            self.voting = Voting(mode, options, url, keypads)
+        return len(keypads)
+
+    def startVoting(self):
+        with self.lock:
+            voting = self.voting
+            if voting is None or voting.start_time is not None:
+                return NOT_READY
+            voting.start_time = time.monotonic()
+        self.generator.start(voting)
+        return len(voting.keypads)
+
+    def stopVoting(self):
+        with self.lock:
+            voting = self.voting
+            if voting is None or not voting.is_active():
+                return 0
+            voting.stop_time = time.monotonic()
+        self.generator.stop()
+        return 0
+
+    def getVotingStatus(self):
+        voting = self.voting
+        if voting is None:
+            return [0, 0]
+        with voting.lock:
+            return [voting.get_elapsed(), len(voting.votes)]
+
+    def getVotingResult(self):
+        voting = self.voting
+        if voting is None:
+            return []
+        return voting.get_result()
+
+
+class SimulatorServer(socketserver.ThreadingMixIn, SimpleXMLRPCServer):
+    """
+    Threaded XML-RPC server for the simulator. It supports system.multicall
+    like VoteCollector.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, simulator):
+        super().__init__(address, logRequests=False, allow_none=True)
+        self.register_introspection_functions()
+        self.register_multicall_functions()
+        self.register_instance(simulator)
@@ -173,6 +173,14 @@ angular.module('OpenSlidesApp.openslides_votecollector', ['OpenSlidesApp.users']
 
 .factory('SeatingPlan', [
     function () {
+        // CSS classes of the codes of a seat grid. Other keys of elections are 'seat-voted'.
+        var gridClasses = {
+            'Y': 'seat-green',
+            'N': 'seat-red',
+            'A': 'seat-yellow',
+            '0': 'seat-yellow',
+            'G': 'seat-grey'
+        };
         return {
             generate: function (seats, votes, keys) {
                 // Generate seating plan with votes or empty seats
@@ -205,6 +213,55 @@ angular.module('OpenSlidesApp.openslides_votecollector', ['OpenSlidesApp.users']
                     };
                 });
                 return seatingPlan;
+            },
+            createGrid: function (data) {
+                // Create a local seat grid from the whole grid of a projector element.
+                // The grid has one code per cell, row by row, see seat_grid.py.
+                return {
+                    columns: data.columns,
+                    version: data.version,
+                    votes: data.votes.split('')
+                };
+            },
+            getVoteClass: function (code) {
+                if (!code || code == '.') {
+                    return undefined;
+                }
+                return gridClasses[code] || 'seat-voted';
+            },
+            generateFromGrid: function (seats, grid, showKeys) {
+                // Generate seating plan from a local seat grid.
+                var self = this;
+                var votes = {};
+                var keys = {};
+                if (grid) {
+                    angular.forEach(seats, function (seat) {
+                        var code = grid.votes[(seat.seating_plan_y_axis - 1) * grid.columns + seat.seating_plan_x_axis - 1];
+                        votes[seat.id] = self.getVoteClass(code);
+                        if (showKeys && votes[seat.id] && code != 'G') {
+                            keys[seat.id] = code;
+                        }
+                    });
+                }
+                return this.generate(seats, votes, keys);
+            },
+            applyChanges: function (seatingPlan, grid, data, showKeys) {
+                // Apply the changes of the next version of a seat grid to the local
+                // grid and to the seats of the seating plan.
+                var self = this;
+                angular.forEach(data.changes, function (change) {
+                    var cell = change[0];
+                    var code = change[1];
+                    grid.votes[cell] = code;
+                    var row = seatingPlan ? seatingPlan.rows[Math.floor(cell / grid.columns)] : undefined;
+                    var seat = row ? row[cell % grid.columns] : undefined;
+                    if (seat && seat.number !== undefined) {
+                        var vote = self.getVoteClass(code);
+                        seat.css = vote ? 'seat ' + vote : 'seat';
+                        seat.key = showKeys && vote && code != 'G' ? code : undefined;
+                    }
+                });
+                grid.version = data.version;
             }
         };
     }
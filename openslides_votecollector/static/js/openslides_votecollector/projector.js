@@ -46,14 +46,11 @@ angular.module('OpenSlidesApp.openslides_votecollector.projector', ['OpenSlidesA
 
 .controller('SlideMotionPollCtrl', [
     '$scope',
-    'Config',
     'Motion',
-    'Keypad',
     'Seat',
-    'MotionPollKeypadConnection',
     'MotionPollFinder',
     'SeatingPlan',
-    function ($scope, Config, Motion, Keypad, Seat, MotionPollKeypadConnection, MotionPollFinder, SeatingPlan) {
+    function ($scope, Motion, Seat, MotionPollFinder, SeatingPlan) {
         // Attention! Each object that is used here has to be dealt on server side.
         // Add it to the coresponding get_requirements method of the ProjectorElement
         // class.
@@ -71,62 +68,38 @@ angular.module('OpenSlidesApp.openslides_votecollector.projector', ['OpenSlidesA
             }
         );
 
-        MotionPollKeypadConnection.findAll();
-        Seat.findAll().then(function (seats) {
-            $scope.$watch(function () {
-              return MotionPollKeypadConnection.lastModified();
-            }, function () {
-                var allMPKCs = MotionPollKeypadConnection.getAll();
-                Keypad.findAll().then(function (keypads) {
-                    // Extract all votes from collection of MotionPollKeypadConnection objects
-                    var votes = {};
-                    angular.forEach(allMPKCs, function (mpkc) {
-                        if (mpkc.poll_id === pollId) {
-                            // Get seat id from keypad
-                            var keypad = _.find(keypads, function (keypad) {
-                                return keypad.id == mpkc.keypad_id;
-                            });
-                            var seat_id = keypad ? keypad.seat_id : undefined;
-                            // Set seat colors
-                            // TODO: Fix autoupdate if config changes on runtime.
-                            if (seat_id) {
-                                if (Config.get('votecollector_seats_grey').value) {
-                                    votes[seat_id] = 'seat-grey';
-                                } else {
-                                    switch (mpkc.value) {
-                                        case 'Y':
-                                            votes[seat_id] = 'seat-green';
-                                            break;
-                                        case 'N':
-                                            votes[seat_id] = 'seat-red';
-                                            break;
-                                        case 'A':
-                                            votes[seat_id] = 'seat-yellow';
-                                            break;
-                                    }
-                                }
-                            }
-                        }
-                    });
-                    // Generate seating plan with votes
-                    $scope.seatingPlan = SeatingPlan.generate(seats, votes);
-                });
-            });
+        // The server sends the votes of all seats as a grid and afterwards only the
+        // changes from the previous version of the grid, see seat_grid.py.
+        var grid;
+        Seat.findAll();
+        $scope.$watch(function () {
+            return Seat.lastModified();
+        }, function () {
+            $scope.seatingPlan = SeatingPlan.generateFromGrid(Seat.getAll(), grid);
         });
+        $scope.$watch('element.grid', function (data) {
+            if (!data) {
+                return;
+            }
+            if (data.votes !== undefined) {
+                grid = SeatingPlan.createGrid(data);
+                $scope.seatingPlan = SeatingPlan.generateFromGrid(Seat.getAll(), grid);
+            } else if (grid && grid.version === data.base) {
+                SeatingPlan.applyChanges($scope.seatingPlan, grid, data);
+            }
+            // Otherwise a version was missed. The next whole grid follows.
+        }, true);
     }
 ])
 
 .controller('SlideAssignmentPollCtrl', [
     '$scope',
-    'Config',
     'Assignment',
-    'Keypad',
     'Seat',
     'User',
-    'AssignmentPollKeypadConnection',
     'AssignmentPollFinder',
     'SeatingPlan',
-    function ($scope, Config, Assignment, Keypad, Seat, User, AssignmentPollKeypadConnection, AssignmentPollFinder, SeatingPlan) {
+    function ($scope, Assignment, Seat, User, AssignmentPollFinder, SeatingPlan) {
         // Attention! Each object that is used here has to be dealt on server side.
         // Add it to the coresponding get_requirements method of the ProjectorElement
         // class.
@@ -160,56 +133,27 @@ angular.module('OpenSlidesApp.openslides_votecollector.projector', ['OpenSlidesA
             }
         );
 
-        AssignmentPollKeypadConnection.findAll();
-        Seat.findAll().then(function (seats) {
-            $scope.$watch(function () {
-              return AssignmentPollKeypadConnection.lastModified();
-            }, function () {
-                var allAPKCs = AssignmentPollKeypadConnection.getAll();
-                Keypad.findAll().then(function (keypads) {
-                    // Extract all votes from collection of AssignmentPollKeypadConnection objects
-                    var votes = {};
-                    var keys = {};
-                    angular.forEach(allAPKCs, function (apkc) {
-                        if (apkc.poll_id === pollId) {
-                            // Get seat id from keypad
-                            var keypad = _.find(keypads, function (keypad) {
-                                return keypad.id == apkc.keypad_id;
-                            });
-                            var seat_id = keypad ? keypad.seat_id : undefined;
-                            // Set seat colors
-                            // TODO: Fix autoupdate if config changes on runtime.
-                            if (seat_id) {
-                                if (Config.get('votecollector_seats_grey').value) {
-                                    votes[seat_id] = 'seat-grey';
-                                } else {
-                                    keys[seat_id] = apkc.value;
-                                    switch (apkc.value) {
-                                        case 'Y':
-                                            votes[seat_id] = 'seat-green';
-                                            break;
-                                        case 'N':
-                                            votes[seat_id] = 'seat-red';
-                                            break;
-                                        case 'A':
-                                            votes[seat_id] = 'seat-yellow';
-                                            break;
-                                        case '0':
-                                            votes[seat_id] = 'seat-yellow';
-                                            break;
-                                        default:
-                                            votes[seat_id] = 'seat-voted';
-                                            break;
-                                    }
-                                }
-                            }
-                        }
-                    });
-                    // Generate seating plan with votes
-                    $scope.seatingPlan = SeatingPlan.generate(seats, votes, keys);
-                });
-            });
+        // The server sends the votes of all seats as a grid and afterwards only the
+        // changes from the previous version of the grid, see seat_grid.py.
+        var grid;
+        Seat.findAll();
+        $scope.$watch(function () {
+            return Seat.lastModified();
+        }, function () {
+            $scope.seatingPlan = SeatingPlan.generateFromGrid(Seat.getAll(), grid, true);
         });
+        $scope.$watch('element.grid', function (data) {
+            if (!data) {
+                return;
+            }
+            if (data.votes !== undefined) {
+                grid = SeatingPlan.createGrid(data);
+                $scope.seatingPlan = SeatingPlan.generateFromGrid(Seat.getAll(), grid, true);
+            } else if (grid && grid.version === data.base) {
+                SeatingPlan.applyChanges($scope.seatingPlan, grid, data, true);
+            }
+            // Otherwise a version was missed. The next whole grid follows.
+        }, true);
     }
 ]);
 
@@ -379,6 +379,7 @@ angular.module('OpenSlidesApp.openslides_votecollector.site', [
     'Seat',
     function ($scope, $http, gettext, Keypad, User, Seat) {
 
+        $scope.alert = {};
         $scope.users = [];
         $scope.separator = ',';
         $scope.encoding = 'UTF-8';
@@ -482,24 +483,37 @@ angular.module('OpenSlidesApp.openslides_votecollector.site', [
             });
         });
 
-        // import from csv file
+        // import from csv file on the server
         $scope.import = function () {
             $scope.csvImporting = true;
-            angular.forEach($scope.users, function (user) {
-                if (!user.importerror) {
-                    var keypad = {
-                        'keypad_id': user.keypad_id,
-                        'user_id': user.user_id,
-                        'seat_id': user.seat_id
-                    }
-                    Keypad.create(keypad).then(
-                        function(success) {
+            var data = new FormData();
+            data.append('file', new Blob([$scope.csv.content], {type: 'text/csv'}), 'keypads.csv');
+            data.append('separator', $scope.csv.separator);
+            $http.post('/rest/openslides_votecollector/keypad/import_csv/', data, {
+                transformRequest: angular.identity,
+                headers: {'Content-Type': undefined}
+            }).then(
+                function (success) {
+                    // The first line of the file contains the column names.
+                    var errors = {};
+                    angular.forEach(success.data.errors, function (error) {
+                        errors[error.line] = error.errors;
+                    });
+                    angular.forEach($scope.users, function (user, index) {
+                        if (errors[index + 2]) {
+                            user.importerror = true;
+                            user.keypad_error = errors[index + 2].join(' ');
+                        } else if (!user.importerror) {
                             user.imported = true;
                         }
-                    );
+                    });
+                    $scope.csvimported = true;
+                },
+                function (failure) {
+                    $scope.csvImporting = false;
+                    $scope.alert = { type: 'danger', msg: failure.data.detail, show: true };
                 }
-            });
-            $scope.csvimported = true;
+            );
         };
 
         // clear csv import preview
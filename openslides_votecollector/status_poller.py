@@ -0,0 +1,102 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import connection
+
+from .api import VoteCollectorError, get_device_status, get_voting_status
+
+# Functions which are polled by their names.
+STATUS_FUNCTIONS = {
+    'device': get_device_status,
+    'voting': get_voting_status,
+}
+
+
+class StatusPoller:
+    """
+    Polls the device status and the voting status of VoteCollector in the
+    background and shares the results via Django's cache.
+
+    The views DeviceStatus and VotingStatus only read the cache, so the load
+    of VoteCollector does not depend on the number of open browsers. A status
+    is polled every interval seconds as long as it was requested within
+    idle_timeout seconds. A lock in the cache makes sure that only one
+    worker process polls per interval. Results expire after ttl seconds,
+    e. g. if the polling process stopped.
+    """
+    interval = 1
+    ttl = 5
+    idle_timeout = 30
+    cache_prefix = 'votecollector_status_'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.requests = {}
+
+    def get(self, name):
+        """
+        Returns a dictionary with the result or the error of the given status
+        ('device' or 'voting').
+        """
+        with self.lock:
+            self.requests[name] = time.monotonic()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+        data = cache.get(self.cache_prefix + name)
+        if data is None:
+            # Nothing polled yet. Wait for the poller of any process.
+            deadline = time.monotonic() + self.ttl
+            while data is None and time.monotonic() < deadline:
+                self.poll(name)
+                data = cache.get(self.cache_prefix + name)
+                if data is None:
+                    time.sleep(0.05)
+        if data is None:
+            data = {'result': None, 'error': 'No status of VoteCollector available.'}
+        return data
+
+    def clear(self, name):
+        """
+        Drops a cached status, e. g. the voting status when a voting starts.
+        """
+        cache.delete(self.cache_prefix + name)
+        cache.delete(self.cache_prefix + name + '_lock')
+
+    def poll(self, name):
+        """
+        Polls a status unless another process polled it within the interval.
+        """
+        if not cache.add(self.cache_prefix + name + '_lock', True, self.interval):
+            return
+        try:
+            data = {'result': STATUS_FUNCTIONS[name](), 'error': None}
+        except VoteCollectorError as e:
+            data = {'result': None, 'error': e.value}
+        cache.set(self.cache_prefix + name, data, self.ttl)
+
+    def run(self):
+        """
+        Polls all recently requested states until no client requests them.
+        """
+        try:
+            while True:
+                now = time.monotonic()
+                with self.lock:
+                    names = [name for name, last in self.requests.items() if now - last < self.idle_timeout]
+                    if not names:
+                        self.thread = None
+                        return
+                for name in names:
+                    self.poll(name)
+                time.sleep(self.interval)
+        finally:
+            with self.lock:
+                if self.thread is threading.current_thread():
+                    self.thread = None
+            connection.close()
+
+
+status_poller = StatusPoller()
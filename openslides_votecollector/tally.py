@@ -0,0 +1,173 @@
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import KEYPAD_MAP, AssignmentPollKeypadConnection, MotionPollKeypadConnection, PollTally
+
+CONNECTION_MODELS = {
+    'MotionPoll': MotionPollKeypadConnection,
+    'AssignmentPoll': AssignmentPollKeypadConnection,
+}
+
+
+def get_key(value, candidate_id=None):
+    """
+    Returns the key under which a vote is counted: the value of a
+    yes/no/abstain vote, 'vote_<candidate id>' for an election vote or
+    'invalid'.
+    """
+    if value in KEYPAD_MAP:
+        return value
+    if candidate_id is not None:
+        return 'vote_%d' % candidate_id
+    return 'invalid'
+
+
+def get_election_result(counts, candidate_ids):
+    """
+    Returns the result of an election as expected by the front end: the
+    votes per candidate ('vote_<candidate id>'), 'valid' and 'invalid'.
+    Votes for candidates which are no options are invalid.
+    """
+    result = {
+        'invalid': sum(count for key, count in counts.items() if key.startswith('vote_')),
+        'valid': 0
+    }
+    for candidate_id in candidate_ids:
+        key = 'vote_%d' % candidate_id
+        result[key] = counts.get(key, 0)
+        result['valid'] += result[key]
+        result['invalid'] -= result[key]
+    result['invalid'] += counts.get('invalid', 0)
+    return result
+
+
+def get_poll_result(voting_mode, poll, counts):
+    """
+    Returns the result of a poll as expected by the front end: the election
+    result (see get_election_result()) or a list [yes, no, abstain].
+    """
+    if voting_mode == 'AssignmentPoll' and not poll.yesnoabstain and not poll.yesno:
+        candidate_ids = poll.get_options().values_list('candidate_id', flat=True)
+        return get_election_result(counts, candidate_ids)
+    return [counts.get('Y', 0), counts.get('N', 0), counts.get('A', 0)]
+
+
+class PollTallies:
+    """
+    Results of the keypad votings.
+
+    While a voting is running, its live result is counted from the keypad
+    connections by the database and shared by all processes through Django's
+    cache for live_timeout seconds, so a poll is counted at most once per
+    interval however often its result is read. When the voting stops, the
+    votes of all processes are counted once, the result is saved as
+    PollTally and kept in the cache until a new voting of the poll starts.
+
+    If there is no saved result, e. g. after a restart during a voting, the
+    votes are counted from the keypad connections. verify() compares a
+    result with such a recount.
+    """
+    cache_prefix = 'votecollector_result_'
+    live_cache_prefix = 'votecollector_live_result_'
+
+    # Seconds a live result is shared before it is counted again.
+    live_timeout = 1
+
+    def get_cache_key(self, voting_mode, poll_id):
+        return '%s%s_%d' % (self.cache_prefix, voting_mode, poll_id)
+
+    def get_live_cache_key(self, voting_mode, poll_id):
+        return '%s%s_%d' % (self.live_cache_prefix, voting_mode, poll_id)
+
+    def start(self, voting_mode, poll_id):
+        """
+        Drops the result of a poll whose votes were just cleared.
+        """
+        PollTally.objects.filter(voting_mode=voting_mode, poll_id=poll_id).delete()
+        cache.delete_many([self.get_cache_key(voting_mode, poll_id), self.get_live_cache_key(voting_mode, poll_id)])
+
+    def save(self, voting_mode, poll_id):
+        """
+        Counts and saves the result of a stopped voting, drops the live
+        result and keeps the final result in the cache. All votes have to be
+        written before.
+        """
+        if voting_mode not in CONNECTION_MODELS:
+            return
+        cache.delete(self.get_live_cache_key(voting_mode, poll_id))
+        counts = self.count(voting_mode, poll_id)
+        PollTally.objects.update_or_create(voting_mode=voting_mode, poll_id=poll_id, defaults={'counts': counts})
+        poll_model = CONNECTION_MODELS[voting_mode]._meta.get_field('poll').related_model
+        poll = poll_model.objects.filter(pk=poll_id).first()
+        if poll is not None:
+            cache.set(self.get_cache_key(voting_mode, poll_id), get_poll_result(voting_mode, poll, counts), None)
+
+    def get_result(self, voting_mode, poll, final=False):
+        """
+        Returns the result of a poll as expected by the front end (see
+        get_poll_result()). Use final=True if the voting of the poll is
+        stopped. Then the result is read from the cache and only computed
+        if it is missing, e. g. after the cache was cleared.
+        """
+        key = self.get_cache_key(voting_mode, poll.id)
+        if final:
+            result = cache.get(key)
+            if result is not None:
+                return result
+        result = get_poll_result(voting_mode, poll, self.get_counts(voting_mode, poll.id, final))
+        if final:
+            cache.set(key, result, None)
+        return result
+
+    def get_counts(self, voting_mode, poll_id, final=False):
+        """
+        Returns a dictionary with the number of votes per key (see get_key())
+        of a poll. Use final=True if the voting of the poll is stopped. Else
+        the shared live result is returned, which may miss the votes of the
+        last live_timeout seconds.
+        """
+        if not final:
+            key = self.get_live_cache_key(voting_mode, poll_id)
+            counts = cache.get(key)
+            if counts is None:
+                counts = self.count(voting_mode, poll_id)
+                cache.set(key, counts, self.live_timeout)
+            return counts
+        saved = PollTally.objects.filter(voting_mode=voting_mode, poll_id=poll_id).first()
+        if saved is not None:
+            return saved.counts
+        return self.count(voting_mode, poll_id)
+
+    def count(self, voting_mode, poll_id):
+        """
+        Counts the votes of a poll from the keypad connections with one
+        grouped query. Returns a dictionary like get_counts().
+        """
+        model = CONNECTION_MODELS[voting_mode]
+        queryset = model.objects.filter(poll_id=poll_id).order_by()
+        if model is AssignmentPollKeypadConnection:
+            rows = queryset.values_list('value', 'candidate_id').annotate(Count('id'))
+        else:
+            rows = queryset.values_list('value').annotate(Count('id'))
+        counts = Counter()
+        for row in rows:
+            counts[get_key(*row[:-1])] += row[-1]
+        return dict(counts)
+
+    def verify(self, voting_mode, poll_id):
+        """
+        Compares the result of a poll with a recount of its keypad
+        connections. Returns a dictionary which maps every differing key to
+        a tuple (result, recount). It is empty if both are consistent.
+        """
+        counts = self.get_counts(voting_mode, poll_id, final=True)
+        recount = self.count(voting_mode, poll_id)
+        return {
+            key: (counts.get(key, 0), recount.get(key, 0))
+            for key in set(counts) | set(recount)
+            if counts.get(key, 0) != recount.get(key, 0)}
+
+
+poll_tallies = PollTallies()
@@ -0,0 +1,138 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from openslides.core.config import config
+
+
+class Trace:
+    """
+    Timing of one request, split into named spans. Nested spans are named
+    by their path, e. g. 'connection write/autoupdate'.
+    """
+    def __init__(self, view, path):
+        self.view = view
+        self.path = path
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        self.total = None
+        self.stack = []
+        self.spans = []
+
+    def get_data(self):
+        """
+        Returns the trace as a dictionary. All times are in milliseconds. The
+        time which is not covered by a top-level span is given as other.
+        """
+        return {
+            'view': self.view,
+            'path': self.path,
+            'timestamp': self.timestamp,
+            'total': round(self.total * 1000, 3),
+            'spans': [[name, round(duration * 1000, 3)] for name, duration, nested in self.spans],
+            'other': round((self.total - sum(
+                duration for name, duration, nested in self.spans if not nested)) * 1000, 3),
+        }
+
+
+class Tracer:
+    """
+    Process-wide tracing of the votecollector views.
+
+    Every worker process keeps its own traces. The data contains the process
+    id, so it is clear which process answered a request.
+
+    Every request of a traced view is split into spans, e. g. keypad lookup,
+    poll lookup and connection write. The size slowest traces and the last
+    size traces which took longer than votecollector_trace_threshold are
+    kept in memory. All other traces are dropped.
+    """
+    size = 50
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.counter = itertools.count()
+        self.slowest = []
+        self.recent = deque(maxlen=self.size)
+
+    @contextmanager
+    def trace(self, view, path):
+        """
+        Traces the request of a view in the current thread.
+        """
+        if getattr(self.local, 'trace', None) is not None:
+            # The request is already traced, e. g. by a parent view.
+            yield
+            return
+        trace = self.local.trace = Trace(view, path)
+        try:
+            yield
+        finally:
+            self.local.trace = None
+            trace.total = time.perf_counter() - trace.start
+            self.add(trace)
+
+    @contextmanager
+    def span(self, name):
+        """
+        Adds a span to the trace of the current thread. Does nothing if the
+        current thread is not traced.
+        """
+        trace = getattr(self.local, 'trace', None)
+        if trace is None:
+            yield
+            return
+        nested = bool(trace.stack)
+        trace.stack.append(name)
+        name = '/'.join(trace.stack)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            trace.spans.append((name, time.perf_counter() - start, nested))
+            trace.stack.pop()
+
+    def add(self, trace):
+        """
+        Keeps the trace if it is one of the slowest or over the threshold.
+        """
+        item = (trace.total, next(self.counter), trace)
+        with self.lock:
+            if len(self.slowest) < self.size:
+                heapq.heappush(self.slowest, item)
+            elif trace.total > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+        if trace.total * 1000 >= config['votecollector_trace_threshold']:
+            with self.lock:
+                self.recent.append(trace)
+
+    def get_data(self):
+        """
+        Returns the slowest traces (slowest first) and the recent traces over
+        the threshold (latest first).
+        """
+        with self.lock:
+            slowest = sorted(self.slowest, reverse=True)
+            recent = list(self.recent)
+        return {
+            'process': os.getpid(),
+            'threshold': config['votecollector_trace_threshold'],
+            'slowest': [trace.get_data() for total, counter, trace in slowest],
+            'over_threshold': [trace.get_data() for trace in reversed(recent)],
+        }
+
+    def clear(self):
+        """
+        Drops all traces.
+        """
+        with self.lock:
+            self.slowest = []
+            self.recent.clear()
+
+
+tracer = Tracer()
@@ -73,10 +73,22 @@ urlpatterns = [
         },
         name='votecollector_result_election'),
 
+    url(r'^votecollector/metrics/$',
+        views.MetricsView.as_view(),
+        name='votecollector_metrics'),
+
+    url(r'^votecollector/traces/$',
+        views.TraceView.as_view(),
+        name='votecollector_traces'),
+
     url(r'^votecollector/vote/(?P<poll_id>\d+)/(?P<keypad_id>\d+)/$',
         csrf_exempt(views.VoteCallback.as_view()),
         name='votecollector_vote'),
 
+    url(r'^votecollector/votes/(?P<poll_id>\d+)/$',
+        csrf_exempt(views.VotesCallback.as_view()),
+        name='votecollector_votes'),
+
     url(r'^votecollector/candidate/(?P<poll_id>\d+)/(?P<keypad_id>\d+)/$',
         csrf_exempt(views.CandidateCallback.as_view()),
         name='votecollector_candidate'),
@@ -0,0 +1,36 @@
+from django.db import transaction
+
+from openslides.utils import autoupdate
+
+from .metrics import metrics
+from .tracing import tracer
+
+
+def inform_changed_data(instances):
+    """
+    Informs the autoupdate system about changed instances like
+    openslides.utils.autoupdate.inform_changed_data. The message is counted
+    for the metrics and traced.
+    """
+    with tracer.span('autoupdate'):
+        autoupdate.inform_changed_data(instances)
+    metrics.autoupdates.inc()
+
+
+def bulk_update(queryset, **values):
+    """
+    Updates all objects of the queryset with one query and informs the
+    autoupdate system once about all changed objects. Returns the number of
+    updated objects.
+
+    Use this instead of saving objects one by one. The update and the
+    autoupdate run in one transaction.
+    """
+    with transaction.atomic():
+        instances = list(queryset.select_for_update())
+        count = queryset.update(**values)
+        for instance in instances:
+            for field, value in values.items():
+                setattr(instance, field, value)
+        inform_changed_data(instances)
+    return count
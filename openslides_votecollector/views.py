@@ -1,8 +1,12 @@
+import codecs
+import csv
 import json
 
 from django.apps import apps
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponse
+from django.db import DatabaseError, IntegrityError, transaction
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.utils.crypto import constant_time_compare
 from django.utils.translation import ugettext as _
 
 from openslides.agenda.models import Item, Speaker
@@ -12,12 +16,17 @@ from openslides.core.exceptions import OpenSlidesError
 from openslides.core.models import Projector
 from openslides.motions.models import MotionPoll
 from openslides.utils import views as utils_views
-from openslides.utils.rest_api import ModelViewSet, ReadOnlyModelViewSet, Response, list_route
+from openslides.utils.rest_api import (
+    ModelViewSet,
+    ReadOnlyModelViewSet,
+    Response,
+    ValidationError,
+    list_route,
+)
 
 from .api import (
-    get_device_status,
-    get_voting_result,
-    get_voting_status,
+    get_device_index,
+    get_devices,
     start_voting,
     stop_voting,
     VoteCollectorError
@@ -29,7 +38,27 @@ from .access_permissions import (
     SeatAccessPermissions,
     VoteCollectorAccessPermissions,
 )
-from .models import AssignmentPollKeypadConnection, Keypad, MotionPollKeypadConnection, Seat, VoteCollector
+from .async_callbacks import callback_executor
+from .callback_dedup import callback_dedup
+from .keypad_import import KeypadImport
+from .keypad_registry import keypad_registry
+from .metrics import metrics
+from .models import (
+    KEYPAD_MAP,
+    AssignmentPollKeypadConnection,
+    Keypad,
+    MotionPollKeypadConnection,
+    Seat,
+    VoteCollector,
+)
+from .seat_grid import seat_grids
+from .status_poller import status_poller
+from .tally import poll_tallies
+from .tracing import tracer
+from .utils import bulk_update, inform_changed_data
+from .vote_buffer import vote_buffer
+from .voting_counters import voting_counters
+from .voting_session import voting_session
 
 
 class AjaxView(utils_views.View):
@@ -101,6 +130,39 @@ class KeypadViewSet(ModelViewSet):
     def check_view_permissions(self):
         return self.get_access_permissions().can_retrieve(self.request.user)
 
+    @list_route(methods=['post'])
+    def import_csv(self, request):
+        """
+        Imports keypads from an uploaded CSV file. Expects the file as 'file'
+        and optionally 'separator' and 'encoding'. Returns the number of
+        imported keypads and the errors per line.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'detail': _('No file uploaded.')})
+        separator = request.data.get('separator') or ','
+        if len(separator) != 1:
+            raise ValidationError({'detail': _('The separator must be one character.')})
+        encoding = request.data.get('encoding') or 'utf-8'
+        try:
+            if codecs.lookup(encoding).name == 'utf-8':
+                # Skip a byte order mark.
+                encoding = 'utf-8-sig'
+        except LookupError:
+            raise ValidationError({'detail': _('Unknown encoding.')})
+
+        # Read the file line by line.
+        keypad_import = KeypadImport()
+        try:
+            keypad_import.read(codecs.iterdecode(upload, encoding), separator)
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ValidationError({'detail': _('The file could not be read: %s') % e})
+        count = keypad_import.save()
+        return Response({
+            'detail': _('%d keypads were successfully imported.') % count,
+            'count': count,
+            'errors': keypad_import.errors})
+
 
 class MotionPollKeypadConnectionViewSet(ReadOnlyModelViewSet):
     access_permissions = MotionPollKeypadConnectionAccessPermissions()
@@ -114,11 +176,13 @@ class MotionPollKeypadConnectionViewSet(ReadOnlyModelViewSet):
         """
         Anonymize all votes of the given poll.
         """
-        # Clear keypad id and save model to trigger autoupdate.
-        for mpkc in MotionPollKeypadConnection.objects.filter(poll_id=request.data.get('poll_id')):
-            mpkc.keypad_id = None
-            mpkc.save()
-        return Response({'detail': _('All votes are successfully anonymized.')})
+        # Clear keypad id with one update and one autoupdate.
+        count = bulk_update(
+            MotionPollKeypadConnection.objects.filter(poll_id=request.data.get('poll_id')).exclude(keypad=None),
+            keypad=None)
+        if count:
+            seat_grids.clear('MotionPoll', request.data.get('poll_id'))
+        return Response({'detail': _('All votes are successfully anonymized.'), 'count': count})
 
 
 class AssignmentPollKeypadConnectionViewSet(ReadOnlyModelViewSet):
@@ -133,11 +197,13 @@ class AssignmentPollKeypadConnectionViewSet(ReadOnlyModelViewSet):
         """
         Anonymize all votes of the given poll.
         """
-        # Clear keypad id and save model to trigger autoupdate.
-        for apkc in AssignmentPollKeypadConnection.objects.filter(poll_id=request.data.get('poll_id')):
-            apkc.keypad_id = None
-            apkc.save()
-        return Response({'detail': _('All votes are successfully anonymized.')})
+        # Clear keypad id with one update and one autoupdate.
+        count = bulk_update(
+            AssignmentPollKeypadConnection.objects.filter(poll_id=request.data.get('poll_id')).exclude(keypad=None),
+            keypad=None)
+        if count:
+            seat_grids.clear('AssignmentPoll', request.data.get('poll_id'))
+        return Response({'detail': _('All votes are successfully anonymized.'), 'count': count})
 
 
 class VotingView(AjaxView):
@@ -147,6 +213,10 @@ class VotingView(AjaxView):
     resource_path = '/votecollector'
     voting_key = 'a016f7ecaf2147b2b656c6edf45c24ef'
 
+    def dispatch(self, request, *args, **kwargs):
+        with tracer.trace(type(self).__name__, request.path):
+            return super().dispatch(request, *args, **kwargs)
+
     def get_callback_url(self, request):
         host = request.META['SERVER_NAME']
         port = request.META.get('SERVER_PORT', 0)
@@ -189,17 +259,15 @@ class VotingView(AjaxView):
 
 class DeviceStatus(VotingView):
     def get(self, request, *args, **kwargs):
-        self.error = None
-        try:
-            self.result = get_device_status()
-        except VoteCollectorError as e:
-            self.error = e.value
+        status = status_poller.get('device')
+        self.result = status['result']
+        self.error = status['error']
         return super(DeviceStatus, self).get(request, *args, **kwargs)
 
     def no_error_context(self):
         return {
             'device': self.result,
-            'connected': not self.result.startswith('Device: None')
+            'connected': 'Device: None' not in self.result
         }
 
 
@@ -210,27 +278,35 @@ class StartVoting(VotingView):
         obj = self.get_poll_object()
         vc = VoteCollector.objects.get(id=1)
         if not self.error:
-            # Stop any active voting no matter what mode.
-            if vc.is_voting:
-                try:
-                    stop_voting()
-                except VoteCollectorError as e:
-                    pass
+            voting_counters.reset()
             target = obj.id if obj else 0
             url = self.get_callback_url(request) + resource
             if target:
                 url += str(target)
             try:
-                self.result = start_voting(mode, kwargs.get('options'), url)
+                # Stop any active voting no matter what mode. This is done
+                # together with the start of the new voting.
+                self.result = start_voting(mode, kwargs.get('options'), url, stop=vc.is_voting)
             except VoteCollectorError as e:
                 self.error = e.value
             else:
+                if vc.is_voting:
+                    # The devices stopped the active voting. Write all its
+                    # pending and buffered votes before its result is saved.
+                    callback_executor.stop_session()
+                    vote_buffer.flush()
+                    voting_session.wait_pending()
+                    poll_tallies.save(vc.voting_mode, vc.voting_target)
                 vc.voting_mode = kwargs.get('model', 'Test')
                 vc.voting_target = target
                 vc.voters_count = self.result
                 vc.votes_received = 0
                 vc.is_voting = True
                 vc.save()
+                status_poller.clear('voting')
+                callback_dedup.clear()
+                keypad_registry.build()
+                callback_executor.start_session(vc.voting_mode, target)
                 self.on_start(obj)
         return super(StartVoting, self).get(request, *args, **kwargs)
 
@@ -253,6 +329,8 @@ class StartYNA(StartVoting):
         self.clear_votes(poll)
         model = MotionPollKeypadConnection if type(poll) == MotionPoll else AssignmentPollKeypadConnection
         model.objects.filter(poll=poll).delete()
+        poll_tallies.start(self.kwargs['model'], poll.id)
+        seat_grids.start(self.kwargs['model'], poll.id)
 
         # Get candidate name (if is an election with one candidate only)
         candidate_str = ''
@@ -280,6 +358,8 @@ class StartElection(StartVoting):
     def on_start(self, poll):
         self.clear_votes(poll)
         AssignmentPollKeypadConnection.objects.filter(poll=poll).delete()
+        poll_tallies.start('AssignmentPoll', poll.id)
+        seat_grids.start('AssignmentPoll', poll.id)
 
         # Get candidate names (if is an election with >1 candidate)
         candidate_str = ''
@@ -319,13 +399,10 @@ class StartSpeakerList(StartVoting):
 
 class StartPing(StartVoting):
     def on_start(self, obj):
-        # Clear in_range and battery_level of all keypads.
-        # Attention: Cannot use Keypad.objects.all().update(in_range=False, battery_level=-1)
-        # since no post_save signals will be sent on update.
-        for keypad in Keypad.objects.all():
-            keypad.in_range = False
-            keypad.battery_level = -1
-            keypad.save()
+        # Clear in_range and battery_level of all keypads with one update and one autoupdate.
+        # Attention: No post_save signals are sent. The keypad registry and the keypad cache
+        # do not depend on these fields.
+        bulk_update(Keypad.objects.exclude(in_range=False, battery_level=-1), in_range=False, battery_level=-1)
 
 
 class StopVoting(VotingView):
@@ -345,10 +422,22 @@ class StopVoting(VotingView):
             self.result = stop_voting()
         except VoteCollectorError as e:
             self.error = e.value
+        # Write all pending and buffered votes of all processes before the
+        # voting is marked as stopped.
+        callback_executor.stop_session()
+        vote_buffer.flush()
+        voting_session.wait_pending()
+        voting_counters.flush()
         # Attention: We purposely set is_voting to False even if stop_voting fails.
         vc = VoteCollector.objects.get(id=1)
+        if vc.is_voting:
+            poll_tallies.save(vc.voting_mode, vc.voting_target)
+            seat_grids.publish(snapshot=True)
         vc.is_voting = False
         vc.save()
+        status_poller.clear('voting')
+        callback_dedup.clear()
+        keypad_registry.clear()
         return super(StopVoting, self).get(request, *args, **kwargs)
 
 
@@ -356,10 +445,9 @@ class VotingStatus(VotingView):
     def get(self, request, *args, **kwargs):
         obj = self.get_poll_object()
         if not self.error:
-            try:
-                self.result = get_voting_status()
-            except VoteCollectorError as e:
-                self.error = e.value
+            status = status_poller.get('voting')
+            self.result = status['result']
+            self.error = status['error']
         return super(VotingStatus, self).get(request, *args, **kwargs)
 
     def no_error_context(self):
@@ -376,27 +464,7 @@ class VotingResult(VotingView):
         if not self.error:
             vc = VoteCollector.objects.get(id=1)
             if vc.voting_mode == kwargs['model'] and vc.voting_target == int(kwargs['id']):
-                if vc.voting_mode == 'AssignmentPoll' and not poll.yesnoabstain and not poll.yesno:
-                    # Calculate vote result.
-                    self.result = {
-                        'invalid': 0,
-                        'valid': 0
-                    }
-                    for option in poll.get_options().all():
-                        self.result['vote_' + str(option.candidate_id)] = 0
-                    for conn in AssignmentPollKeypadConnection.objects.filter(poll_id=vc.voting_target):
-                        key = 'vote_' + str(conn.candidate_id)
-                        if conn.candidate and key in self.result:
-                            self.result[key] += 1
-                            self.result['valid'] += 1
-                        else:
-                            self.result['invalid'] += 1
-                else:
-                    # Get vote result from votecollector.
-                    try:
-                        self.result = get_voting_result()
-                    except VoteCollectorError as e:
-                        self.error = e.value
+                self.result = poll_tallies.get_result(vc.voting_mode, poll, final=not vc.is_voting)
             else:
                 self.error = _('Another voting is active.')
         return super(VotingResult, self).get(request, *args, **kwargs)
@@ -407,29 +475,216 @@ class VotingResult(VotingView):
         }
 
 
+class MetricsView(AjaxView):
+    """
+    Metrics of the plugin in the text format of Prometheus. Managers and
+    scrapers with the token votecollector_metrics_token can read them.
+    """
+    required_permission = 'openslides_votecollector.can_manage_votecollector'
+
+    def check_permission(self, request, *args, **kwargs):
+        token = config['votecollector_metrics_token']
+        if token and constant_time_compare(request.GET.get('token', ''), token):
+            return True
+        return super().check_permission(request, *args, **kwargs)
+
+    def get(self, request, *args, **kwargs):
+        stats = keypad_registry.get_stats()
+        values = [
+            ('votecollector_keypad_registry_hits_total', 'counter', 'Keypad lookups found in the registry.', stats['hits']),
+            ('votecollector_keypad_registry_misses_total', 'counter', 'Keypad lookups not found in the registry.', stats['misses']),
+            ('votecollector_keypad_registry_size', 'gauge', 'Keypads in the registry.', stats['size']),
+            ('votecollector_callbacks_pending', 'gauge', 'Callbacks waiting for asynchronous processing.',
+             len(callback_executor.pending)),
+        ]
+        try:
+            servers = [server for server, ranges in get_devices()]
+        except VoteCollectorError:
+            servers = []
+        healthy = [server.healthy for server in servers if server.healthy is not None]
+        if healthy:
+            values.append((
+                'votecollector_device_healthy', 'gauge', 'Whether the last calls to all devices got an answer.',
+                int(all(healthy))))
+        values.append((
+            'votecollector_device_idle_connections', 'gauge', 'Idle connections to VoteCollector.',
+            sum(server.proxies.qsize() for server in servers)))
+        return HttpResponse(metrics.render(values), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def count_vote(voting_mode, poll_id, keypad, value):
+    """
+    Adds an accepted vote of a keypad (or keypad record) to the seat grid of
+    the poll. The live result is counted by the database (see PollTallies).
+    """
+    seat_grids.add(voting_mode, poll_id, keypad.seat_id, value)
+
+
+class TraceView(AjaxView):
+    """
+    Returns the slowest traces and the recent traces over the threshold of
+    the votecollector views. A POST request drops all traces.
+    """
+    required_permission = 'openslides_votecollector.can_manage_votecollector'
+
+    def get_ajax_context(self, **kwargs):
+        context = super().get_ajax_context(**kwargs)
+        context.update(tracer.get_data())
+        return context
+
+    def post(self, request, *args, **kwargs):
+        tracer.clear()
+        return super().post(request, *args, **kwargs)
+
+
+def get_connection(model, poll, keypad):
+    """
+    Returns the keypad connection of a poll. A new connection is not saved.
+    """
+    try:
+        return model.objects.get(poll=poll, keypad=keypad)
+    except model.DoesNotExist:
+        return model(poll=poll, keypad=keypad)
+
+
+def save_connection(conn):
+    """
+    Saves a keypad connection without autoupdate. If a concurrent callback
+    of the same keypad created the connection since get_connection(), that
+    connection is updated.
+    """
+    try:
+        with transaction.atomic():
+            conn.save(skip_autoupdate=True)
+    except IntegrityError:
+        if conn.pk is not None:
+            raise
+        conn.pk = type(conn).objects.values_list('pk', flat=True).get(poll=conn.poll_id, keypad=conn.keypad_id)
+        conn.save(skip_autoupdate=True)
+
+
 class VotingCallbackView(utils_views.View):
     http_method_names = ['post']
 
+    # Whether repeated votes are answered from callback_dedup.
+    dedup = False
+
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Answers VoteCollector immediately and processes the callback in the
+        background if asynchronous callbacks are enabled. Repeated votes are
+        not processed again.
+        """
+        self.vote = None
+        with metrics.time_callback(type(self).__name__):
+            if self.dedup and request.method.lower() in self.http_method_names:
+                vote, repeated = callback_dedup.begin(
+                    kwargs['poll_id'], kwargs['keypad_id'], request.POST.get('sn'), request.POST.get('value'))
+                if repeated:
+                    if callback_executor.is_enabled() and vote.response is None:
+                        # The vote is in flight. Answer like the first callback.
+                        metrics.dedup_hits.inc(type(self).__name__)
+                        return self.get_async_response(request, *args, **kwargs)[0]
+                    response = callback_dedup.wait(vote)
+                    if response is not None:
+                        metrics.dedup_hits.inc(type(self).__name__)
+                        return HttpResponse(response)
+                else:
+                    self.vote = vote
+            if request.method.lower() not in self.http_method_names or not callback_executor.is_enabled():
+                return self.process(request, *args, **kwargs)
+            response, process = self.get_async_response(request, *args, **kwargs)
+            if process:
+                # Parse the request body before the request is handed over.
+                request.POST
+                callback_executor.submit(kwargs['keypad_id'], self.process, (request,) + args, kwargs)
+            else:
+                callback_dedup.finish(self.vote)
+            return response
+
+    def process(self, request, *args, **kwargs):
+        """
+        Processes the callback. The autoupdate system is informed once about
+        all instances in changed_instances.
+        """
+        self.changed_instances = []
+        self.accepted = False
+        response = None
+        try:
+            with metrics.count_queries(type(self).__name__), tracer.trace(type(self).__name__, request.path):
+                response = super().dispatch(request, *args, **kwargs)
+                if self.changed_instances:
+                    inform_changed_data(self.changed_instances)
+                return response
+        finally:
+            if self.accepted and response is not None:
+                callback_dedup.finish(self.vote, response.content.decode(response.charset))
+            else:
+                callback_dedup.finish(self.vote)
+
+    def count(self, result, reason=''):
+        """
+        Counts the result of the callback for the metrics.
+        """
+        self.accepted = result == 'accepted'
+        metrics.count_vote(type(self).__name__, result, reason)
+
+    def get_async_response(self, request, *args, **kwargs):
+        """
+        Returns a tuple with the response for an asynchronously processed
+        callback and a flag whether the callback has to be processed. This
+        method must not query the database.
+        """
+        return HttpResponse(), True
+
     def post(self, request, poll_id, keypad_id):
         # TODO: validate REMOTE_HOST to be VoteCollector or use other authentication method
 
-        # Get keypad.
-        try:
-            keypad = Keypad.objects.get(keypad_id=keypad_id)
-        except Keypad.DoesNotExist:
-            return None
+        # Get keypad from the registry.
+        with tracer.span('keypad lookup'):
+            record = keypad_registry.get(keypad_id)
+            if record is None:
+                return None
+            keypad = record.get_keypad()
 
         # Mark keypad as in range and update battery level.
         keypad.in_range = True
         keypad.battery_level = request.POST.get('battery', -1)
-        keypad.save()
+        with tracer.span('keypad write'):
+            if vote_buffer.is_enabled():
+                try:
+                    keypad.battery_level = int(keypad.battery_level)
+                except ValueError:
+                    keypad.battery_level = -1
+                vote_buffer.add_keypad(keypad)
+            else:
+                try:
+                    keypad.save(update_fields=['in_range', 'battery_level'], skip_autoupdate=True)
+                except DatabaseError:
+                    # The keypad was deleted in the meantime.
+                    return None
+                self.changed_instances.append(keypad)
         return keypad
 
 
 class VoteCallback(VotingCallbackView):
+    dedup = True
+
+    def get_async_response(self, request, poll_id, keypad_id):
+        if keypad_registry.get(keypad_id) is None:
+            self.count('rejected', 'unknown_keypad')
+            return HttpResponse(_('Vote rejected')), False
+        if not callback_executor.is_target(poll_id):
+            self.count('rejected', 'unknown_poll')
+            return HttpResponse(_('Vote rejected')), False
+        if request.POST.get('value') not in ('Y', 'N', 'A'):
+            return HttpResponse(_('Vote invalid')), True
+        return HttpResponse(_('Vote submitted')), True
+
     def post(self, request, poll_id, keypad_id):
         keypad = super(VoteCallback, self).post(request, poll_id, keypad_id)
         if keypad is None:
+            self.count('rejected', 'unknown_keypad')
             return HttpResponse(_('Vote rejected'))
 
         # TODO: Use transaction here.
@@ -437,114 +692,297 @@ class VoteCallback(VotingCallbackView):
         # Validate vote value.
         value = request.POST.get('value')
         if value not in ('Y', 'N', 'A'):
+            self.count('invalid', 'invalid_value')
             return HttpResponse(_('Vote invalid'))
 
-        # Save vote.
-        vc = VoteCollector.objects.get(id=1)
-        model = MotionPoll if vc.voting_mode == 'MotionPoll' else AssignmentPoll
-        try:
-            poll = model.objects.get(id=poll_id)
-        except model.DoesNotExist:
-            return HttpResponse(_('Vote rejected'))
+        # Get poll.
+        with tracer.span('poll lookup'):
+            vc = VoteCollector.objects.get(id=1)
+            model = MotionPoll if vc.voting_mode == 'MotionPoll' else AssignmentPoll
+            try:
+                poll = model.objects.get(id=poll_id)
+            except model.DoesNotExist:
+                self.count('rejected', 'unknown_poll')
+                return HttpResponse(_('Vote rejected'))
 
-        if vc.voting_mode == 'MotionPoll':
-            conn, created = MotionPollKeypadConnection.objects.get_or_create(poll=poll, keypad=keypad)
-            conn.serial_number = request.POST.get('sn')
-        else:
-            conn, created = AssignmentPollKeypadConnection.objects.get_or_create(poll=poll, keypad=keypad)
-            conn.serial_number = request.POST.get('sn')
-        conn.value = value
-        conn.save()
+        # Save vote.
+        conn_model = MotionPollKeypadConnection if vc.voting_mode == 'MotionPoll' else AssignmentPollKeypadConnection
+        with tracer.span('connection write'):
+            if vote_buffer.is_enabled():
+                vote_buffer.add_vote(conn_model, poll.id, keypad.id, value=value, serial_number=request.POST.get('sn'))
+            else:
+                conn = get_connection(conn_model, poll, keypad)
+                conn.serial_number = request.POST.get('sn')
+                conn.value = value
+                save_connection(conn)
+                self.changed_instances.append(conn)
+            count_vote(vc.voting_mode, poll.id, keypad, value)
 
         # Update votecollector.
-        vc.votes_received = request.POST.get('votes', 0)
-        vc.voting_duration = request.POST.get('elapsed', 0)
-        vc.save()
+        with tracer.span('votecollector update'):
+            voting_counters.update(
+                request.POST.get('votes', 0), request.POST.get('elapsed', 0), get_device_index(keypad.keypad_id))
 
+        self.count('accepted')
         return HttpResponse(_('Vote submitted'))
 
 
+class VotesCallback(utils_views.View):
+    """
+    Callback for a batch of yes/no/abstain votes.
+
+    The request body is a JSON object with the aggregated counters votes and
+    elapsed and a list of records. Each record has the keys keypad_id, value,
+    sn and battery. All accepted votes are written in one transaction. The
+    response contains a code for each record: accepted, invalid or rejected.
+    Repeated votes (see callback_dedup) are accepted without writing them.
+    """
+    http_method_names = ['post']
+
+    def dispatch(self, request, *args, **kwargs):
+        with metrics.time_callback('VotesCallback'), metrics.count_queries('VotesCallback'), \
+                tracer.trace('VotesCallback', request.path):
+            return super().dispatch(request, *args, **kwargs)
+
+    def post(self, request, poll_id):
+        try:
+            data = json.loads(request.body.decode('utf-8'))
+            records = data['records']
+        except (ValueError, KeyError, TypeError):
+            return HttpResponseBadRequest(_('Invalid batch'))
+        if not isinstance(records, list):
+            return HttpResponseBadRequest(_('Invalid batch'))
+
+        with tracer.span('poll lookup'):
+            vc = VoteCollector.objects.get(id=1)
+            if vc.voting_mode == 'MotionPoll':
+                poll_exists = MotionPoll.objects.filter(id=poll_id).exists()
+                conn_model = MotionPollKeypadConnection
+            else:
+                poll_exists = AssignmentPoll.objects.filter(id=poll_id).exists()
+                conn_model = AssignmentPollKeypadConnection
+
+        votes = {}
+        keypads = {}
+        accepted = []
+        # Accepted keypads with their values. They are counted after the
+        # votes are written.
+        counted = []
+        # Votes of this batch which are recorded as in flight.
+        in_flight = []
+        codes = []
+        for record in records:
+            try:
+                keypad = keypad_registry.get(record['keypad_id'])
+            except (KeyError, TypeError, ValueError):
+                keypad = None
+            if keypad is None:
+                metrics.count_vote('VotesCallback', 'rejected', 'unknown_keypad')
+                codes.append('rejected')
+                continue
+            vote, repeated = callback_dedup.begin(poll_id, keypad.keypad_id, record.get('sn'), record.get('value'))
+            if repeated:
+                if vote not in in_flight and callback_dedup.wait(vote) is not None:
+                    metrics.dedup_hits.inc('VotesCallback')
+                    codes.append('accepted')
+                    continue
+                vote = None
+
+            # Mark keypad as in range and update battery level.
+            try:
+                keypads[keypad.pk] = int(record.get('battery', -1))
+            except (TypeError, ValueError):
+                keypads[keypad.pk] = -1
+
+            # Validate vote value.
+            value = record.get('value')
+            if not poll_exists:
+                metrics.count_vote('VotesCallback', 'rejected', 'unknown_poll')
+                codes.append('rejected')
+                callback_dedup.finish(vote)
+            elif not isinstance(value, str) or value not in KEYPAD_MAP:
+                metrics.count_vote('VotesCallback', 'invalid', 'invalid_value')
+                codes.append('invalid')
+                callback_dedup.finish(vote)
+            else:
+                sn = record.get('sn')
+                votes[(conn_model, int(poll_id), keypad.pk)] = {
+                    'value': value,
+                    'serial_number': str(sn) if sn is not None else None,
+                }
+                counted.append((keypad, value))
+                accepted.append(keypad.keypad_id)
+                if vote is not None:
+                    in_flight.append(vote)
+                codes.append('accepted')
+
+        # Save votes.
+        response = None
+        try:
+            with tracer.span('connection write'):
+                if vote_buffer.is_enabled():
+                    vote_buffer.extend(votes, keypads)
+                elif votes or keypads:
+                    vote_buffer.write(votes, keypads)
+            response = _('Vote submitted')
+        finally:
+            for vote in in_flight:
+                callback_dedup.finish(vote, response)
+        for keypad, value in counted:
+            count_vote(vc.voting_mode, poll_id, keypad, value)
+            metrics.count_vote('VotesCallback', 'accepted')
+
+        # Update votecollector.
+        if votes:
+            with tracer.span('votecollector update'):
+                # A batch comes from one device.
+                voting_counters.update(data.get('votes', 0), data.get('elapsed', 0), get_device_index(accepted[0]))
+
+        return HttpResponse(json.dumps({'codes': codes}), content_type='application/json')
+
+
 class CandidateCallback(VotingCallbackView):
+    dedup = True
+
+    def get_async_response(self, request, poll_id, keypad_id):
+        if keypad_registry.get(keypad_id) is None:
+            self.count('rejected', 'unknown_keypad')
+            return HttpResponse(_('Vote rejected')), False
+        if not callback_executor.is_target(poll_id):
+            self.count('rejected', 'unknown_poll')
+            return HttpResponse(_('Vote rejected')), False
+        try:
+            key = int(request.POST.get('value'))
+        except (TypeError, ValueError):
+            return HttpResponse(_('Vote invalid')), True
+        if key < 0 or key > 9:
+            return HttpResponse(_('Vote invalid')), True
+        return HttpResponse(_('Vote submitted')), True
+
     def post(self, request, poll_id, keypad_id):
         keypad = super(CandidateCallback, self).post(request, poll_id, keypad_id)
         if keypad is None:
+            self.count('rejected', 'unknown_keypad')
             return HttpResponse(_('Vote rejected'))
 
         # TODO: Use transaction here.
 
         # Get assignment poll.
-        try:
-            poll = AssignmentPoll.objects.get(id=poll_id)
-        except AssignmentPoll.DoesNotExist:
-            return HttpResponse(_('Vote rejected'))
+        with tracer.span('poll lookup'):
+            try:
+                poll = AssignmentPoll.objects.get(id=poll_id)
+            except AssignmentPoll.DoesNotExist:
+                self.count('rejected', 'unknown_poll')
+                return HttpResponse(_('Vote rejected'))
 
         # Validate vote value.
         try:
             key = int(request.POST.get('value'))
         except ValueError:
+            self.count('invalid', 'invalid_value')
             return HttpResponse(_('Vote invalid'))
         if key < 0 or key > 9:
+            self.count('invalid', 'invalid_value')
             return HttpResponse(_('Vote invalid'))
 
         # Get the elected candidate.
         candidate = None
-        if key > 0 and key <= poll.assignment.related_users.all().count():
-            # TODO: sort candidates by weight if implemented in OpenSlides core
-            candidate = AssignmentOption.objects.filter(poll=poll_id).order_by('id').all()[key - 1].candidate
+        with tracer.span('candidate lookup'):
+            if key > 0 and key <= poll.assignment.related_users.all().count():
+                # TODO: sort candidates by weight if implemented in OpenSlides core
+                candidate = AssignmentOption.objects.filter(poll=poll_id).order_by('id').all()[key - 1].candidate
 
         # Save vote.
-        conn, created = AssignmentPollKeypadConnection.objects.get_or_create(poll=poll, keypad=keypad)
-        conn.serial_number = request.POST.get('sn')
-        conn.value = str(key)
-        conn.candidate = candidate
-        conn.save()
+        with tracer.span('connection write'):
+            if vote_buffer.is_enabled():
+                vote_buffer.add_vote(
+                    AssignmentPollKeypadConnection, poll.id, keypad.id,
+                    value=str(key), serial_number=request.POST.get('sn'), candidate_id=candidate.id if candidate else None)
+            else:
+                conn = get_connection(AssignmentPollKeypadConnection, poll, keypad)
+                conn.serial_number = request.POST.get('sn')
+                conn.value = str(key)
+                conn.candidate = candidate
+                save_connection(conn)
+                self.changed_instances.append(conn)
+            count_vote('AssignmentPoll', poll.id, keypad, str(key))
 
         # Update votecollector.
-        vc = VoteCollector.objects.get(id=1)
-        vc.votes_received = request.POST.get('votes', 0)
-        vc.voting_duration = request.POST.get('elapsed', 0)
-        vc.save()
+        with tracer.span('votecollector update'):
+            voting_counters.update(
+                request.POST.get('votes', 0), request.POST.get('elapsed', 0), get_device_index(keypad.keypad_id))
 
+        self.count('accepted')
         return HttpResponse(_('Vote submitted'))
 
 
 class SpeakerCallback(VotingCallbackView):
+    def get_async_response(self, request, item_id, keypad_id):
+        record = keypad_registry.get(keypad_id)
+        if record is None:
+            self.count('rejected', 'unknown_keypad')
+            return HttpResponse(_('Keypad not registered')), False
+        if record.user_id is None:
+            return HttpResponse(_('User unknown')), True
+        if not callback_executor.is_target(item_id):
+            self.count('rejected', 'unknown_item')
+            return HttpResponse(_('No agenda item selected')), False
+        value = request.POST.get('value')
+        if value == 'Y':
+            content = _('Added to        list of speakers')
+        elif value == 'N':
+            content = _('Removed from    list of speakers')
+        else:
+            content = _('Invalid entry')
+        return HttpResponse(content), True
+
     def post(self, request, item_id, keypad_id):
         keypad = super(SpeakerCallback, self).post(request, item_id, keypad_id)
         if keypad is None:
+            self.count('rejected', 'unknown_keypad')
             return HttpResponse(_('Keypad not registered'))
 
         # Anonymous users cannot be added or removed from the speaker list.
-        if keypad.user is None:
+        if keypad.user_id is None:
+            self.count('rejected', 'unknown_user')
             return HttpResponse(_('User unknown'))
 
         # Get agenda item.
-        try:
-            item = Item.objects.get(id=item_id)
-        except MotionPoll.DoesNotExist:
-            return HttpResponse(_('No agenda item selected'))
+        with tracer.span('item lookup'):
+            try:
+                item = Item.objects.get(id=item_id)
+            except MotionPoll.DoesNotExist:
+                self.count('rejected', 'unknown_item')
+                return HttpResponse(_('No agenda item selected'))
 
         # Add keypad user to the speaker list.
         value = request.POST.get('value')
         if value == 'Y':
-            try:
-                # Add speaker to "next speakers" if not already on the list (begin_time=None).
-                Speaker.objects.add(keypad.user, item)
-            except OpenSlidesError:
-                # User is already on the speaker list.
-                pass
+            with tracer.span('speaker write'):
+                try:
+                    # Add speaker to "next speakers" if not already on the list (begin_time=None).
+                    Speaker.objects.add(keypad.user, item)
+                except OpenSlidesError:
+                    # User is already on the speaker list.
+                    pass
             content = _('Added to        list of speakers')
         # Remove keypad user from the speaker list.
         elif value == 'N':
             # Remove speaker if on "next speakers" list (begin_time=None, end_time=None).
-            Speaker.objects.filter(user=keypad.user, item=item, begin_time=None, end_time=None).delete()
+            with tracer.span('speaker write'):
+                Speaker.objects.filter(user_id=keypad.user_id, item=item, begin_time=None, end_time=None).delete()
             content = _('Removed from    list of speakers')
         else:
-            content = _('Invalid entry')
+            self.count('invalid', 'invalid_value')
+            return HttpResponse(_('Invalid entry'))
+        self.count('accepted')
         return HttpResponse(content)
 
 
 class KeypadCallback(VotingCallbackView):
     def post(self, request, poll_id=0, keypad_id=0):
-        super(KeypadCallback, self).post(request, poll_id, keypad_id)
+        if super(KeypadCallback, self).post(request, poll_id, keypad_id) is None:
+            self.count('rejected', 'unknown_keypad')
+        else:
+            self.count('accepted')
         return HttpResponse()
@@ -0,0 +1,210 @@
+import atexit
+import threading
+import warnings
+from collections import defaultdict
+
+from django.db import IntegrityError, close_old_connections, transaction
+
+from openslides.core.config import config
+
+from .models import Keypad
+from .utils import inform_changed_data
+from .voting_session import voting_session
+
+
+class VoteBuffer:
+    """
+    Write-behind buffer for incoming keypad callbacks.
+
+    The callback views validate a vote and append it to the buffer. A
+    background thread writes all buffered votes in one transaction with
+    bulk_create and bulk updates and sends one autoupdate per flush.
+
+    The buffer is flushed every votecollector_buffer_interval milliseconds or
+    as soon as it holds votecollector_buffer_size votes. If a flush fails, the
+    votes stay in the buffer for the next flush. The buffer has to be drained
+    with flush() when a voting stops. At interpreter shutdown it is drained
+    automatically. The buffered votes are counted as pending votes of the
+    voting session, so a process which stops a voting can wait for the
+    buffers of all other processes (see VotingSession.wait_pending()).
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.votes = {}
+        self.keypads = {}
+
+    def is_enabled(self):
+        """
+        Returns True if incoming votes should be buffered.
+        """
+        return config['votecollector_buffer']
+
+    def add_keypad(self, keypad):
+        """
+        Buffers the in_range and battery_level state of a keypad.
+        """
+        with self.lock:
+            self.keypads[keypad.pk] = keypad.battery_level
+        self.start()
+
+    def add_vote(self, model, poll_id, keypad_id, **fields):
+        """
+        Buffers a vote of a keypad (pk) for a poll. The model is the keypad
+        connection model, fields are the values of the connection.
+
+        A later vote of the same keypad for the same poll replaces the
+        earlier one.
+        """
+        key = (model, poll_id, keypad_id)
+        with self.lock:
+            new = key not in self.votes
+            self.votes[key] = fields
+            size = len(self.votes)
+        if new:
+            voting_session.add_pending()
+        self.start()
+        if size >= config['votecollector_buffer_size']:
+            self.wakeup.set()
+
+    def extend(self, votes, keypads):
+        """
+        Buffers many votes and keypad states at once. See write() for the
+        structure of votes and keypads.
+        """
+        with self.lock:
+            new = sum(1 for key in votes if key not in self.votes)
+            self.votes.update(votes)
+            self.keypads.update(keypads)
+            size = len(self.votes)
+        voting_session.add_pending(new)
+        self.start()
+        if size >= config['votecollector_buffer_size']:
+            self.wakeup.set()
+
+    def start(self):
+        """
+        Starts the background thread if it is not running yet.
+        """
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.run, name='votecollector-buffer', daemon=True)
+                    self.thread.start()
+                    atexit.register(self.flush)
+
+    def run(self):
+        """
+        Flushes the buffer periodically. Runs in the background thread.
+        """
+        while True:
+            self.wakeup.wait(config['votecollector_buffer_interval'] / 1000)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                warnings.warn('Flushing the vote buffer failed: %s' % e, RuntimeWarning)
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """
+        Writes all buffered data to the database and informs the autoupdate
+        system once. Returns the number of written votes. If writing fails,
+        the data stays in the buffer and the error is raised.
+        """
+        with self.flush_lock:
+            with self.lock:
+                votes, self.votes = self.votes, {}
+                keypads, self.keypads = self.keypads, {}
+            if not votes and not keypads:
+                return 0
+            try:
+                self.write(votes, keypads)
+            except Exception:
+                # Put the data back for the next flush. Data which was buffered
+                # in the meantime is newer.
+                with self.lock:
+                    count = len(votes) + len(self.votes)
+                    votes.update(self.votes)
+                    keypads.update(self.keypads)
+                    self.votes, self.keypads = votes, keypads
+                voting_session.add_pending(len(votes) - count)
+                raise
+            voting_session.add_pending(-len(votes))
+            return len(votes)
+
+    def write(self, votes, keypads):
+        """
+        Writes votes and keypad states in one transaction and informs the
+        autoupdate system once.
+
+        votes maps (connection model, poll id, keypad pk) to the values of the
+        connection, keypads maps the keypad pk to its battery level.
+
+        If a concurrent request created some of the connections in the
+        meantime, the transaction is repeated once and updates them.
+        """
+        try:
+            changed = self.write_all(votes, keypads)
+        except IntegrityError:
+            changed = self.write_all(votes, keypads)
+        inform_changed_data(changed)
+
+    def write_all(self, votes, keypads):
+        """
+        Writes votes and keypad states in one transaction. Returns the
+        written objects.
+        """
+        changed = []
+        with transaction.atomic():
+            if keypads:
+                changed.extend(self.write_keypads(keypads))
+            if votes:
+                changed.extend(self.write_votes(votes))
+        return changed
+
+    def write_keypads(self, keypads):
+        """
+        Marks the keypads as in range. Uses one update per battery level.
+        """
+        levels = defaultdict(list)
+        for pk, battery_level in keypads.items():
+            levels[battery_level].append(pk)
+        for battery_level, pks in levels.items():
+            Keypad.objects.filter(pk__in=pks).update(in_range=True, battery_level=battery_level)
+        return Keypad.objects.filter(pk__in=list(keypads))
+
+    def write_votes(self, votes):
+        """
+        Creates or updates the keypad connections. Returns the written
+        connections.
+        """
+        polls = defaultdict(dict)
+        for (model, poll_id, keypad_id), fields in votes.items():
+            polls[(model, poll_id)][keypad_id] = fields
+
+        changed = []
+        for (model, poll_id), keypads in polls.items():
+            queryset = model.objects.filter(poll_id=poll_id, keypad_id__in=list(keypads))
+            existing = dict(queryset.values_list('keypad_id', 'pk'))
+
+            # Create all new connections at once.
+            model.objects.bulk_create(
+                model(poll_id=poll_id, keypad_id=keypad_id, **fields)
+                for keypad_id, fields in keypads.items() if keypad_id not in existing)
+
+            # Update changed votes. Use one update per distinct set of values.
+            updates = defaultdict(list)
+            for keypad_id, pk in existing.items():
+                updates[tuple(sorted(keypads[keypad_id].items()))].append(pk)
+            for fields, pks in updates.items():
+                model.objects.filter(pk__in=pks).update(**dict(fields))
+
+            changed.extend(queryset)
+        return changed
+
+
+vote_buffer = VoteBuffer()
@@ -0,0 +1,127 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import connection
+
+from .models import VoteCollector
+from .utils import inform_changed_data
+from .voting_session import voting_session
+
+
+class VotingCounters:
+    """
+    Live counters (votes_received and voting_duration) of the active voting.
+
+    Every device reports its own counters. votes_received is their sum and
+    voting_duration their maximum. The callbacks only update the counters
+    in memory. They are written to
+    the VoteCollector model and sent via autoupdate at most every interval
+    seconds. flush() writes pending counters immediately and has to be called
+    when a voting stops.
+
+    Every process only sees the callbacks it handles. The counters are
+    merged with the counters of the other processes in Django's cache
+    before they are written. They belong to a generation of the voting
+    session, so counters of a former voting are dropped and never
+    published.
+    """
+    cache_key = 'votecollector_voting_counters'
+    interval = 0.25
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.publish_lock = threading.Lock()
+        self.values = {}
+        self.generation = None
+        self.dirty = False
+        self.timer = None
+        self.last_publish = 0
+
+    def update(self, votes_received, voting_duration, device=0):
+        """
+        Updates the counters of a device (see api.get_device_index()). Both
+        values only grow during a voting, so callbacks arriving out of order
+        do not decrease them.
+        """
+        try:
+            votes_received = int(votes_received)
+            voting_duration = int(voting_duration)
+        except (TypeError, ValueError):
+            return
+        generation = voting_session.get().generation
+        with self.lock:
+            if generation != self.generation:
+                # A new voting was started, maybe by another process.
+                self.values = {}
+                self.generation = generation
+            values = self.values.get(device)
+            if values is not None:
+                votes_received = max(votes_received, values[0])
+                voting_duration = max(voting_duration, values[1])
+            self.values[device] = (votes_received, voting_duration)
+            self.dirty = True
+            if self.timer is None:
+                delay = max(0, self.last_publish + self.interval - time.monotonic())
+                self.timer = threading.Timer(delay, self.publish_in_background)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def reset(self):
+        """
+        Drops pending counters, e. g. when a new voting starts.
+        """
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self.values = {}
+            self.dirty = False
+
+    def flush(self):
+        """
+        Writes pending counters immediately.
+        """
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        self.publish()
+
+    def publish(self):
+        """
+        Merges the counters with the counters of the other processes, writes
+        them to the VoteCollector model and informs the autoupdate system.
+        """
+        with self.publish_lock:
+            with self.lock:
+                values = dict(self.values)
+                generation = self.generation
+                dirty, self.dirty = self.dirty, False
+                self.timer = None
+                self.last_publish = time.monotonic()
+            if not dirty or generation != voting_session.get().generation:
+                return
+            shared = cache.get(self.cache_key)
+            if shared is not None and shared[0] == generation:
+                for device, (votes_received, voting_duration) in shared[1].items():
+                    own = values.get(device, (0, 0))
+                    values[device] = (max(votes_received, own[0]), max(voting_duration, own[1]))
+            cache.set(self.cache_key, (generation, values), None)
+            values = list(values.values())
+            VoteCollector.objects.filter(id=1).update(
+                votes_received=sum(value[0] for value in values),
+                voting_duration=max(value[1] for value in values))
+            inform_changed_data(VoteCollector.objects.get(id=1))
+
+    def publish_in_background(self):
+        """
+        Publishes the counters from the timer thread.
+        """
+        try:
+            self.publish()
+        finally:
+            connection.close()
+
+
+voting_counters = VotingCounters()
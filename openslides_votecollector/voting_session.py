@@ -0,0 +1,111 @@
+import time
+import warnings
+from collections import namedtuple
+
+from django.core.cache import cache
+
+from .models import VoteCollector
+
+
+class Session(namedtuple('Session', 'generation voting_mode voting_target')):
+    """
+    Snapshot of the shared state. voting_mode and voting_target are None if
+    no voting is active.
+    """
+    __slots__ = ()
+
+    def is_active(self):
+        return self.voting_mode is not None
+
+
+class VotingSession:
+    """
+    State of the active voting which is shared by all processes through
+    Django's cache.
+
+    The session holds the mode and the target of the active voting, so
+    callbacks can be validated without a database query in every process.
+    Every start of a voting increments the generation of the session. If
+    the session is missing in the cache, it is read from the VoteCollector
+    model.
+
+    The pending counter holds the number of votes which were accepted by any
+    process but are not written to the database yet, e. g. votes in the vote
+    buffer or in the callback executor. When a voting stops, wait_pending()
+    waits until all processes wrote them, so the result of the voting
+    contains all votes.
+    """
+    cache_key = 'votecollector_voting_session'
+    pending_key = 'votecollector_pending_votes'
+
+    # Seconds to wait for the pending votes of other processes.
+    timeout = 10
+
+    def get(self):
+        """
+        Returns the current session.
+        """
+        session = cache.get(self.cache_key)
+        if session is None:
+            vc = VoteCollector.objects.get(id=1)
+            if vc.is_voting:
+                session = Session(0, vc.voting_mode, vc.voting_target)
+            else:
+                session = Session(0, None, None)
+            cache.add(self.cache_key, session, None)
+        return session
+
+    def start(self, voting_mode, voting_target):
+        """
+        Starts a new generation of the session for a voting.
+        """
+        session = Session(self.get().generation + 1, voting_mode, voting_target)
+        cache.set(self.cache_key, session, None)
+        return session
+
+    def stop(self):
+        """
+        Marks the voting of the session as stopped.
+        """
+        cache.set(self.cache_key, self.get()._replace(voting_mode=None, voting_target=None), None)
+
+    def add_pending(self, count=1):
+        """
+        Counts accepted votes which are not written yet. Use a negative count
+        for written votes.
+        """
+        if not count:
+            return
+        try:
+            value = cache.incr(self.pending_key, count)
+        except ValueError:
+            # The counter is missing, e. g. after the cache was cleared.
+            value = count
+            cache.set(self.pending_key, max(value, 0), None)
+        if value < 0:
+            # Votes which were given up by wait_pending() were written.
+            cache.set(self.pending_key, 0, None)
+
+    def get_pending(self):
+        """
+        Returns the number of votes which are not written yet.
+        """
+        return cache.get(self.pending_key, 0)
+
+    def wait_pending(self):
+        """
+        Waits until all processes wrote their pending votes. After timeout
+        seconds the votes still pending are given up, e. g. the votes of a
+        process which crashed. Returns True if all votes were written.
+        """
+        deadline = time.monotonic() + self.timeout
+        while self.get_pending() > 0:
+            if time.monotonic() > deadline:
+                warnings.warn('%d votes of other processes were not written in time.' % self.get_pending(), RuntimeWarning)
+                cache.set(self.pending_key, 0, None)
+                return False
+            time.sleep(0.05)
+        return True
+
+
+voting_session = VotingSession()
@@ -0,0 +1,34 @@
+from openslides.users.models import User
+from openslides.utils.test import TestCase
+
+from openslides_votecollector.api import clear_keypad_cache, get_keypads
+from openslides_votecollector.models import Keypad
+
+
+class TestGetKeypads(TestCase):
+    def setUp(self):
+        Keypad.objects.create(keypad_id=1)
+        Keypad.objects.create(keypad_id=2, user=User.objects.create(username='user'))
+        clear_keypad_cache()
+
+    def test_cached(self):
+        self.assertEqual(get_keypads(), [1, 2])
+        Keypad.objects.filter(keypad_id=2).update(keypad_id=3)
+
+        self.assertEqual(get_keypads(), [1, 2])
+
+    def test_cleared_by_other_process(self):
+        get_keypads()
+        # Change the keypad without signals like another process.
+        Keypad.objects.filter(keypad_id=2).update(keypad_id=3)
+        clear_keypad_cache()
+
+        self.assertEqual(get_keypads(), [1, 3])
+
+    def test_cleared_on_change(self):
+        get_keypads()
+        User.objects.filter(username='user').update(is_active=False)
+        user = User.objects.get(username='user')
+        user.save()
+
+        self.assertEqual(get_keypads(), [1])
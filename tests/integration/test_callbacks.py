@@ -0,0 +1,135 @@
+import json
+from unittest.mock import patch
+
+from django.db import DatabaseError, IntegrityError
+from django.test import Client
+
+from openslides.motions.models import Motion
+from openslides.utils.test import TestCase
+
+from openslides_votecollector.callback_dedup import callback_dedup
+from openslides_votecollector.keypad_registry import keypad_registry
+from openslides_votecollector.models import Keypad, MotionPollKeypadConnection, VoteCollector
+from openslides_votecollector.vote_buffer import VoteBuffer
+from openslides_votecollector.views import get_connection, save_connection
+
+
+class TestSaveConnection(TestCase):
+    """
+    Tests the write of a vote which races with a concurrent callback of the
+    same keypad.
+    """
+    def setUp(self):
+        motion = Motion(title='motion', text='text')
+        motion.save()
+        self.poll = motion.create_poll()
+        self.keypad = Keypad.objects.create(keypad_id=1)
+
+    def test_new_connection(self):
+        conn = get_connection(MotionPollKeypadConnection, self.poll, self.keypad)
+        conn.value = 'Y'
+        save_connection(conn)
+
+        self.assertEqual(MotionPollKeypadConnection.objects.get().value, 'Y')
+
+    def test_connection_created_concurrently(self):
+        conn = get_connection(MotionPollKeypadConnection, self.poll, self.keypad)
+        other = MotionPollKeypadConnection.objects.create(poll=self.poll, keypad=self.keypad, value='Y')
+        conn.value = 'N'
+        save_connection(conn)
+
+        self.assertEqual(conn.pk, other.pk)
+        self.assertEqual(list(MotionPollKeypadConnection.objects.values_list('value', flat=True)), ['N'])
+
+    def test_vote_callback(self):
+        VoteCollector.objects.filter(id=1).update(voting_mode='MotionPoll', voting_target=self.poll.pk, is_voting=True)
+        conn = get_connection(MotionPollKeypadConnection, self.poll, self.keypad)
+        MotionPollKeypadConnection.objects.create(poll=self.poll, keypad=self.keypad, value='Y')
+
+        # Do not update the counters in the background.
+        with patch('openslides_votecollector.views.voting_counters'), \
+                patch('openslides_votecollector.views.get_connection', lambda *args: conn):
+            response = Client().post('/votecollector/vote/%d/1/' % self.poll.pk, {'value': 'A', 'sn': '1'})
+
+        self.assertEqual(response.content, b'Vote submitted')
+        self.assertEqual(list(MotionPollKeypadConnection.objects.values_list('value', flat=True)), ['A'])
+
+
+class TestVotesCallback(TestCase):
+    def setUp(self):
+        motion = Motion(title='motion', text='text')
+        motion.save()
+        self.poll = motion.create_poll()
+        for keypad_id in (1, 2, 3):
+            Keypad.objects.create(keypad_id=keypad_id)
+        VoteCollector.objects.filter(id=1).update(voting_mode='MotionPoll', voting_target=self.poll.pk, is_voting=True)
+        keypad_registry.build()
+        callback_dedup.clear()
+        self.addCleanup(callback_dedup.clear)
+        # Do not update the counters and the seat grid in the background.
+        for name in ('voting_counters', 'seat_grids'):
+            patcher = patch('openslides_votecollector.views.' + name)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def post(self, *records):
+        response = Client().post(
+            '/votecollector/votes/%d/' % self.poll.pk,
+            json.dumps({'votes': len(records), 'elapsed': 1, 'records': list(records)}),
+            content_type='application/json')
+        return json.loads(response.content.decode('utf-8'))['codes']
+
+    def get_votes(self):
+        return dict(MotionPollKeypadConnection.objects.values_list('keypad__keypad_id', 'value'))
+
+    def test_codes(self):
+        codes = self.post(
+            {'keypad_id': 1, 'value': 'Y', 'sn': '1'},
+            {'keypad_id': 2, 'value': 'X', 'sn': '2'},
+            {'keypad_id': 9, 'value': 'Y', 'sn': '9'},
+            {'value': 'Y'})
+
+        self.assertEqual(codes, ['accepted', 'invalid', 'rejected', 'rejected'])
+        self.assertEqual(self.get_votes(), {1: 'Y'})
+        self.assertEqual(self.seat_grids.add.call_count, 1)
+
+    def test_repeated_record(self):
+        record = {'keypad_id': 1, 'value': 'Y', 'sn': '1'}
+        self.assertEqual(self.post(record), ['accepted'])
+        # Show that the repeated record is not written again.
+        MotionPollKeypadConnection.objects.update(value='N')
+
+        self.assertEqual(self.post(record, {'keypad_id': 2, 'value': 'X', 'sn': '2'}), ['accepted', 'invalid'])
+        self.assertEqual(self.get_votes(), {1: 'N'})
+        self.assertEqual(self.seat_grids.add.call_count, 1)
+
+    def test_repeated_record_in_batch(self):
+        record = {'keypad_id': 1, 'value': 'Y', 'sn': '1'}
+
+        self.assertEqual(self.post(record, record), ['accepted', 'accepted'])
+        self.assertEqual(self.get_votes(), {1: 'Y'})
+
+    def test_connection_created_concurrently(self):
+        write_votes = VoteBuffer.write_votes
+        calls = []
+
+        def race(buffer, votes):
+            # The first write fails like a concurrent insert of keypad 1.
+            calls.append(votes)
+            if len(calls) == 1:
+                raise IntegrityError
+            return write_votes(buffer, votes)
+
+        with patch.object(VoteBuffer, 'write_votes', race):
+            codes = self.post({'keypad_id': 1, 'value': 'Y', 'sn': '1'})
+
+        self.assertEqual(codes, ['accepted'])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.get_votes(), {1: 'Y'})
+        self.assertEqual(self.seat_grids.add.call_count, 1)
+
+    def test_failed_write_not_counted(self):
+        with patch.object(VoteBuffer, 'write_votes', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            self.post({'keypad_id': 1, 'value': 'Y', 'sn': '1'})
+
+        self.assertFalse(self.seat_grids.add.called)
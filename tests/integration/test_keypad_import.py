@@ -0,0 +1,73 @@
+from openslides.users.models import User
+from openslides.utils.test import TestCase
+
+from openslides_votecollector.keypad_import import KeypadImport
+from openslides_votecollector.models import Keypad, Seat
+
+HEADER = 'title,first_name,last_name,structure_level,keypad_id,seat_label'
+
+
+class TestKeypadImport(TestCase):
+    def setUp(self):
+        for name in ('Alice', 'Bob', 'Carol'):
+            User.objects.create(username=name.lower(), first_name=name, last_name='Smith')
+        for x_axis, number in enumerate(('A1', 'A2', 'A3')):
+            Seat.objects.create(number=number, seating_plan_x_axis=x_axis, seating_plan_y_axis=100)
+
+    def read(self, *lines):
+        keypad_import = KeypadImport()
+        keypad_import.read([HEADER] + list(lines))
+        return keypad_import
+
+    def get_keypads(self):
+        return list(Keypad.objects.order_by('keypad_id').values_list('keypad_id', 'user__first_name', 'seat__number'))
+
+    def test_import(self):
+        keypad_import = self.read(',Alice,Smith,,1,A1', ',Bob,Smith,,2,A2')
+
+        self.assertEqual(keypad_import.errors, [])
+        self.assertEqual(keypad_import.save(), 2)
+        self.assertEqual(self.get_keypads(), [(1, 'Alice', 'A1'), (2, 'Bob', 'A2')])
+
+    def test_duplicates_in_file(self):
+        keypad_import = self.read(
+            ',Alice,Smith,,1,A1',
+            ',Bob,Smith,,1,A2',
+            ',Alice,Smith,,3,A3',
+            ',Carol,Smith,,4,A1')
+
+        self.assertEqual(keypad_import.errors, [
+            {'line': 3, 'errors': ['Error: Keypad ID already exists.']},
+            {'line': 4, 'errors': ['Error: Participant already has a keypad.']},
+            {'line': 5, 'errors': ['Error: Seat ID already assigned to a keypad.']},
+        ])
+        self.assertEqual(keypad_import.save(), 1)
+        self.assertEqual(self.get_keypads(), [(1, 'Alice', 'A1')])
+
+    def test_duplicates_in_database(self):
+        Keypad.objects.create(
+            keypad_id=1, user=User.objects.get(username='alice'), seat=Seat.objects.get(number='A1'))
+
+        keypad_import = self.read(
+            ',Bob,Smith,,1,A2',
+            ',Alice,Smith,,2,A3',
+            ',Carol,Smith,,3,A1')
+
+        self.assertEqual(keypad_import.errors, [
+            {'line': 2, 'errors': ['Error: Keypad ID already exists.']},
+            {'line': 3, 'errors': ['Error: Participant already has a keypad.']},
+            {'line': 4, 'errors': ['Error: Seat ID already assigned to a keypad.']},
+        ])
+        self.assertEqual(keypad_import.save(), 0)
+
+    def test_invalid_lines(self):
+        keypad_import = self.read(
+            ',Alice,Smith,,x,A1',
+            ',,,,2,A2',
+            ',Dave,Smith,,3,B9')
+
+        self.assertEqual(keypad_import.errors, [
+            {'line': 2, 'errors': ['Error: Keypad ID must be a number.']},
+            {'line': 3, 'errors': ['Error: First and last name is required.']},
+            {'line': 4, 'errors': ['Error: Participant not found.', 'Error: Seat label does not exists.']},
+        ])
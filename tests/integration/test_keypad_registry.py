@@ -0,0 +1,51 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+
+from openslides.users.models import User
+from openslides.utils.test import TestCase
+
+from openslides_votecollector.keypad_registry import KeypadRegistry
+from openslides_votecollector.models import Keypad
+
+
+class TestKeypadRegistry(TestCase):
+    def setUp(self):
+        cache.delete(KeypadRegistry.version_key)
+        self.user = User.objects.create(username='user')
+        self.keypad = Keypad.objects.create(keypad_id=1, user=self.user)
+        self.registry = KeypadRegistry()
+        self.registry.build()
+
+    def test_get(self):
+        record = self.registry.get('1')
+
+        self.assertEqual((record.pk, record.user_id, record.is_active), (self.keypad.pk, self.user.pk, True))
+        self.assertIsNone(self.registry.get(2))
+
+    def test_change_in_other_process(self):
+        # Change the keypad without signals and increment the version like
+        # the signals of another process.
+        Keypad.objects.filter(pk=self.keypad.pk).update(keypad_id=2)
+        KeypadRegistry().invalidate()
+
+        self.assertIsNone(self.registry.get(1))
+        self.assertEqual(self.registry.get(2).pk, self.keypad.pk)
+
+    def test_change_in_this_process(self):
+        Keypad.objects.filter(pk=self.keypad.pk).update(keypad_id=2)
+        self.keypad.keypad_id = 2
+        self.registry.update_keypad(self.keypad)
+        self.registry.invalidate()
+
+        with patch.object(self.registry, 'build') as build:
+            self.assertEqual(self.registry.get(2).pk, self.keypad.pk)
+        self.assertFalse(build.called)
+
+    def test_built_on_first_lookup(self):
+        registry = KeypadRegistry()
+
+        self.assertEqual(registry.get(1).pk, self.keypad.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(registry.get(1).pk, self.keypad.pk)
+            self.assertIsNone(registry.get(2))
@@ -0,0 +1,76 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+from openslides.motions.models import Motion
+
+from openslides_votecollector.models import VOTE_VALUES, Keypad, MotionPollKeypadConnection
+
+TABLE = 'openslides_votecollector_motionpollkeypadconnection'
+
+
+class TestVoteValueCodes(TransactionTestCase):
+    """
+    Tests the migration of the vote values to codes (0003 and 0004).
+    """
+    app = 'openslides_votecollector'
+    migrate_from = '0002_polltally'
+    migrate_to = '0004_connection_constraints'
+
+    # Keep the data of the other migrations, e. g. the motion workflows.
+    serialized_rollback = True
+
+    def migrate(self, name):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([(self.app, name)])
+
+    def tearDown(self):
+        self.migrate(self.migrate_to)
+
+    def test_forward(self):
+        motion = Motion(title='motion', text='text')
+        motion.save()
+        poll = motion.create_poll()
+        self.migrate(self.migrate_from)
+        keypads = [Keypad.objects.create(keypad_id=keypad_id).pk for keypad_id in (1, 2, 3)]
+        rows = (
+            (keypads[0], 'Y'),
+            (keypads[0], 'N'),  # Later vote of the same keypad.
+            (keypads[1], '7'),
+            (keypads[2], 'X'),  # Unknown value.
+            (None, 'A'),  # Anonymized votes.
+            (None, 'A'),
+        )
+        with connection.cursor() as cursor:
+            for keypad_id, value in rows:
+                cursor.execute(
+                    'INSERT INTO %s (poll_id, keypad_id, value, serial_number) VALUES (%%s, %%s, %%s, NULL)' % TABLE,
+                    [poll.pk, keypad_id, value])
+
+        self.migrate(self.migrate_to)
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT keypad_id, value FROM %s ORDER BY id' % TABLE)
+            self.assertEqual(cursor.fetchall(), [
+                (keypads[0], VOTE_VALUES.index('N')),
+                (keypads[1], 7),
+                (None, VOTE_VALUES.index('A')),
+                (None, VOTE_VALUES.index('A')),
+            ])
+        self.assertEqual(
+            list(MotionPollKeypadConnection.objects.order_by('pk').values_list('value', flat=True)),
+            ['N', '7', 'A', 'A'])
+
+    def test_backward(self):
+        motion = Motion(title='motion', text='text')
+        motion.save()
+        poll = motion.create_poll()
+        keypad = Keypad.objects.create(keypad_id=1)
+        MotionPollKeypadConnection.objects.create(poll=poll, keypad=keypad, value='Y')
+
+        self.migrate(self.migrate_from)
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT value FROM %s' % TABLE)
+            self.assertEqual(cursor.fetchall(), [('Y',)])
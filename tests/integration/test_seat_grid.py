@@ -0,0 +1,69 @@
+from openslides.motions.models import Motion
+from openslides.utils.test import TestCase
+
+from openslides_votecollector.keypad_registry import keypad_registry
+from openslides_votecollector.models import Keypad, MotionPollKeypadConnection, Seat
+from openslides_votecollector.seat_grid import SeatGrids
+from openslides_votecollector.seating_plan import setup_plan
+
+
+class TestSeatGrids(TestCase):
+    def setUp(self):
+        Seat.objects.all().delete()
+        seats = [Seat.objects.create(number=str(x), seating_plan_x_axis=x, seating_plan_y_axis=1) for x in (1, 2, 3)]
+        self.keypads = [Keypad.objects.create(keypad_id=x, seat=seat) for x, seat in enumerate(seats, start=1)]
+        motion = Motion(title='motion', text='text')
+        motion.save()
+        self.poll = motion.create_poll()
+        self.grids = SeatGrids()
+        # Do not inform the projectors.
+        self.grids.changed = lambda: None
+
+    def add_vote(self, keypad, value):
+        MotionPollKeypadConnection.objects.create(poll=self.poll, keypad=keypad, value=value)
+        self.grids.add('MotionPoll', self.poll.pk, keypad.seat_id, value)
+
+    def test_missing_grid_is_built_from_database(self):
+        MotionPollKeypadConnection.objects.create(poll=self.poll, keypad=self.keypads[1], value='N')
+
+        self.assertEqual(self.grids.get_data('MotionPoll', self.poll.pk)['votes'], '.N.')
+
+    def test_delta(self):
+        self.grids.start('MotionPoll', self.poll.pk)
+        self.add_vote(self.keypads[0], 'Y')
+        self.grids.publish()
+
+        self.assertEqual(self.grids.get_data('MotionPoll', self.poll.pk)['changes'], [[0, 'Y']])
+
+    def test_votes_of_other_processes(self):
+        self.grids.start('MotionPoll', self.poll.pk)
+        self.add_vote(self.keypads[0], 'Y')
+        # A vote received by another process.
+        MotionPollKeypadConnection.objects.create(poll=self.poll, keypad=self.keypads[2], value='A')
+        # A vote of this process which is not written yet.
+        self.grids.add('MotionPoll', self.poll.pk, self.keypads[1].seat_id, 'N')
+        self.grids.grids[('MotionPoll', self.poll.pk)].loaded -= self.grids.snapshot_interval + 1
+
+        data = self.grids.get_data('MotionPoll', self.poll.pk)
+
+        self.assertEqual(data['votes'], 'YNA')
+
+    def test_seats_changed_in_other_process(self):
+        self.grids.start('MotionPoll', self.poll.pk)
+        self.assertEqual(self.grids.get_layout()[:2], (3, 3))
+        # Add a seat without signals and increment the version like another
+        # process.
+        Seat.objects.bulk_create([Seat(number='4', seating_plan_x_axis=4, seating_plan_y_axis=1)])
+        SeatGrids().invalidate()
+
+        self.assertEqual(self.grids.get_layout()[:2], (4, 4))
+        self.assertEqual(self.grids.get_data('MotionPoll', self.poll.pk)['votes'], '....')
+
+    def test_setup_plan_replace(self):
+        keypad_registry.build()
+        self.assertEqual(self.grids.get_layout()[:2], (3, 3))
+
+        setup_plan({'blocks': (2,), 'rows': 2}, replace=True)
+
+        self.assertEqual(self.grids.get_layout()[:2], (2, 4))
+        self.assertIsNone(keypad_registry.get(1).seat_id)
@@ -0,0 +1,76 @@
+from django.core.cache import cache
+
+from openslides.motions.models import Motion
+from openslides.utils.test import TestCase
+
+from openslides_votecollector.models import Keypad, MotionPollKeypadConnection, PollTally
+from openslides_votecollector.tally import PollTallies
+
+
+class TestPollTallies(TestCase):
+    def setUp(self):
+        motion = Motion(title='motion', text='text')
+        motion.save()
+        self.poll = motion.create_poll()
+        self.keypads = [Keypad.objects.create(keypad_id=keypad_id) for keypad_id in (1, 2, 3)]
+        self.tallies = PollTallies()
+        self.tallies.start('MotionPoll', self.poll.pk)
+
+    def add_vote(self, keypad, value):
+        MotionPollKeypadConnection.objects.update_or_create(
+            poll=self.poll, keypad=keypad, defaults={'value': value})
+
+    def test_live_result(self):
+        self.add_vote(self.keypads[0], 'Y')
+        self.add_vote(self.keypads[1], 'N')
+        self.add_vote(self.keypads[0], 'A')
+
+        self.assertEqual(self.tallies.get_result('MotionPoll', self.poll), [0, 1, 1])
+
+    def test_live_result_shared(self):
+        self.add_vote(self.keypads[0], 'Y')
+        self.tallies.get_result('MotionPoll', self.poll)
+        # Another process reads the result within live_timeout.
+        other = PollTallies()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(other.get_counts('MotionPoll', self.poll.pk), {'Y': 1})
+
+    def test_live_result_counted_again(self):
+        self.add_vote(self.keypads[0], 'Y')
+        self.tallies.get_result('MotionPoll', self.poll)
+        self.add_vote(self.keypads[1], 'N')
+        cache.delete(self.tallies.get_live_cache_key('MotionPoll', self.poll.pk))
+
+        self.assertEqual(self.tallies.get_result('MotionPoll', self.poll), [1, 1, 0])
+
+    def test_save_counts_votes_of_all_processes(self):
+        self.add_vote(self.keypads[0], 'Y')
+        # A vote received by another process.
+        MotionPollKeypadConnection.objects.create(poll=self.poll, keypad=self.keypads[1], value='Y')
+
+        self.tallies.save('MotionPoll', self.poll.pk)
+
+        self.assertEqual(PollTally.objects.get(voting_mode='MotionPoll', poll_id=self.poll.pk).counts, {'Y': 2})
+        self.assertEqual(self.tallies.get_result('MotionPoll', self.poll, final=True), [2, 0, 0])
+
+    def test_final_result_saved_by_other_process(self):
+        self.add_vote(self.keypads[0], 'Y')
+        self.assertEqual(self.tallies.get_result('MotionPoll', self.poll), [1, 0, 0])
+        # The voting was stopped by another process.
+        self.add_vote(self.keypads[2], 'N')
+        PollTallies().save('MotionPoll', self.poll.pk)
+        cache.delete(self.tallies.get_cache_key('MotionPoll', self.poll.pk))
+
+        self.assertEqual(self.tallies.get_result('MotionPoll', self.poll), [1, 1, 0])
+        self.assertEqual(self.tallies.get_result('MotionPoll', self.poll, final=True), [1, 1, 0])
+
+    def test_verify(self):
+        self.add_vote(self.keypads[0], 'Y')
+        self.tallies.save('MotionPoll', self.poll.pk)
+        self.assertEqual(self.tallies.verify('MotionPoll', self.poll.pk), {})
+
+        # A vote which is missing in the saved result.
+        self.add_vote(self.keypads[1], 'N')
+
+        self.assertEqual(self.tallies.verify('MotionPoll', self.poll.pk), {'N': (0, 1)})
@@ -0,0 +1,71 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from openslides.motions.models import Motion
+from openslides.utils.test import TestCase
+
+from openslides_votecollector.models import Keypad, MotionPollKeypadConnection
+from openslides_votecollector.vote_buffer import VoteBuffer
+from openslides_votecollector.voting_session import voting_session
+
+
+class TestVoteBufferFlush(TestCase):
+    def setUp(self):
+        motion = Motion(title='motion', text='text')
+        motion.save()
+        self.poll = motion.create_poll()
+        self.keypads = [Keypad.objects.create(keypad_id=keypad_id) for keypad_id in (1, 2, 3)]
+        cache.delete(voting_session.pending_key)
+        self.buffer = VoteBuffer()
+        # Do not start the background thread.
+        self.buffer.start = lambda: None
+
+    def add_vote(self, keypad, value):
+        self.buffer.add_vote(MotionPollKeypadConnection, self.poll.pk, keypad.pk, value=value, serial_number='1')
+
+    def get_votes(self):
+        return dict(MotionPollKeypadConnection.objects.values_list('keypad__keypad_id', 'value'))
+
+    def test_flush(self):
+        self.add_vote(self.keypads[0], 'Y')
+        self.add_vote(self.keypads[1], 'N')
+        self.buffer.add_keypad(Keypad(pk=self.keypads[0].pk, battery_level=80))
+
+        self.assertEqual(voting_session.get_pending(), 2)
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.get_votes(), {1: 'Y', 2: 'N'})
+        self.assertEqual(Keypad.objects.get(keypad_id=1).battery_level, 80)
+        self.assertTrue(Keypad.objects.get(keypad_id=1).in_range)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(voting_session.get_pending(), 0)
+
+    def test_flush_updates_votes(self):
+        self.add_vote(self.keypads[0], 'Y')
+        self.buffer.flush()
+        self.add_vote(self.keypads[0], 'A')
+        self.add_vote(self.keypads[2], 'A')
+        self.buffer.flush()
+
+        self.assertEqual(self.get_votes(), {1: 'A', 3: 'A'})
+        self.assertEqual(MotionPollKeypadConnection.objects.count(), 2)
+
+    def test_failed_flush_keeps_votes(self):
+        self.add_vote(self.keypads[0], 'Y')
+        self.add_vote(self.keypads[1], 'N')
+        self.buffer.add_keypad(Keypad(pk=self.keypads[0].pk, battery_level=80))
+
+        with patch.object(self.buffer, 'write_votes', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.buffer.flush()
+        self.assertFalse(MotionPollKeypadConnection.objects.exists())
+        self.assertEqual(voting_session.get_pending(), 2)
+
+        # A newer vote replaces the vote of the failed flush.
+        self.add_vote(self.keypads[1], 'A')
+        self.assertEqual(voting_session.get_pending(), 2)
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(voting_session.get_pending(), 0)
+        self.assertEqual(self.get_votes(), {1: 'Y', 2: 'A'})
+        self.assertEqual(Keypad.objects.get(keypad_id=1).battery_level, 80)
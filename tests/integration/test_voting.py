@@ -0,0 +1,40 @@
+from unittest.mock import patch
+
+from django.test import Client
+
+from openslides.motions.models import Motion
+from openslides.utils.test import TestCase
+
+from openslides_votecollector.models import Keypad, VoteCollector
+
+
+class TestStartVoting(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
+        motion = Motion(title='motion', text='text')
+        motion.save()
+        self.poll = motion.create_poll()
+        Keypad.objects.create(keypad_id=1)
+        # Do not update the counters and the projectors in the background.
+        for name in ('voting_counters', 'seat_grids'):
+            patcher = patch('openslides_votecollector.views.' + name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def start(self):
+        return self.client.get(
+            '/votecollector/start_yna/%d/' % self.poll.pk, SERVER_NAME='localhost', SERVER_PORT=8000)
+
+    def test_previous_voting_saved_after_devices_stopped(self):
+        VoteCollector.objects.filter(id=1).update(voting_mode='MotionPoll', voting_target=self.poll.pk, is_voting=True)
+        calls = []
+
+        with patch('openslides_votecollector.views.start_voting', lambda *args, **kwargs: calls.append('start_voting') or 1), \
+                patch('openslides_votecollector.views.poll_tallies') as poll_tallies:
+            poll_tallies.save.side_effect = lambda *args: calls.append('save')
+            response = self.start()
+
+        self.assertEqual(response.content, b'{"count": 1}')
+        self.assertEqual(calls, ['start_voting', 'save'])
+        self.assertTrue(VoteCollector.objects.get(id=1).is_voting)
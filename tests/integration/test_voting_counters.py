@@ -0,0 +1,72 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+
+from openslides.utils.test import TestCase
+
+from openslides_votecollector.models import VoteCollector
+from openslides_votecollector.voting_counters import VotingCounters
+from openslides_votecollector.voting_session import VotingSession
+
+
+class TestVotingCounters(TestCase):
+    def setUp(self):
+        cache.delete(VotingCounters.cache_key)
+        VotingSession().start('MotionPoll', 1)
+        # Publish only on flush(), not from the timer thread.
+        patcher = patch('openslides_votecollector.voting_counters.threading.Timer')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.counters = VotingCounters()
+
+    def get_counters(self):
+        vc = VoteCollector.objects.get(id=1)
+        return vc.votes_received, vc.voting_duration
+
+    def test_no_decrease(self):
+        self.counters.update(5, 10)
+        self.counters.update(3, 8)
+        self.counters.flush()
+
+        self.assertEqual(self.get_counters(), (5, 10))
+
+    def test_devices(self):
+        self.counters.update(5, 10, device=0)
+        self.counters.update(3, 12, device=1)
+        self.counters.flush()
+
+        self.assertEqual(self.get_counters(), (8, 12))
+
+    def test_merge_other_process(self):
+        other = VotingCounters()
+        other.update(5, 10)
+        other.flush()
+        self.counters.update(3, 8)
+        self.counters.flush()
+
+        self.assertEqual(self.get_counters(), (5, 10))
+
+    def test_reset(self):
+        self.counters.update(5, 10)
+        self.counters.reset()
+        self.counters.update(2, 3)
+        self.counters.flush()
+
+        self.assertEqual(self.get_counters(), (2, 3))
+
+    def test_reset_in_other_process(self):
+        self.counters.update(5, 10)
+        self.counters.flush()
+        VotingSession().start('MotionPoll', 2)
+        self.counters.update(2, 3)
+        self.counters.flush()
+
+        self.assertEqual(self.get_counters(), (2, 3))
+
+    def test_stale_counters_not_published(self):
+        self.counters.update(5, 10)
+        VoteCollector.objects.filter(id=1).update(votes_received=0, voting_duration=0)
+        VotingSession().start('MotionPoll', 2)
+        self.counters.flush()
+
+        self.assertEqual(self.get_counters(), (0, 0))
@@ -0,0 +1,59 @@
+from django.core.cache import cache
+
+from openslides.utils.test import TestCase
+
+from openslides_votecollector.async_callbacks import CallbackExecutor
+from openslides_votecollector.models import VoteCollector
+from openslides_votecollector.voting_session import VotingSession
+
+
+class TestVotingSession(TestCase):
+    def setUp(self):
+        cache.delete(VotingSession.cache_key)
+        cache.delete(VotingSession.pending_key)
+
+    def test_read_from_model(self):
+        VoteCollector.objects.filter(id=1).update(is_voting=True, voting_mode='MotionPoll', voting_target=3)
+
+        session = VotingSession().get()
+
+        self.assertTrue(session.is_active())
+        self.assertEqual((session.voting_mode, session.voting_target), ('MotionPoll', 3))
+
+    def test_start_in_other_process(self):
+        session = VotingSession()
+        generation = session.get().generation
+
+        VotingSession().start('MotionPoll', 3)
+
+        self.assertEqual(session.get().generation, generation + 1)
+        self.assertEqual(session.get().voting_target, 3)
+
+    def test_stop_in_other_process(self):
+        session = VotingSession()
+        session.start('MotionPoll', 3)
+        generation = session.get().generation
+
+        VotingSession().stop()
+
+        self.assertFalse(session.get().is_active())
+        self.assertEqual(session.get().generation, generation)
+
+    def test_executor_uses_shared_session(self):
+        executor = CallbackExecutor()
+        VotingSession().start('MotionPoll', 3)
+
+        self.assertTrue(executor.is_target('3'))
+        self.assertFalse(executor.is_target('4'))
+        VotingSession().stop()
+        self.assertFalse(executor.is_target('3'))
+
+    def test_executor_counts_pending(self):
+        executor = CallbackExecutor()
+        VotingSession().start('MotionPoll', 3)
+
+        session = VotingSession()
+        session.timeout = 1
+        executor.submit(1, lambda: None)
+
+        self.assertTrue(session.wait_pending())
@@ -0,0 +1,57 @@
+"""
+Settings file for the tests of the VoteCollector plugin.
+
+Run the tests from the root of the repository:
+
+    DJANGO_SETTINGS_MODULE=tests.settings python -m django test tests
+"""
+
+import os
+
+from openslides.global_settings import *  # noqa
+
+# Path to the directory for user specific data files
+
+OPENSLIDES_USER_DATA_PATH = os.path.realpath(os.path.dirname(os.path.abspath(__file__)))
+
+
+# OpenSlides plugins
+
+INSTALLED_PLUGINS += ('openslides_votecollector',)  # noqa
+
+INSTALLED_APPS += INSTALLED_PLUGINS  # noqa
+
+
+# Important settings for production use
+
+SECRET_KEY = 'secret'
+
+DEBUG = False
+
+
+# Database
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+    }
+}
+
+# The tests send many autoupdates without a consumer.
+
+CHANNEL_LAYERS['default']['CONFIG']['capacity'] = 100000  # noqa
+
+
+# Internationalization
+
+TIME_ZONE = 'Europe/Berlin'
+
+MEDIA_ROOT = os.path.join(OPENSLIDES_USER_DATA_PATH, '')
+
+TEST_RUNNER = 'openslides.utils.test.OpenSlidesDiscoverRunner'
+
+# Use a faster password hasher.
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
@@ -0,0 +1,116 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from openslides_votecollector.api import (
+    VoteCollectorError,
+    get_keypad_ranges,
+    in_ranges,
+    parse_devices,
+    start_voting,
+)
+
+
+class FakeServer:
+    """
+    VoteCollector device which answers every command with the given result
+    or 0. An exception as result is raised.
+    """
+    def __init__(self, uri='http://localhost:8030', **results):
+        self.uri = uri
+        self.results = results
+        self.commands = []
+
+    def call(self, method, *params):
+        return self.multicall([(method, params)])[0]
+
+    def multicall(self, calls):
+        self.commands.extend(method for method, params in calls)
+        results = [self.results.get(method.split('.')[-1], 0) for method, params in calls]
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+
+class TestGetKeypadRanges(TestCase):
+    def test_ranges(self):
+        self.assertEqual(get_keypad_ranges([1, 2, 3, 5, 7, 8]), [(1, 3), (5, 5), (7, 8)])
+
+    def test_empty(self):
+        self.assertEqual(get_keypad_ranges([]), [])
+
+
+class TestParseDevices(TestCase):
+    def test_devices(self):
+        value = 'http://10.0.0.2:8030 1-400\n\nhttp://10.0.0.3:8030 401-800, 901\n'
+
+        self.assertEqual(parse_devices(value), (
+            ('http://10.0.0.2:8030', ((1, 400),)),
+            ('http://10.0.0.3:8030', ((401, 800), (901, 901))),
+        ))
+
+    def test_missing_ranges(self):
+        with self.assertRaises(ValueError):
+            parse_devices('http://10.0.0.2:8030')
+
+    def test_invalid_range(self):
+        with self.assertRaises(ValueError):
+            parse_devices('http://10.0.0.2:8030 400-1')
+
+    def test_in_ranges(self):
+        self.assertTrue(in_ranges(401, ((1, 400), (401, 800))))
+        self.assertFalse(in_ranges(801, ((1, 400), (401, 800))))
+
+
+@patch('openslides_votecollector.api.get_keypads', lambda: [1, 2, 3])
+class TestStartVoting(TestCase):
+    def start_voting(self, *servers, ranges=None):
+        devices = list(zip(servers, ranges or [None] * len(servers)))
+        with patch('openslides_votecollector.api.get_devices', lambda: devices):
+            return start_voting('YesNoAbstain', '', 'http://localhost:8000/votecollector/vote/1/')
+
+    def test_start(self):
+        server = FakeServer(startVoting=3)
+
+        self.assertEqual(self.start_voting(server), 3)
+        self.assertEqual(server.commands, ['voteCollector.prepareVoting', 'voteCollector.startVoting'])
+
+    def test_failed_start_stops_device(self):
+        server = FakeServer(prepareVoting=-7, startVoting=3)
+
+        with self.assertRaises(VoteCollectorError):
+            self.start_voting(server)
+        self.assertEqual(server.commands[-1], 'voteCollector.stopVoting')
+
+    def test_no_keypads_stops_device(self):
+        server = FakeServer(startVoting=0)
+
+        with self.assertRaises(VoteCollectorError):
+            self.start_voting(server)
+        self.assertEqual(server.commands[-1], 'voteCollector.stopVoting')
+
+    def test_errors_while_stopping_are_ignored(self):
+        server = FakeServer(startVoting=-8, stopVoting=VoteCollectorError('No connection to VoteCollector.'))
+
+        with self.assertRaises(VoteCollectorError) as context:
+            self.start_voting(server)
+        self.assertEqual(context.exception.value, 'Voting device not ready.')
+
+    def test_several_devices(self):
+        servers = [FakeServer('http://10.0.0.2:8030', startVoting=2), FakeServer('http://10.0.0.3:8030', startVoting=1)]
+
+        self.assertEqual(self.start_voting(*servers, ranges=[((1, 2),), ((3, 4),)]), 3)
+
+    def test_failed_device_stops_all_devices(self):
+        servers = [
+            FakeServer('http://10.0.0.2:8030', startVoting=2),
+            FakeServer('http://10.0.0.3:8030', prepareVoting=-6),
+            # A device without keypads in this voting.
+            FakeServer('http://10.0.0.4:8030'),
+        ]
+
+        with self.assertRaises(VoteCollectorError) as context:
+            self.start_voting(*servers, ranges=[((1, 2),), ((3, 4),), ((5, 6),)])
+        self.assertEqual(context.exception.value, 'http://10.0.0.3:8030: No voting device connected.')
+        for server in servers:
+            self.assertEqual(server.commands[-1], 'voteCollector.stopVoting')
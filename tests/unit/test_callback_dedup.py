@@ -0,0 +1,81 @@
+import threading
+from unittest import TestCase
+
+from django.core.cache import cache
+
+from openslides_votecollector.callback_dedup import CallbackDedup
+from openslides_votecollector.voting_session import Session, VotingSession
+
+
+class TestCallbackDedup(TestCase):
+    def setUp(self):
+        cache.set(VotingSession.cache_key, Session(1, 'MotionPoll', 1), None)
+        self.dedup = CallbackDedup()
+        self.dedup.timeout = 1
+        self.vote, repeated = self.dedup.begin(1, 5, '123', 'Y')
+
+    def test_new_vote(self):
+        self.assertIsNotNone(self.vote)
+        self.assertIsNone(self.vote.response)
+
+    def test_repeated_vote(self):
+        self.dedup.finish(self.vote, 'Vote submitted')
+
+        vote, repeated = self.dedup.begin('1', '5', '123', 'Y')
+
+        self.assertTrue(repeated)
+        self.assertEqual(self.dedup.wait(vote), 'Vote submitted')
+
+    def test_repeated_vote_in_flight(self):
+        vote, repeated = self.dedup.begin(1, 5, '123', 'Y')
+        self.assertTrue(repeated)
+
+        threading.Timer(0.05, self.dedup.finish, (self.vote, 'Vote submitted')).start()
+
+        self.assertEqual(self.dedup.wait(vote), 'Vote submitted')
+
+    def test_vote_not_accepted(self):
+        self.dedup.finish(self.vote)
+
+        vote, repeated = self.dedup.begin(1, 5, '123', 'Y')
+
+        self.assertFalse(repeated)
+
+    def test_repeated_vote_in_flight_not_accepted(self):
+        vote, repeated = self.dedup.begin(1, 5, '123', 'Y')
+        self.dedup.finish(self.vote)
+
+        self.assertIsNone(self.dedup.wait(vote))
+
+    def test_changed_value(self):
+        vote, repeated = self.dedup.begin(1, 5, '123', 'N')
+
+        self.assertFalse(repeated)
+
+    def test_other_keypad(self):
+        vote, repeated = self.dedup.begin(1, 6, '123', 'Y')
+
+        self.assertFalse(repeated)
+
+    def test_without_serial_number(self):
+        self.assertEqual(self.dedup.begin(1, 5, None, 'Y'), (None, False))
+
+    def test_invalid_keypad_id(self):
+        self.assertEqual(self.dedup.begin(1, 'x', '123', 'Y'), (None, False))
+
+    def test_clear(self):
+        self.dedup.finish(self.vote, 'Vote submitted')
+        self.dedup.clear()
+
+        vote, repeated = self.dedup.begin(1, 5, '123', 'Y')
+
+        self.assertFalse(repeated)
+
+    def test_voting_restarted_in_other_process(self):
+        self.dedup.finish(self.vote, 'Vote submitted')
+        VotingSession().start('MotionPoll', 1)
+
+        vote, repeated = self.dedup.begin(1, 5, '123', 'Y')
+
+        self.assertFalse(repeated)
+        self.assertIsNone(vote.response)
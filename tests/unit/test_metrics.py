@@ -0,0 +1,31 @@
+import os
+from unittest import TestCase
+
+from openslides_votecollector.metrics import Counter, Histogram, Metrics
+
+
+class TestProcessLabel(TestCase):
+    def setUp(self):
+        self.process = os.getpid()
+
+    def test_counter(self):
+        counter = Counter('votes_total', 'Votes.', ('view',))
+        counter.inc('VoteCallback')
+
+        self.assertEqual(list(counter.collect(self.process)), ['votes_total{process="%d",view="VoteCallback"} 1' % self.process])
+
+    def test_histogram(self):
+        histogram = Histogram('seconds', 'Latency.', buckets=(1,))
+        histogram.observe(0.5)
+
+        self.assertEqual(list(histogram.collect(self.process)), [
+            'seconds_bucket{process="%d",le="1"} 1' % self.process,
+            'seconds_bucket{process="%d",le="+Inf"} 1' % self.process,
+            'seconds_count{process="%d"} 1' % self.process,
+            'seconds_sum{process="%d"} 0.5' % self.process,
+        ])
+
+    def test_render_values(self):
+        text = Metrics().render([('registry_size', 'gauge', 'Keypads.', 3)])
+
+        self.assertIn('registry_size{process="%d"} 3\n' % self.process, text)
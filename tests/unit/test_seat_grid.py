@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from openslides_votecollector.seat_grid import SeatGrid, get_code
+
+
+class TestSeatGrid(TestCase):
+    def setUp(self):
+        self.grid = SeatGrid(columns=3, size=6)
+        self.grid.set(0, 'Y')
+        self.grid.publish(snapshot=True)
+
+    def test_snapshot(self):
+        self.assertEqual(self.grid.get_data(grey=False), {'columns': 3, 'version': 1, 'votes': 'Y.....'})
+
+    def test_delta(self):
+        self.grid.set(4, 'N')
+        self.grid.set(2, 'A')
+        self.grid.publish(snapshot=False)
+
+        self.assertEqual(self.grid.get_data(grey=False), {
+            'columns': 3,
+            'version': 2,
+            'base': 1,
+            'changes': [[2, 'A'], [4, 'N']],
+        })
+
+    def test_grey(self):
+        self.grid.set(4, 'N')
+        self.grid.publish(snapshot=False)
+
+        self.assertEqual(self.grid.get_data(grey=True)['changes'], [[4, 'G']])
+        self.grid.publish(snapshot=True)
+        self.assertEqual(self.grid.get_data(grey=True)['votes'], 'G...G.')
+
+    def test_get_code(self):
+        self.assertEqual(get_code('3'), '3')
+        self.assertEqual(get_code('X'), '.')
@@ -0,0 +1,44 @@
+from unittest import TestCase
+
+from openslides_votecollector.seating_plan import LAYOUTS, generate_seats
+
+
+class TestGenerateSeats(TestCase):
+    def test_default_layout(self):
+        # The former hard-coded default plan: a podium of 6 seats and 6 rows
+        # of three blocks with 6 seats each.
+        expected = [(number, x, 1) for number, x in enumerate(range(8, 14), 1)]
+        for y in range(3, 9):
+            for x in list(range(1, 7)) + list(range(8, 14)) + list(range(15, 21)):
+                expected.append((len(expected) + 1, x, y))
+
+        seats = list(generate_seats(LAYOUTS['default']))
+
+        self.assertEqual(len(seats), 114)
+        self.assertEqual(seats, expected)
+
+    def test_blocks_order(self):
+        layout = {'blocks': (2, 1), 'rows': 2, 'order': 'blocks'}
+
+        self.assertEqual(list(generate_seats(layout)), [
+            (1, 1, 1), (2, 2, 1), (3, 1, 2), (4, 2, 2),
+            (5, 4, 1), (6, 4, 2),
+        ])
+
+    def test_snake_order(self):
+        layout = {'blocks': (2, 1), 'rows': 3, 'order': 'snake', 'start': 10}
+
+        self.assertEqual(list(generate_seats(layout)), [
+            (10, 1, 1), (11, 2, 1), (12, 4, 1),
+            (13, 4, 2), (14, 2, 2), (15, 1, 2),
+            (16, 1, 3), (17, 2, 3), (18, 4, 3),
+        ])
+
+    def test_podium(self):
+        layout = {'blocks': (3, 3), 'rows': 1, 'aisle': 2, 'podium': 2, 'podium_gap': 2}
+
+        self.assertEqual(list(generate_seats(layout))[:3], [(1, 4, 1), (2, 5, 1), (3, 1, 4)])
+
+    def test_unknown_order(self):
+        with self.assertRaises(ValueError):
+            list(generate_seats({'blocks': (1,), 'rows': 1, 'order': 'columns'}))
@@ -0,0 +1,65 @@
+import time
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from openslides_votecollector.api import VoteCollectorError
+from openslides_votecollector.status_poller import StatusPoller
+
+
+class TestStatusPoller(TestCase):
+    def setUp(self):
+        self.get_status = Mock(return_value='Device: OK')
+        patcher = patch.dict('openslides_votecollector.status_poller.STATUS_FUNCTIONS', {'device': self.get_status})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.poller = self.get_poller()
+        self.poller.clear('device')
+
+    def get_poller(self):
+        """
+        Returns a poller like the one of another process.
+        """
+        poller = StatusPoller()
+        poller.interval = 0.1
+        poller.ttl = 0.2
+        # Do not poll in the background.
+        poller.thread = True
+        return poller
+
+    def test_get(self):
+        self.assertEqual(self.poller.get('device'), {'result': 'Device: OK', 'error': None})
+
+    def test_one_poll_per_interval(self):
+        self.poller.poll('device')
+        self.get_poller().poll('device')
+
+        self.assertEqual(self.get_status.call_count, 1)
+        self.assertEqual(self.get_poller().get('device')['result'], 'Device: OK')
+
+    def test_poll_after_interval(self):
+        self.poller.poll('device')
+        time.sleep(0.15)
+        self.get_poller().poll('device')
+
+        self.assertEqual(self.get_status.call_count, 2)
+
+    def test_result_expires(self):
+        self.poller.interval = 1
+        self.poller.poll('device')
+        time.sleep(0.25)
+
+        # The polling process stopped and still holds the lock.
+        self.assertEqual(self.get_poller().get('device')['error'], 'No status of VoteCollector available.')
+        self.assertEqual(self.get_status.call_count, 1)
+
+    def test_error(self):
+        self.get_status.side_effect = VoteCollectorError('Device is not connected.')
+
+        self.assertEqual(self.poller.get('device'), {'result': None, 'error': 'Device is not connected.'})
+
+    def test_clear(self):
+        self.poller.poll('device')
+        self.poller.clear('device')
+        self.poller.poll('device')
+
+        self.assertEqual(self.get_status.call_count, 2)
@@ -0,0 +1,28 @@
+from unittest import TestCase
+
+from openslides_votecollector.tally import get_election_result, get_key
+
+
+class TestGetKey(TestCase):
+    def test_yes_no_abstain(self):
+        self.assertEqual(get_key('Y'), 'Y')
+        self.assertEqual(get_key('A', candidate_id=5), 'A')
+
+    def test_candidate(self):
+        self.assertEqual(get_key('3', candidate_id=5), 'vote_5')
+
+    def test_invalid(self):
+        self.assertEqual(get_key('3'), 'invalid')
+
+
+class TestGetElectionResult(TestCase):
+    def test_result(self):
+        counts = {'vote_1': 3, 'vote_2': 1, 'vote_7': 2, 'invalid': 1}
+
+        self.assertEqual(get_election_result(counts, [1, 2, 3]), {
+            'vote_1': 3,
+            'vote_2': 1,
+            'vote_3': 0,
+            'valid': 4,
+            'invalid': 3,
+        })
@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+from django.core.cache import cache
+
+from openslides_votecollector.voting_session import VotingSession
+
+
+class TestPendingVotes(TestCase):
+    def setUp(self):
+        cache.delete(VotingSession.pending_key)
+        self.session = VotingSession()
+        self.session.timeout = 0.1
+
+    def test_count(self):
+        self.session.add_pending(3)
+        self.session.add_pending(-1)
+
+        self.assertEqual(self.session.get_pending(), 2)
+
+    def test_wait_pending(self):
+        self.session.add_pending(2)
+        self.session.add_pending(-2)
+
+        self.assertTrue(self.session.wait_pending())
+
+    def test_wait_pending_gives_up(self):
+        # Votes of a process which crashed are never written.
+        self.session.add_pending(2)
+
+        with self.assertWarns(RuntimeWarning):
+            self.assertFalse(self.session.wait_pending())
+        self.assertEqual(self.session.get_pending(), 0)
+
+    def test_given_up_votes_written_later(self):
+        self.session.add_pending(2)
+        with self.assertWarns(RuntimeWarning):
+            self.session.wait_pending()
+        self.session.add_pending(-2)
+
+        self.assertEqual(self.session.get_pending(), 0)